@@ -0,0 +1,255 @@
+"""
+End-to-end pipeline benchmark on synthetic Online Retail II data.
+
+For each size, generates a raw export (benchmarks/synthetic_retail.py)
+in a scratch directory and times three stages, each in a fresh process
+so peak RSS is per stage:
+
+    clean     DataCleaner.run_pipeline (or run_streaming_pipeline)
+    features  FeatureEngineer.run_pipeline
+    score     predict_churn on the customer feature table
+
+Results (wall time, CPU time, peak RSS, rows/s) are written as JSON and
+compared with a stored baseline; stages slower or larger than the
+baseline by more than --tolerance are flagged.
+
+Run from the repo root:
+    python benchmarks/bench_pipeline.py --rows 10000 100000 1000000
+    python benchmarks/bench_pipeline.py --save-baseline
+"""
+import argparse
+import contextlib
+import importlib
+import json
+import multiprocessing
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO)
+
+from benchmarks.synthetic_retail import write_csv
+
+RESULTS_PATH = os.path.join(REPO, "benchmarks", "results", "latest.json")
+BASELINE_PATH = os.path.join(REPO, "benchmarks", "baseline.json")
+
+RAW_PATH = os.path.join("data", "raw", "online_retail_II.csv")
+STAGES = ["clean", "features", "score"]
+
+# Wall-time changes smaller than this are timer noise, not regressions
+MIN_WALL_DELTA_S = 0.1
+
+
+def peak_rss_mb():
+    # VmHWM starts fresh in the spawned process (ru_maxrss survives exec
+    # on Linux), and also counts peaks before per-step instrumentation resets
+    from src.instrumentation import process_peak_rss
+
+    return process_peak_rss() / 1024 ** 2
+
+
+def _clean(streaming):
+    module = importlib.import_module("src.02_data_cleaning")
+
+    def run():
+        # Reading the raw CSV (in __init__ when not streaming) is timed too
+        cleaner = module.DataCleaner(RAW_PATH, chunksize=streaming)
+
+        if streaming:
+            cleaner.run_streaming_pipeline()
+        else:
+            cleaner.run_pipeline()
+
+        with open(module.STATS_PATH) as f:
+            stats = json.load(f)
+
+        return stats["original_rows"], stats["rows_after_cleaning"]
+
+    return run
+
+
+def _features(streaming):
+    module = importlib.import_module("src.03_feature_engineering")
+    cleaned_path = importlib.import_module("src.02_data_cleaning").CLEANED_PATH
+
+    def run():
+        engineer = module.FeatureEngineer(cleaned_path)
+        rows_in = len(engineer.df)
+        engineer.run_pipeline()
+        return rows_in, len(engineer.features)
+
+    return run
+
+
+def _score(streaming):
+    from src import predict
+    from src.model_registry import ModelRegistry
+    from src.storage import read_table
+
+    features_path = importlib.import_module("src.03_feature_engineering").FEATURES_PATH
+
+    # Artifacts live in the repo, not in the scratch directory
+    predict.registry = ModelRegistry(os.path.join(REPO, "models"))
+    predict.registry.fused()
+
+    def run():
+        features = read_table(features_path)
+        scored = predict.predict_churn(features)
+        return len(features), len(scored)
+
+    return run
+
+
+STAGE_RUNNERS = {"clean": _clean, "features": _features, "score": _score}
+
+
+def _run_stage(stage, workdir, streaming, verbose, queue):
+    os.chdir(workdir)
+
+    # Imports and model loading happen before the clock starts
+    run = STAGE_RUNNERS[stage](streaming)
+    rss_before = peak_rss_mb()
+
+    output = None if verbose else open(os.devnull, "w")
+    with contextlib.redirect_stdout(output or sys.stdout):
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        rows_in, rows_out = run()
+        wall = time.perf_counter() - wall
+        cpu = time.process_time() - cpu
+
+    queue.put({
+        "stage": stage,
+        "rows_in": int(rows_in),
+        "rows_out": int(rows_out),
+        "wall_s": round(wall, 4),
+        "cpu_s": round(cpu, 4),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "rss_before_mb": round(rss_before, 1),
+        "rows_per_s": round(rows_in / max(wall, 1e-9), 1),
+    })
+
+
+def run_stage(stage, workdir, streaming=None, verbose=False):
+    # spawn: each stage starts from a clean interpreter, so ru_maxrss is its own
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    process = context.Process(
+        target=_run_stage, args=(stage, workdir, streaming, verbose, queue)
+    )
+    process.start()
+    result = queue.get()
+    process.join()
+
+    return result
+
+
+def run_size(rows, seed, streaming, verbose, keep):
+    workdir = tempfile.mkdtemp(prefix=f"bench_{rows}_")
+
+    try:
+        start = time.perf_counter()
+        generated = write_csv(os.path.join(workdir, RAW_PATH), rows, seed)
+        generate_s = time.perf_counter() - start
+
+        print(f"\n{generated:,} raw rows (generated in {generate_s:.1f}s) in {workdir}")
+
+        results = []
+        for stage in STAGES:
+            result = run_stage(stage, workdir, streaming, verbose)
+            result["rows"] = rows
+            results.append(result)
+
+            print(f"  {stage:<9} {result['wall_s']:>9.3f}s  "
+                  f"{result['rows_per_s']:>12,.0f} rows/s  "
+                  f"peak {result['peak_rss_mb']:>8,.0f} MB")
+
+        return results
+    finally:
+        if not keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+def compare(results, baseline, tolerance):
+    """
+    Baseline comparison lines and the number of regressions.
+    """
+    reference = {(r["rows"], r["stage"]): r for r in baseline["results"]}
+    regressions = 0
+
+    print(f"\n{'rows':>10} {'stage':<9} {'wall':>9} {'base':>9} {'delta':>7} "
+          f"{'rss MB':>8} {'base':>8} {'delta':>7}")
+
+    for result in results:
+        base = reference.get((result["rows"], result["stage"]))
+        if base is None:
+            continue
+
+        wall = result["wall_s"] / base["wall_s"] - 1
+        rss = result["peak_rss_mb"] / base["peak_rss_mb"] - 1
+        slower = result["wall_s"] - base["wall_s"] > MIN_WALL_DELTA_S
+        flag = (wall > tolerance and slower) or rss > tolerance
+        regressions += flag
+
+        print(f"{result['rows']:>10,} {result['stage']:<9} "
+              f"{result['wall_s']:>8.3f}s {base['wall_s']:>8.3f}s {wall:>+7.0%} "
+              f"{result['peak_rss_mb']:>8.0f} {base['peak_rss_mb']:>8.0f} {rss:>+7.0%}"
+              f"{'  REGRESSION' if flag else ''}")
+
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end pipeline benchmark")
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000],
+                        help="Raw row counts to benchmark (10k .. 50M)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--streaming", type=int, metavar="CHUNKSIZE",
+                        help="Clean with run_streaming_pipeline in chunks of this size")
+    parser.add_argument("--output", default=RESULTS_PATH)
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true",
+                        help="Store these results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Allowed slowdown / RSS growth before flagging")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    parser.add_argument("--keep", action="store_true", help="Keep scratch directories")
+    parser.add_argument("--verbose", action="store_true", help="Show stage output")
+    args = parser.parse_args()
+
+    results = []
+    for rows in args.rows:
+        results.extend(run_size(rows, args.seed, args.streaming, args.verbose, args.keep))
+
+    report = {
+        "machine": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+        },
+        "seed": args.seed,
+        "streaming_chunksize": args.streaming,
+        "results": results,
+    }
+
+    output = BASELINE_PATH if args.save_baseline else args.output
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=4)
+
+    print(f"\nResults saved to {output}")
+
+    if not args.save_baseline and os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+
+        if regressions and args.fail_on_regression:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
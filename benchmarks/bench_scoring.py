@@ -0,0 +1,60 @@
+"""
+Compares the sklearn scoring path with the fused dot-product scorer.
+
+Run from the repo root:
+    python benchmarks/bench_scoring.py
+"""
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src import predict
+
+
+def sklearn_predict_churn(df):
+    # The pre-fusion predict_churn: scaler.transform + predict_proba + copy
+    probabilities = predict.predict_churn_sklearn(df)
+
+    result = df.copy()
+    result["churn_probability"] = probabilities
+    result["churn_prediction"] = (probabilities >= predict.THRESHOLD).astype(int)
+    return result
+
+
+def best_of(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    customers = pd.read_csv("data/processed/model_ready_dataset.csv")
+    customers = customers.drop(columns=["churn"])
+
+    print(f"{'rows':>8} {'sklearn':>10} {'fused64':>10} {'fused32':>10} {'speedup':>8}")
+
+    for rows in [1, 100, 10_000, 300_000]:
+        df = customers.sample(rows, replace=True, random_state=0)
+        df = df.reset_index(drop=True)
+        repeat = 200 if rows <= 100 else 5
+
+        reference = best_of(lambda: sklearn_predict_churn(df), repeat)
+        fused64 = best_of(lambda: predict.predict_arrays(df), repeat)
+        fused32 = best_of(lambda: predict.predict_arrays(df, np.float32), repeat)
+
+        print(
+            f"{rows:>8} {reference * 1e3:>8.3f}ms {fused64 * 1e3:>8.3f}ms "
+            f"{fused32 * 1e3:>8.3f}ms {reference / fused64:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
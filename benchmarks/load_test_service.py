@@ -0,0 +1,123 @@
+"""
+Load test for the scoring service: many concurrent single-customer
+POST /predict calls, reporting p50/p99 latency and throughput.
+
+Run from the repo root against an in-process server:
+    python benchmarks/load_test_service.py --clients 32 --requests 5000
+
+or against a running one (python -m src.service):
+    python benchmarks/load_test_service.py --url http://127.0.0.1:8000
+"""
+import argparse
+import http.client
+import json
+import os
+import sys
+import threading
+import time
+from urllib.parse import urlparse
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.service import make_server
+
+
+def client(host, port, bodies, latencies, errors):
+    # One keep-alive connection per simulated CRM worker
+    connection = http.client.HTTPConnection(host, port)
+
+    for body in bodies:
+        start = time.perf_counter()
+        connection.request(
+            "POST", "/predict", body, {"Content-Type": "application/json"}
+        )
+        response = connection.getresponse()
+        response.read()
+        latencies.append(time.perf_counter() - start)
+
+        if response.status != 200:
+            errors.append(response.status)
+
+    connection.close()
+
+
+def run(host, port, bodies, clients):
+    latencies, errors = [], []
+    threads = [
+        threading.Thread(
+            target=client,
+            args=(host, port, bodies[i::clients], latencies, errors)
+        )
+        for i in range(clients)
+    ]
+
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    latencies = np.array(latencies) * 1000.0
+
+    return {
+        "requests": len(latencies),
+        "errors": len(errors),
+        "seconds": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(float(np.percentile(latencies, 50)), 3),
+        "p99_ms": round(float(np.percentile(latencies, 99)), 3),
+        "max_ms": round(float(latencies.max()), 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--url", help="Existing service; default starts one in-process")
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--max-batch-size", type=int, default=64)
+    parser.add_argument("--max-wait-ms", type=float, default=2.0)
+    args = parser.parse_args()
+
+    customers = pd.read_csv("data/processed/model_ready_dataset.csv")
+    customers = customers.drop(columns=["churn"])
+    customers = customers.sample(args.requests, replace=True, random_state=0)
+    bodies = [json.dumps(record) for record in customers.to_dict(orient="records")]
+
+    server = None
+    if args.url:
+        url = urlparse(args.url)
+        host, port = url.hostname, url.port
+    else:
+        server = make_server(
+            port=0,
+            max_batch_size=args.max_batch_size,
+            max_wait_ms=args.max_wait_ms
+        )
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        host, port = server.server_address
+
+    # Warm-up: loads the model before timing starts
+    run(host, port, bodies[:args.clients], args.clients)
+
+    report = run(host, port, bodies, args.clients)
+
+    connection = http.client.HTTPConnection(host, port)
+    connection.request("GET", "/metrics")
+    report["service"] = json.loads(connection.getresponse().read())
+    connection.close()
+
+    print(json.dumps(report, indent=4))
+
+    if server is not None:
+        server.shutdown()
+        server.service.batcher.stop()
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""
+Seeded synthetic Online Retail II transactions for benchmarks.
+
+Writes the raw export layout DataCleaner reads (Invoice, StockCode,
+Description, Quantity, InvoiceDate, Price, Customer ID, Country) in
+time-ordered chunks, so any size from 10k to 50M+ rows is generated in
+bounded memory. Shape follows the real export: ~20 lines per invoice,
+~2% cancelled ("C") invoices with negative quantities, ~22% of invoices
+without a customer, Zipf-like customer and product popularity, a
+UK-heavy country mix, zero-price and missing-description lines, bulk
+outlier quantities and a small share of exact duplicate lines.
+
+    python benchmarks/synthetic_retail.py data/raw/online_retail_II.csv --rows 1000000
+"""
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+START = pd.Timestamp("2009-12-01")
+END = pd.Timestamp("2011-12-10")
+
+CHUNKSIZE = 500_000
+LINES_PER_INVOICE = 20
+CANCEL_RATE = 0.02
+MISSING_CUSTOMER_RATE = 0.22
+MISSING_DESCRIPTION_RATE = 0.004
+ZERO_PRICE_RATE = 0.003
+BULK_QUANTITY_RATE = 0.005
+DUPLICATE_RATE = 0.01
+
+COUNTRIES = ["United Kingdom", "Germany", "France", "EIRE", "Spain", "Netherlands",
+             "Belgium", "Switzerland", "Portugal", "Australia"]
+COUNTRY_WEIGHTS = [0.90, 0.02, 0.02, 0.02, 0.01, 0.01, 0.005, 0.005, 0.005, 0.005]
+
+
+def _zipf_weights(n, exponent, rng):
+    weights = 1.0 / np.arange(1, n + 1) ** exponent
+    rng.shuffle(weights)
+    return weights / weights.sum()
+
+
+class RetailCatalog:
+    """
+    Customers and products, sized from the total row count.
+    """
+    def __init__(self, rows, rng):
+        # ~1M rows / ~5.9k customers / ~4.6k products in the real export
+        self.n_customers = max(100, rows // 170)
+        self.n_products = int(min(5000, max(200, rows // 50)))
+
+        self.customer_ids = 12346 + rng.permutation(self.n_customers * 2)[:self.n_customers]
+        self.customer_weights = _zipf_weights(self.n_customers, 0.9, rng)
+        self.customer_country = rng.choice(COUNTRIES, self.n_customers, p=COUNTRY_WEIGHTS)
+
+        codes = 10000 + rng.permutation(80000)[:self.n_products]
+        suffixes = np.where(rng.random(self.n_products) < 0.15, "A", "")
+        self.stock_codes = np.char.add(codes.astype(str), suffixes)
+        self.descriptions = np.char.add("PRODUCT ", self.stock_codes)
+        self.product_weights = _zipf_weights(self.n_products, 0.8, rng)
+        self.prices = np.round(rng.lognormal(0.9, 0.8, self.n_products), 2)
+
+
+def _invoice_times(n, start, end, rng):
+    # Trading hours 07:00-20:00, busier towards the autumn peak
+    days = rng.uniform(0, (end - start).days, n)
+    month = (start + pd.to_timedelta(days, unit="D")).month.to_numpy()
+    keep = rng.random(n) < (0.6 + 0.4 * (month >= 9))
+    days = np.where(keep, days, rng.uniform(0, (end - start).days, n))
+
+    minutes = np.floor(days).astype(np.int64) * 24 * 60 + rng.integers(7 * 60, 20 * 60, n)
+    return start + pd.to_timedelta(np.sort(minutes), unit="min")
+
+
+def generate_chunks(rows, seed=0, chunksize=CHUNKSIZE):
+    """
+    Yields raw transaction frames totalling ~`rows` lines, in time order.
+    """
+    rng = np.random.default_rng(seed)
+    catalog = RetailCatalog(rows, rng)
+
+    n_chunks = max(1, -(-rows // chunksize))
+    span = (END - START) / n_chunks
+    next_invoice = 489434
+
+    for chunk in range(n_chunks):
+        target = rows // n_chunks + (chunk < rows % n_chunks)
+        n_invoices = max(1, target // LINES_PER_INVOICE)
+
+        lines = rng.geometric(1 / LINES_PER_INVOICE, n_invoices)
+        lines = np.maximum(1, np.round(lines * target / lines.sum()).astype(np.int64))
+
+        start = START + span * chunk
+        invoice_dates = _invoice_times(n_invoices, start, start + span, rng)
+
+        invoice_customer = rng.choice(catalog.n_customers, n_invoices, p=catalog.customer_weights)
+        invoice_no = (next_invoice + np.arange(n_invoices)).astype(str)
+        next_invoice += n_invoices
+
+        cancelled = rng.random(n_invoices) < CANCEL_RATE
+        invoice_no = np.where(cancelled, np.char.add("C", invoice_no), invoice_no)
+
+        customer_id = catalog.customer_ids[invoice_customer].astype(float)
+        customer_id[rng.random(n_invoices) < MISSING_CUSTOMER_RATE] = np.nan
+
+        # Invoice attributes repeated for each of its lines
+        line_invoice = np.repeat(np.arange(n_invoices), lines)
+        n = len(line_invoice)
+
+        product = rng.choice(catalog.n_products, n, p=catalog.product_weights)
+
+        quantity = rng.choice([1, 2, 3, 4, 6, 12, 24, 48], n,
+                              p=[0.2, 0.2, 0.1, 0.1, 0.15, 0.15, 0.07, 0.03])
+        quantity[rng.random(n) < BULK_QUANTITY_RATE] = rng.integers(500, 5000)
+        quantity = np.where(cancelled[line_invoice], -quantity, quantity)
+
+        price = catalog.prices[product]
+        price = np.where(rng.random(n) < ZERO_PRICE_RATE, 0.0, price)
+
+        description = catalog.descriptions[product].astype(object)
+        description[rng.random(n) < MISSING_DESCRIPTION_RATE] = None
+
+        df = pd.DataFrame({
+            "Invoice": invoice_no[line_invoice],
+            "StockCode": catalog.stock_codes[product],
+            "Description": description,
+            "Quantity": quantity,
+            "InvoiceDate": invoice_dates[line_invoice].strftime("%Y-%m-%d %H:%M:%S"),
+            "Price": price,
+            "Customer ID": customer_id[line_invoice],
+            "Country": catalog.customer_country[invoice_customer][line_invoice],
+        })
+
+        # Exact duplicate lines right after their originals, as in the export
+        duplicated = np.flatnonzero(rng.random(len(df)) < DUPLICATE_RATE)
+        order = np.sort(np.concatenate([np.arange(len(df)), duplicated]), kind="stable")
+        df = df.iloc[order].reset_index(drop=True)
+
+        yield df
+
+
+def write_csv(path, rows, seed=0, chunksize=CHUNKSIZE):
+    """
+    Writes the synthetic export as latin1 CSV; returns the row count.
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    written = 0
+
+    for i, chunk in enumerate(generate_chunks(rows, seed, chunksize)):
+        chunk.to_csv(path, index=False, header=i == 0, mode="w" if i == 0 else "a",
+                     encoding="latin1")
+        written += len(chunk)
+
+    return written
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Synthetic Online Retail II export")
+    parser.add_argument("output_path")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--chunksize", type=int, default=CHUNKSIZE)
+    args = parser.parse_args()
+
+    written = write_csv(args.output_path, args.rows, args.seed, args.chunksize)
+    print(f"Wrote {written:,} rows to {args.output_path}")
@@ -1,7 +1,14 @@
 import pandas as pd
+import json
 import os
+import sys
 from datetime import datetime
 
+# Allow running as `python src/01_data_acquisition.py` from the repo root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.schema import RAW_SCHEMA, apply_schema, memory_report
+
 RAW_DATA_PATH = "data/raw/online_retail.csv"
 
 def download_dataset():
@@ -51,9 +58,27 @@ def generate_data_profile():
         f.write(str(df.dtypes))
         f.write("\n\nMemory Usage:\n")
         f.write(str(df.memory_usage(deep=True)))
+
+        # Same data under the compact dtype plan
+        compact = apply_schema(df, RAW_SCHEMA)
+        report = memory_report(df, compact)
+
+        f.write("\n\nCompact Column Info:\n")
+        f.write(str(compact.dtypes))
+        f.write("\n\nCompact Memory Usage:\n")
+        f.write(str(compact.memory_usage(deep=True)))
+        f.write(
+            f"\n\nTotal Memory: {report['bytes_before']:,} bytes -> "
+            f"{report['bytes_after']:,} bytes "
+            f"({report['bytes_per_row_before']} -> "
+            f"{report['bytes_per_row_after']} bytes/row)\n"
+        )
         f.write("\n\nSample Data:\n")
         f.write(str(df.head()))
 
+    with open("data/raw/memory_report.json", "w") as f:
+        json.dump(report, f, indent=4)
+
     print(f"Data profile saved to {profile_path}")
 
 if __name__ == "__main__":
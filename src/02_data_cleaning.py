@@ -1,23 +1,136 @@
 import pandas as pd
 import numpy as np
+import argparse
 import json
 import os
+import sys
+
+# Allow running as `python src/02_data_cleaning.py` from the repo root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from src.storage import write_table
+from src.sketches import KLLSketch
+from src.dedup import FingerprintSet, fingerprint_rows
+from src.schema import apply_schema, memory_report
+from src.instrumentation import Instrumentation, instrumented_step
+
+CLEANED_PATH = "data/processed/cleaned_transactions.parquet"
+STATS_PATH = "data/processed/cleaning_statistics.json"
+
+COLUMN_NAMES = {
+    "Invoice": "InvoiceNo",
+    "Price": "UnitPrice",
+    "Customer ID": "CustomerID"
+}
+
+# Fixed dtypes for streamed chunks, so every chunk (and every row hash
+# used for deduplication) sees the same types regardless of chunk content
+STREAM_DTYPES = {
+    "Invoice": str,
+    "StockCode": str,
+    "Description": str,
+    "Country": str,
+    "Customer ID": float
+}
+
+OUTLIER_COLUMNS = ["Quantity", "UnitPrice"]
+
+
+def iqr_bounds(Q1, Q3):
+    IQR = Q3 - Q1
+    return Q1 - 1.5 * IQR, Q3 + 1.5 * IQR
+
+
+def compute_outlier_bounds(df, quantile_error=None):
+    """
+    IQR bounds per column, each computed after the previous column's filter.
+
+    With quantile_error set, quartiles come from a KLL sketch instead of
+    an exact sort.
+    """
+    bounds = {}
+
+    for col in OUTLIER_COLUMNS:
+        if quantile_error is None:
+            Q1 = df[col].quantile(0.25)
+            Q3 = df[col].quantile(0.75)
+        else:
+            sketch = KLLSketch(quantile_error).update(df[col].to_numpy())
+            Q1 = sketch.quantile(0.25)
+            Q3 = sketch.quantile(0.75)
+
+        lower, upper = iqr_bounds(Q1, Q3)
+
+        bounds[col] = (lower, upper)
+        df = df[(df[col] >= lower) & (df[col] <= upper)]
+
+    return bounds
+
+
+def outlier_mask(df, bounds):
+    keep = np.ones(len(df), dtype=bool)
+
+    for col, (lower, upper) in bounds.items():
+        keep &= ((df[col] >= lower) & (df[col] <= upper)).to_numpy()
+
+    return keep
+
+
+def quantile_report(values, bounds, quantile_error):
+    """
+    Compares sketch bounds with exact ones over the same values.
+    """
+    exact = compute_outlier_bounds(values)
+
+    return {
+        "error": quantile_error,
+        "bounds": {col: list(b) for col, b in bounds.items()},
+        "exact_bounds": {col: list(b) for col, b in exact.items()},
+        "rows_kept_differently": int(
+            (outlier_mask(values, bounds) != outlier_mask(values, exact)).sum()
+        )
+    }
+
 
 class DataCleaner:
-    def __init__(self, input_path):
+    def __init__(
+        self,
+        input_path,
+        chunksize=None,
+        quantile_error=None,
+        verify_quantiles=False,
+        dedup_max_in_memory=None,
+        trace_path=None
+    ):
         self.input_path = input_path
-        self.df = pd.read_csv(input_path, encoding="latin1")
+        self.chunksize = chunksize
 
-        # -----------------------------
-        # STANDARDIZE COLUMN NAMES
-        # -----------------------------
-        self.df.rename(columns={
-            "Invoice": "InvoiceNo",
-            "Price": "UnitPrice",
-            "Customer ID": "CustomerID"
-        }, inplace=True)
+        # Per-step timing/memory, saved with the statistics; optional
+        # Chrome trace of every step call
+        self.instrumentation = Instrumentation()
+        self.trace_path = trace_path
 
-        self.original_rows = len(self.df)
+        # Approximate IQR quartiles with a KLL sketch of this rank error
+        self.quantile_error = quantile_error
+
+        # Compare the sketch bounds with exact quartiles (both modes; streaming
+        # keeps the outlier columns for it)
+        self.verify_quantiles = verify_quantiles
+
+        # Row fingerprints held in RAM before spilling to disk when streaming
+        self.dedup_max_in_memory = dedup_max_in_memory
+
+        if chunksize is None:
+            self.read_input()
+
+            self.original_rows = len(self.df)
+        else:
+            # Streaming mode: rows are read chunk by chunk in run_pipeline
+            self.df = None
+            self.original_rows = 0
 
         self.stats = {
             "original_rows": self.original_rows,
@@ -29,126 +142,112 @@ class DataCleaner:
             "steps_applied": []
         }
 
-    # -----------------------------
-    # STEP 1: Missing CustomerID
-    # -----------------------------
-    def remove_missing_customer_ids(self):
-        before = len(self.df)
+    @instrumented_step(rows_out="df")
+    def read_input(self):
+        self.df = pd.read_csv(self.input_path, encoding="latin1")
 
-        self.stats["missing_values_before"]["CustomerID"] = int(
-            self.df["CustomerID"].isnull().sum()
-        )
+        # -----------------------------
+        # STANDARDIZE COLUMN NAMES
+        # -----------------------------
+        self.df.rename(columns=COLUMN_NAMES, inplace=True)
 
-        self.df = self.df.dropna(subset=["CustomerID"])
+    def _record_step(self, step, removed):
+        # Streamed chunks run every step many times; counts accumulate
+        for entry in self.stats["steps_applied"]:
+            if entry["step"] == step:
+                entry["rows_removed"] += removed
+                return
 
-        removed = before - len(self.df)
         self.stats["steps_applied"].append({
-            "step": "remove_missing_customer_ids",
+            "step": step,
             "rows_removed": removed
         })
 
+    def _record_missing(self, column, rows):
+        # Missing values among the rows still kept when the step runs
+        missing = self.stats["missing_values_before"]
+        missing[column] = missing.get(column, 0) + int(
+            np.count_nonzero(rows & self.df[column].isnull().to_numpy())
+        )
+
+    # Steps 1-5 only flag rows; apply_row_filters() combines the flags and
+    # copies the surviving rows once, instead of one new frame per step
+
     # -----------------------------
-    # STEP 2: Remove Cancelled Invoices
+    # STEP 1: Missing CustomerID
     # -----------------------------
-    def remove_cancelled_invoices(self):
-        before = len(self.df)
+    def missing_customer_ids(self):
+        return self.df["CustomerID"].isnull().to_numpy()
 
-        self.df["InvoiceNo"] = self.df["InvoiceNo"].astype(str)
-        self.df = self.df[~self.df["InvoiceNo"].str.startswith("C")]
-
-        removed = before - len(self.df)
-        self.stats["steps_applied"].append({
-            "step": "remove_cancelled_invoices",
-            "rows_removed": removed
-        })
+    # -----------------------------
+    # STEP 2: Remove Cancelled Invoices
+    # -----------------------------
+    def cancelled_invoices(self):
+        return self.df["InvoiceNo"].astype(str).str.startswith("C").to_numpy()
 
     # -----------------------------
     # STEP 3: Remove Negative Quantities
     # -----------------------------
-    def remove_negative_quantities(self):
-        before = len(self.df)
-
-        self.df = self.df[self.df["Quantity"] > 0]
-
-        removed = before - len(self.df)
-        self.stats["steps_applied"].append({
-            "step": "remove_negative_quantities",
-            "rows_removed": removed
-        })
+    def negative_quantities(self):
+        return ~(self.df["Quantity"] > 0).to_numpy()
 
     # -----------------------------
     # STEP 4: Remove Zero or Negative Prices
     # -----------------------------
-    def remove_invalid_prices(self):
-        before = len(self.df)
-
-        self.df = self.df[self.df["UnitPrice"] > 0]
-
-        removed = before - len(self.df)
-        self.stats["steps_applied"].append({
-            "step": "remove_invalid_prices",
-            "rows_removed": removed
-        })
+    def invalid_prices(self):
+        return ~(self.df["UnitPrice"] > 0).to_numpy()
 
     # -----------------------------
     # STEP 5: Remove Missing Descriptions
     # -----------------------------
-    def remove_missing_descriptions(self):
-        before = len(self.df)
-
-        self.stats["missing_values_before"]["Description"] = int(
-            self.df["Description"].isnull().sum()
-        )
-
-        self.df = self.df.dropna(subset=["Description"])
-
-        removed = before - len(self.df)
-        self.stats["steps_applied"].append({
-            "step": "remove_missing_descriptions",
-            "rows_removed": removed
-        })
+    def missing_descriptions(self):
+        return self.df["Description"].isnull().to_numpy()
 
     # -----------------------------
     # STEP 6: Remove Outliers (IQR)
     # -----------------------------
-    def remove_outliers(self):
+    @instrumented_step("df")
+    def remove_outliers(self, bounds=None):
         before = len(self.df)
 
-        for col in ["Quantity", "UnitPrice"]:
-            Q1 = self.df[col].quantile(0.25)
-            Q3 = self.df[col].quantile(0.75)
-            IQR = Q3 - Q1
+        # Streaming mode passes bounds computed over the whole dataset
+        if bounds is None:
+            bounds = compute_outlier_bounds(self.df, self.quantile_error)
 
-            lower = Q1 - 1.5 * IQR
-            upper = Q3 + 1.5 * IQR
+            # The exact check sorts both columns, which the sketch avoids
+            if self.quantile_error is not None and self.verify_quantiles:
+                self.stats["quantile_sketch"] = quantile_report(
+                    self.df[OUTLIER_COLUMNS], bounds, self.quantile_error
+                )
 
-            self.df = self.df[
-                (self.df[col] >= lower) & (self.df[col] <= upper)
-            ]
+        # One combined mask, so the frame is copied once for both columns
+        self.df = self.df[outlier_mask(self.df, bounds)]
 
         removed = before - len(self.df)
-        self.stats["steps_applied"].append({
-            "step": "remove_outliers",
-            "rows_removed": removed
-        })
+        self._record_step("remove_outliers", removed)
 
     # -----------------------------
     # STEP 7: Remove Duplicates
     # -----------------------------
-    def remove_duplicates(self):
+    @instrumented_step("df")
+    def remove_duplicates(self, seen=None):
         before = len(self.df)
 
-        self.df = self.df.drop_duplicates()
+        if seen is None:
+            self.df = self.df.drop_duplicates()
+        else:
+            # Streaming mode: drop rows whose fingerprint was seen in this or
+            # an earlier chunk, keeping the first occurrence like drop_duplicates
+            keep = seen.add(fingerprint_rows(self.df))
+            self.df = self.df[keep]
 
         removed = before - len(self.df)
-        self.stats["steps_applied"].append({
-            "step": "remove_duplicates",
-            "rows_removed": removed
-        })
+        self._record_step("remove_duplicates", removed)
 
     # -----------------------------
     # STEP 8: Add Derived Columns
     # -----------------------------
+    @instrumented_step("df")
     def add_derived_columns(self):
         self.df["InvoiceDate"] = pd.to_datetime(self.df["InvoiceDate"])
 
@@ -164,55 +263,328 @@ class DataCleaner:
     # -----------------------------
     # STEP 9: Convert Data Types
     # -----------------------------
+    @instrumented_step("df")
     def convert_data_types(self):
         self.df["CustomerID"] = self.df["CustomerID"].astype(int)
 
+        # Compact dtype plan: categoricals, int8/int16 calendar fields,
+        # int32 CustomerID
+        before = self.df
+        self.df = apply_schema(self.df)
+
+        # Streamed chunks are bounded already; report on full frames only
+        if self.chunksize is None:
+            self.stats["memory_usage"] = memory_report(before, self.df)
+
     # -----------------------------
     # Save Outputs
     # -----------------------------
-    def save_outputs(self):
+    @instrumented_step("df")
+    def save_outputs(self, export_csv=False):
         os.makedirs("data/processed", exist_ok=True)
 
-        self.stats["rows_after_cleaning"] = len(self.df)
-        self.stats["rows_removed"] = self.original_rows - len(self.df)
+        # Typed columnar output; CSV copy only on request
+        write_table(self.df, CLEANED_PATH, export_csv=export_csv)
+
+        self.save_statistics(
+            len(self.df),
+            self.df.isnull().sum().to_dict()
+        )
+
+    def save_statistics(self, rows_after_cleaning, missing_values_after):
+        self.stats["original_rows"] = self.original_rows
+        self.stats["rows_after_cleaning"] = rows_after_cleaning
+        self.stats["rows_removed"] = self.original_rows - rows_after_cleaning
         self.stats["retention_rate"] = round(
-            (len(self.df) / self.original_rows) * 100, 2
+            (rows_after_cleaning / self.original_rows) * 100, 2
         )
 
-        self.stats["missing_values_after"] = self.df.isnull().sum().to_dict()
+        self.stats["missing_values_after"] = missing_values_after
 
-        self.df.to_csv(
-            "data/processed/cleaned_transactions.csv",
-            index=False
-        )
+        self._write_statistics()
+
+    def save_instrumentation(self):
+        self.stats["instrumentation"] = self.instrumentation.report()
+        self._write_statistics()
+
+        if self.trace_path is not None:
+            self.instrumentation.write_chrome_trace(self.trace_path)
 
-        with open(
-            "data/processed/cleaning_statistics.json",
-            "w"
-        ) as f:
+    def _write_statistics(self):
+        with open(STATS_PATH, "w") as f:
             json.dump(self.stats, f, indent=4)
 
+    # -----------------------------
+    # Row-level Filters (Steps 1-5)
+    # -----------------------------
+    # Step name, flag method, column whose missing values are recorded
+    ROW_FILTERS = [
+        ("remove_missing_customer_ids", "missing_customer_ids", "CustomerID"),
+        ("remove_cancelled_invoices", "cancelled_invoices", None),
+        ("remove_negative_quantities", "negative_quantities", None),
+        ("remove_invalid_prices", "invalid_prices", None),
+        ("remove_missing_descriptions", "missing_descriptions", "Description"),
+    ]
+
+    @instrumented_step("df")
+    def apply_row_filters(self, steps=None):
+        """
+        Applies the ROW_FILTERS named in steps (default: all of them).
+        """
+        keep = np.ones(len(self.df), dtype=bool)
+
+        # Counts keep the sequential semantics: a step is only charged for
+        # rows that survived the steps before it
+        for step, flag, missing_column in self.ROW_FILTERS:
+            if steps is not None and step not in steps:
+                continue
+
+            if missing_column is not None:
+                self._record_missing(missing_column, keep)
+
+            removed = keep & getattr(self, flag)()
+            self._record_step(step, int(np.count_nonzero(removed)))
+            keep &= ~removed
+
+        self.df = self.df.take(np.flatnonzero(keep))
+        self.df["InvoiceNo"] = self.df["InvoiceNo"].astype(str)
+
+    # One filter at a time, for callers running steps 1-5 individually;
+    # run_pipeline applies them together
+    def remove_missing_customer_ids(self):
+        self.apply_row_filters(["remove_missing_customer_ids"])
+
+    def remove_cancelled_invoices(self):
+        self.apply_row_filters(["remove_cancelled_invoices"])
+
+    def remove_negative_quantities(self):
+        self.apply_row_filters(["remove_negative_quantities"])
+
+    def remove_invalid_prices(self):
+        self.apply_row_filters(["remove_invalid_prices"])
+
+    def remove_missing_descriptions(self):
+        self.apply_row_filters(["remove_missing_descriptions"])
+
     # -----------------------------
     # Run Full Pipeline
     # -----------------------------
     def run_pipeline(self):
-        self.remove_missing_customer_ids()
-        self.remove_cancelled_invoices()
-        self.remove_negative_quantities()
-        self.remove_invalid_prices()
-        self.remove_missing_descriptions()
+        if self.chunksize is not None:
+            return self.run_streaming_pipeline()
+
+        self.apply_row_filters()
         self.remove_outliers()
         self.remove_duplicates()
         self.add_derived_columns()
         self.convert_data_types()
         self.save_outputs()
+        self.save_instrumentation()
 
         print("Data cleaning pipeline completed successfully!")
         print(f"Final dataset shape: {self.df.shape}")
 
         return self.df
 
+    # -----------------------------
+    # Streaming Pipeline
+    # -----------------------------
+    @instrumented_step("df")
+    def _write_chunk(self, writer, path):
+        # Empty chunks are skipped so the file schema comes from real rows
+        if len(self.df) == 0:
+            return writer
+
+        table = pa.Table.from_pandas(self.df, preserve_index=False)
+
+        if writer is None:
+            # Chunks pick different dictionary index widths for their
+            # categoricals; fix them to int32 so every chunk casts alike
+            schema = pa.schema(
+                [
+                    pa.field(f.name, pa.dictionary(pa.int32(), f.type.value_type))
+                    if pa.types.is_dictionary(f.type) else f
+                    for f in table.schema
+                ],
+                metadata=table.schema.metadata
+            )
+            writer = pq.ParquetWriter(path, schema)
+            table = table.cast(schema)
+        else:
+            table = table.cast(writer.schema)
+
+        writer.write_table(table)
+        return writer
+
+    def _sketch_outlier_bounds(self, stage_path, quantity_sketch):
+        bounds = {"Quantity": iqr_bounds(
+            quantity_sketch.quantile(0.25),
+            quantity_sketch.quantile(0.75)
+        )}
+
+        # UnitPrice quartiles only count rows inside the Quantity bounds,
+        # so they need a second (projected) read of the staging file
+        price_sketch = KLLSketch(self.quantile_error)
+
+        for batch in pq.ParquetFile(stage_path).iter_batches(
+            batch_size=self.chunksize,
+            columns=OUTLIER_COLUMNS
+        ):
+            values = batch.to_pandas()
+            values = values[outlier_mask(values, bounds)]
+            price_sketch.update(values["UnitPrice"].to_numpy())
+
+        bounds["UnitPrice"] = iqr_bounds(
+            price_sketch.quantile(0.25),
+            price_sketch.quantile(0.75)
+        )
+
+        return bounds
+
+    def run_streaming_pipeline(self):
+        """
+        Cleans the input chunk by chunk without loading it into memory.
+
+        Pass 1 applies the row-level filters and spills survivors to a
+        staging file, keeping only Quantity and UnitPrice for the IQR
+        bounds (or only a quantile sketch when quantile_error is set).
+        Pass 2 applies those bounds, drops duplicates against a set of
+        64-bit row fingerprints (spilled to disk past dedup_max_in_memory),
+        adds derived columns and appends each chunk to the output file.
+        """
+        os.makedirs("data/processed", exist_ok=True)
+        stage_path = CLEANED_PATH + ".stage"
+
+        # -----------------------------
+        # PASS 1: Row-level filters
+        # -----------------------------
+        outlier_values = []
+        quantity_sketch = None
+        if self.quantile_error is not None:
+            quantity_sketch = KLLSketch(self.quantile_error)
+
+        writer = None
+
+        for chunk in pd.read_csv(
+            self.input_path,
+            encoding="latin1",
+            dtype=STREAM_DTYPES,
+            chunksize=self.chunksize
+        ):
+            self.df = chunk.rename(columns=COLUMN_NAMES)
+            self.original_rows += len(self.df)
+
+            self.apply_row_filters()
+
+            if quantity_sketch is None or self.verify_quantiles:
+                outlier_values.append(self.df[OUTLIER_COLUMNS])
+            if quantity_sketch is not None:
+                quantity_sketch.update(self.df["Quantity"].to_numpy())
+
+            writer = self._write_chunk(writer, stage_path)
+
+        if writer is None:
+            raise ValueError("No rows left after the row-level filters")
+
+        writer.close()
+
+        if quantity_sketch is None:
+            bounds = compute_outlier_bounds(pd.concat(outlier_values))
+        else:
+            bounds = self._sketch_outlier_bounds(stage_path, quantity_sketch)
+
+            if self.verify_quantiles:
+                self.stats["quantile_sketch"] = quantile_report(
+                    pd.concat(outlier_values), bounds, self.quantile_error
+                )
+
+        del outlier_values
+
+        # -----------------------------
+        # PASS 2: Global steps + derived columns
+        # -----------------------------
+        seen = FingerprintSet(
+            max_in_memory=self.dedup_max_in_memory,
+            spill_dir="data/processed"
+        )
+        writer = None
+        rows_after_cleaning = 0
+        missing_values_after = {}
+
+        for batch in pq.ParquetFile(stage_path).iter_batches(
+            batch_size=self.chunksize
+        ):
+            self.df = batch.to_pandas()
+
+            self.remove_outliers(bounds)
+            self.remove_duplicates(seen)
+            self.add_derived_columns()
+            self.convert_data_types()
+
+            rows_after_cleaning += len(self.df)
+            for col, count in self.df.isnull().sum().items():
+                missing_values_after[col] = (
+                    missing_values_after.get(col, 0) + int(count)
+                )
+
+            writer = self._write_chunk(writer, CLEANED_PATH)
+
+        if writer is not None:
+            writer.close()
+
+        os.remove(stage_path)
+
+        self.stats["deduplication"] = seen.report()
+        seen.close()
+
+        self.save_statistics(rows_after_cleaning, missing_values_after)
+        self.save_instrumentation()
+
+        print("Streaming data cleaning pipeline completed successfully!")
+        print(f"Rows after cleaning: {rows_after_cleaning}")
+
+        return self.stats
+
 
 if __name__ == "__main__":
-    cleaner = DataCleaner("data/raw/online_retail.csv")
+    parser = argparse.ArgumentParser(description="Clean raw transactions")
+    parser.add_argument(
+        "--chunksize",
+        type=int,
+        default=None,
+        help="Stream the input in chunks of this many rows"
+    )
+    parser.add_argument(
+        "--quantile-error",
+        type=float,
+        default=None,
+        help="Use a KLL sketch with this rank error for the IQR quartiles"
+    )
+    parser.add_argument(
+        "--dedup-max-in-memory",
+        type=int,
+        default=None,
+        help="Row fingerprints kept in RAM before spilling to disk"
+    )
+    parser.add_argument(
+        "--verify-quantiles",
+        action="store_true",
+        help="Report rows the sketch bounds keep differently from exact ones"
+    )
+    parser.add_argument(
+        "--trace",
+        default=None,
+        metavar="PATH",
+        help="Write a Chrome trace (JSON) of every pipeline step"
+    )
+    args = parser.parse_args()
+
+    cleaner = DataCleaner(
+        "data/raw/online_retail.csv",
+        chunksize=args.chunksize,
+        quantile_error=args.quantile_error,
+        verify_quantiles=args.verify_quantiles,
+        dedup_max_in_memory=args.dedup_max_in_memory,
+        trace_path=args.trace
+    )
     cleaner.run_pipeline()
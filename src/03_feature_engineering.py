@@ -1,24 +1,92 @@
 import pandas as pd
 import numpy as np
+import argparse
 import json
 import os
+import sys
+
+# Allow running as `python src/03_feature_engineering.py` from the repo root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.storage import read_table, write_table
+from src.schema import apply_schema
+from src.feature_store import FeatureStore, STORE_PATH
+from src.snapshots import backfill_snapshots, SNAPSHOTS_PATH
+from src.dashboard_summary import build_summary, save_summary, SUMMARY_PATH
+from src.instrumentation import Instrumentation, instrumented_step
+from src.feature_specs import (
+    CHURN_WINDOW_MONTHS,
+    plan_aggregates,
+    compile_aggregates,
+    compile_aggregates_parallel,
+    add_row_flags,
+    rfm_features,
+    behavioral_features,
+    temporal_features,
+    product_features,
+    engagement_features,
+    engagement_scores,
+    engagement_score,
+    advanced_features,
+    attach,
+    fit_global_stats,
+    save_global_stats,
+)
+
+FEATURES_PATH = "data/processed/customer_features.parquet"
+STATS_PATH = "data/processed/feature_statistics.json"
+
+# Only the transaction columns the feature stages read
+TRANSACTION_COLUMNS = [
+    "InvoiceNo",
+    "StockCode",
+    "Quantity",
+    "InvoiceDate",
+    "CustomerID",
+    "TotalPrice",
+    "Month",
+    "DayOfWeek",
+    "Hour"
+]
+
 
 class FeatureEngineer:
-    def __init__(self, input_path):
-        self.df = pd.read_csv(input_path)
-        self.df["InvoiceDate"] = pd.to_datetime(self.df["InvoiceDate"])
+    def __init__(self, input_path, workers=1, trace_path=None):
+        # Processes for the per-customer aggregation (1 = serial)
+        self.workers = workers
+
+        # Per-step timing/memory (STATS_PATH) and optional Chrome trace
+        self.instrumentation = Instrumentation()
+        self.trace_path = trace_path
 
+        self.input_path = input_path
+        self.read_input()
+
+        self.snapshot_date = None
+        self.global_stats = None
+        self.aggregates = None
         self.features = None
 
+    @instrumented_step(rows_out="df")
+    def read_input(self):
+        # Parquet inputs are already compact; CSV inputs get the same plan
+        self.df = apply_schema(
+            read_table(self.input_path, columns=TRANSACTION_COLUMNS)
+        )
+
+    @instrumented_step("df")
     def define_time_windows(self):
         self.max_date = self.df["InvoiceDate"].max()
-        self.churn_window_start = self.max_date - pd.DateOffset(months=3)
+        self.churn_window_start = self.max_date - pd.DateOffset(
+            months=CHURN_WINDOW_MONTHS
+        )
         self.observation_window_end = self.churn_window_start
 
         print("Max Date:", self.max_date)
         print("Observation Window End:", self.observation_window_end)
         print("Churn Window Start:", self.churn_window_start)
 
+    @instrumented_step("df", "observation_df")
     def split_data(self):
         self.observation_df = self.df[
             self.df["InvoiceDate"] < self.observation_window_end
@@ -31,13 +99,38 @@ class FeatureEngineer:
         print("Observation shape:", self.observation_df.shape)
         print("Churn window shape:", self.churn_df.shape)
 
+    @instrumented_step("observation_df", "aggregates")
+    def compute_aggregates(self):
+        print("\nComputing customer aggregates...")
+
+        self.snapshot_date = self.observation_df["InvoiceDate"].max()
+
+        # One grouped pass per key instead of a groupby per feature stage
+        if self.workers > 1:
+            self.aggregates = compile_aggregates_parallel(
+                add_row_flags(self.observation_df),
+                plan_aggregates(),
+                self.workers
+            )
+        else:
+            self.aggregates = compile_aggregates(
+                add_row_flags(self.observation_df),
+                plan_aggregates()
+            )
+
+        print("Customers aggregated:", len(self.aggregates))
+
+    def _attach(self, columns):
+        attach(self.features, columns)
+
+    @instrumented_step("aggregates", "features")
     def create_churn_label(self):
         customers_in_churn = self.churn_df["CustomerID"].unique()
 
         # Create base customer dataframe from observation window
-        self.features = self.observation_df.groupby("CustomerID").agg({
-            "InvoiceDate": "max"
-        }).reset_index()
+        self.features = pd.DataFrame({
+            "CustomerID": self.aggregates.index.to_numpy()
+        })
 
         # Churn label
         self.features["churn"] = np.where(
@@ -48,358 +141,80 @@ class FeatureEngineer:
 
         print("Churn distribution:")
         print(self.features["churn"].value_counts(normalize=True))
-        self.features = self.features.drop(columns=["InvoiceDate"])
 
 
+    @instrumented_step("features")
     def create_rfm_features(self):
         print("\nCreating RFM features...")
 
-        snapshot_date = self.observation_df["InvoiceDate"].max()
-
-        rfm = self.observation_df.groupby("CustomerID").agg({
-            "InvoiceDate": lambda x: (snapshot_date - x.max()).days,
-            "InvoiceNo": "nunique",
-            "TotalPrice": "sum",
-            "Quantity": "sum"
-        }).reset_index()
-
-        rfm.columns = [
-            "CustomerID",
-            "Recency",
-            "Frequency",
-            "Monetary",
-            "TotalQuantity"
-        ]
-
-        # Average Order Value
-        avg_order_value = self.observation_df.groupby("CustomerID").agg({
-            "TotalPrice": "sum",
-            "InvoiceNo": "nunique"
-        })
-
-        avg_order_value["AvgOrderValue"] = (
-            avg_order_value["TotalPrice"] / avg_order_value["InvoiceNo"]
-        )
-
-        avg_order_value = avg_order_value[["AvgOrderValue"]].reset_index()
-
-        # Merge RFM features
-        self.features = self.features.merge(rfm, on="CustomerID", how="left")
-        self.features = self.features.merge(avg_order_value, on="CustomerID", how="left")
+        self._attach(rfm_features(self.aggregates, self.snapshot_date))
 
         print("RFM features created.")
 
+    @instrumented_step("features")
     def create_behavioral_features(self):
         print("\nCreating Behavioral features...")
 
-        # First and last purchase
-        customer_dates = self.observation_df.groupby("CustomerID").agg({
-            "InvoiceDate": ["min", "max"],
-            "InvoiceNo": "nunique"
-        })
-
-        customer_dates.columns = [
-            "FirstPurchaseDate",
-            "LastPurchaseDate",
-            "TotalInvoices"
-        ]
-
-        customer_dates = customer_dates.reset_index()
-
-        # Customer lifetime
-        customer_dates["CustomerLifetimeDays"] = (
-            customer_dates["LastPurchaseDate"] -
-            customer_dates["FirstPurchaseDate"]
-        ).dt.days
-
-        # Avoid division by zero
-        customer_dates["AvgDaysBetweenPurchases"] = np.where(
-            customer_dates["TotalInvoices"] > 1,
-            customer_dates["CustomerLifetimeDays"] /
-            (customer_dates["TotalInvoices"] - 1),
-            0
-        )
-
-        # Purchase rate per month
-        customer_dates["PurchaseRatePerMonth"] = (
-            customer_dates["TotalInvoices"] /
-            (customer_dates["CustomerLifetimeDays"] / 30 + 1)
-        )
-
-        # Merge into main feature table
-        self.features = self.features.merge(
-            customer_dates[[
-                "CustomerID",
-                "TotalInvoices",
-                "CustomerLifetimeDays",
-                "AvgDaysBetweenPurchases",
-                "PurchaseRatePerMonth"
-            ]],
-            on="CustomerID",
-            how="left"
-        )
+        self._attach(behavioral_features(self.aggregates))
 
         print("Behavioral features created.")
 
+    @instrumented_step("features")
     def create_temporal_features(self):
         print("\nCreating Temporal features...")
 
-        df = self.observation_df.copy()
-
-        # Weekend flag
-        df["IsWeekend"] = df["DayOfWeek"].isin([5, 6]).astype(int)
-
-        # Evening flag (5PM to 10PM)
-        df["IsEvening"] = df["Hour"].between(17, 22).astype(int)
-
-        temporal = df.groupby("CustomerID").agg({
-            "IsWeekend": "mean",
-            "IsEvening": "mean",
-            "Month": "nunique",
-            "DayOfWeek": "nunique"
-        }).reset_index()
-
-        temporal.columns = [
-            "CustomerID",
-            "WeekendPurchaseRatio",
-            "EveningPurchaseRatio",
-            "UniqueActiveMonths",
-            "UniqueActiveDays"
-        ]
-
-        # Purchase variance across months
-        month_counts = df.groupby(["CustomerID", "Month"])["InvoiceNo"].nunique().reset_index()
-
-        month_var = month_counts.groupby("CustomerID")["InvoiceNo"].std().reset_index()
-        month_var.columns = ["CustomerID", "MonthlyPurchaseVariance"]
-
-        temporal = temporal.merge(month_var, on="CustomerID", how="left")
-
-        # Fill NaN variance with 0
-        temporal["MonthlyPurchaseVariance"] = temporal["MonthlyPurchaseVariance"].fillna(0)
-
-        self.features = self.features.merge(temporal, on="CustomerID", how="left")
+        self._attach(temporal_features(self.aggregates))
 
         print("Temporal features created.")
 
-    def save_final_features(self):
-        os.makedirs("data/processed", exist_ok=True)
+    @instrumented_step("features")
+    def save_final_features(self, export_csv=True):
+        # customer_features.csv is still what the notebooks read
+        write_table(self.features, FEATURES_PATH, export_csv=export_csv)
 
-        self.features.to_csv(
-            "data/processed/customer_features.csv",
-            index=False
-        )
+        # Scoring needs the same min/max, quartile edges and medians
+        if self.global_stats is not None:
+            save_global_stats(self.global_stats)
+
+        # Counts, histograms and churn breakdowns for the dashboard
+        save_summary(build_summary(self.features), SUMMARY_PATH)
 
         print("Final customer features saved.")
 
 
+    @instrumented_step("features")
     def create_product_features(self):
         print("\nCreating Product Diversity features...")
 
-        df = self.observation_df.copy()
-
-        # Unique products per customer
-        product_stats = df.groupby("CustomerID").agg({
-            "StockCode": "nunique",
-            "Quantity": "sum",
-            "InvoiceNo": "nunique"
-        }).reset_index()
-
-        product_stats.columns = [
-            "CustomerID",
-            "UniqueProducts",
-            "TotalQuantityCheck",
-            "TotalInvoicesCheck"
-        ]
-
-        # Product diversity ratio
-        product_stats["ProductDiversityRatio"] = (
-            product_stats["UniqueProducts"] /
-            product_stats["TotalInvoicesCheck"]
-        )
-
-        # Avg items per invoice
-        product_stats["AvgItemsPerInvoice"] = (
-            product_stats["TotalQuantityCheck"] /
-            product_stats["TotalInvoicesCheck"]
-        )
-
-        # Repeat purchase ratio
-        product_counts = df.groupby(["CustomerID", "StockCode"]).size().reset_index(name="Count")
-
-        repeat_stats = product_counts.groupby("CustomerID")["Count"].apply(
-            lambda x: (x > 1).mean()
-        ).reset_index()
-
-        repeat_stats.columns = ["CustomerID", "RepeatPurchaseRatio"]
-
-        product_stats = product_stats.merge(repeat_stats, on="CustomerID", how="left")
-
-        # Top product concentration
-        top_product = product_counts.groupby("CustomerID")["Count"].max().reset_index()
-        total_products = product_counts.groupby("CustomerID")["Count"].sum().reset_index()
-
-        top_product = top_product.merge(total_products, on="CustomerID")
-        top_product["TopProductConcentration"] = (
-            top_product["Count_x"] / top_product["Count_y"]
-        )
-
-        top_product = top_product[["CustomerID", "TopProductConcentration"]]
-
-        product_stats = product_stats.merge(top_product, on="CustomerID", how="left")
-
-        # Keep only final columns
-        product_stats = product_stats[[
-            "CustomerID",
-            "UniqueProducts",
-            "ProductDiversityRatio",
-            "AvgItemsPerInvoice",
-            "RepeatPurchaseRatio",
-            "TopProductConcentration"
-        ]]
-
-        self.features = self.features.merge(product_stats, on="CustomerID", how="left")
+        self._attach(product_features(self.aggregates))
 
         print("Product Diversity features created.")
 
+    @instrumented_step("features")
     def create_engagement_features(self):
         print("\nCreating Engagement features...")
 
-        df = self.observation_df.copy()
-
-        # Total active months
-        active_months = df.groupby("CustomerID")["Month"].nunique().reset_index()
-        active_months.columns = ["CustomerID", "ActiveMonths"]
-
-        revenue = df.groupby("CustomerID")["TotalPrice"].sum().reset_index()
-        revenue.columns = ["CustomerID", "TotalRevenue"]
-
-        quantity = df.groupby("CustomerID")["Quantity"].sum().reset_index()
-        quantity.columns = ["CustomerID", "TotalQuantityCheck2"]
-
-        invoices = df.groupby("CustomerID")["InvoiceNo"].nunique().reset_index()
-        invoices.columns = ["CustomerID", "TotalInvoicesCheck2"]
-
-        engagement = active_months.merge(revenue, on="CustomerID")
-        engagement = engagement.merge(quantity, on="CustomerID")
-        engagement = engagement.merge(invoices, on="CustomerID")
-
-        engagement["RevenuePerMonth"] = (
-            engagement["TotalRevenue"] / engagement["ActiveMonths"]
-        )
-
-        engagement["QuantityPerMonth"] = (
-            engagement["TotalQuantityCheck2"] / engagement["ActiveMonths"]
-        )
-
-        engagement["InvoiceFrequencyScore"] = (
-            engagement["TotalInvoicesCheck2"] / engagement["ActiveMonths"]
-        )
+        # Population statistics are fitted once and reused at inference
+        self.global_stats = fit_global_stats(self.features)
 
         # Normalize Recency & Monetary (min-max)
-        recency_min = self.features["Recency"].min()
-        recency_max = self.features["Recency"].max()
-
-        monetary_min = self.features["Monetary"].min()
-        monetary_max = self.features["Monetary"].max()
+        self._attach(engagement_scores(self.features, self.global_stats))
 
-        self.features["RecencyScore"] = (
-            (self.features["Recency"] - recency_min) /
-            (recency_max - recency_min + 1e-6)
-        )
-
-        self.features["MonetaryScore"] = (
-            (self.features["Monetary"] - monetary_min) /
-            (monetary_max - monetary_min + 1e-6)
-        )
-
-        engagement = engagement[[
-            "CustomerID",
-            "RevenuePerMonth",
-            "QuantityPerMonth",
-            "InvoiceFrequencyScore"
-        ]]
-
-        self.features = self.features.merge(engagement, on="CustomerID", how="left")
+        self._attach(engagement_features(self.aggregates))
 
         # Composite engagement score
-        self.features["EngagementScore"] = (
-            self.features["Frequency"] *
-            self.features["MonetaryScore"] *
-            (1 - self.features["RecencyScore"])
-        )
+        self.features["EngagementScore"] = engagement_score(self.features)
 
         print("Engagement features created.")
     
+    @instrumented_step("features")
     def create_advanced_features(self):
         print("\nCreating Advanced Interaction Features...")
 
-        df = self.features.copy()
-
-        # -------------------
-        # 1. RFM Quartile Scores (Robust Version)
-        # -------------------
-
-        df["R_Quartile"] = pd.qcut(
-            df["Recency"],
-            q=4,
-            labels=False,
-            duplicates="drop"
-        )
-
-        df["F_Quartile"] = pd.qcut(
-            df["Frequency"],
-            q=4,
-            labels=False,
-            duplicates="drop"
-        )
-
-        df["M_Quartile"] = pd.qcut(
-            df["Monetary"],
-            q=4,
-            labels=False,
-            duplicates="drop"
-        )
-
-        df["RFM_Score"] = (
-            df["R_Quartile"] +
-            df["F_Quartile"] +
-            df["M_Quartile"]
+        self.features = advanced_features(
+            self.features, self.global_stats, copy=False
         )
 
-
-        # -------------------
-        # 2. Interaction Features
-        # -------------------
-        df["Recency_Frequency"] = df["Recency"] * df["Frequency"]
-        df["Monetary_Frequency"] = df["Monetary"] * df["Frequency"]
-        df["Recency_Monetary"] = df["Recency"] * df["Monetary"]
-
-        # -------------------
-        # 3. Log Transformations
-        # -------------------
-        df["Log_Monetary"] = np.log1p(df["Monetary"])
-        df["Log_Frequency"] = np.log1p(df["Frequency"])
-        df["Log_Recency"] = np.log1p(df["Recency"])
-
-        # -------------------
-        # 4. Risk Flags
-        # -------------------
-        df["High_Recency_Flag"] = (df["Recency"] > df["Recency"].median()).astype(int)
-        df["Low_Frequency_Flag"] = (df["Frequency"] < df["Frequency"].median()).astype(int)
-        df["Low_Monetary_Flag"] = (df["Monetary"] < df["Monetary"].median()).astype(int)
-
-        # -------------------
-        # 5. Recency Buckets
-        # -------------------
-        df["Recency_Bucket"] = pd.cut(
-            df["Recency"],
-            bins=[-1,30,60,90,180,365],
-            labels=False
-        )
-
-        self.features = df
-
         print("Advanced features created.")
 
 
@@ -408,6 +223,7 @@ class FeatureEngineer:
     def run_pipeline(self):
         self.define_time_windows()
         self.split_data()
+        self.compute_aggregates()
         self.create_churn_label()
         self.create_rfm_features()
         self.create_behavioral_features()
@@ -416,12 +232,85 @@ class FeatureEngineer:
         self.create_engagement_features()
         self.create_advanced_features()
         self.save_final_features()
+        self.save_instrumentation()
+
+    def save_instrumentation(self):
+        with open(STATS_PATH, "w") as f:
+            json.dump(
+                {"instrumentation": self.instrumentation.report()}, f, indent=4
+            )
+
+        if self.trace_path is not None:
+            self.instrumentation.write_chrome_trace(self.trace_path)
+
+    def run_incremental(self, store_path=STORE_PATH):
+        """
+        Treats the input as a delta of new transactions: folds it into the
+        on-disk feature store and re-derives the feature table from the
+        stored per-customer state instead of the full history.
+        """
+        store = FeatureStore(store_path)
+
+        self.features = store.update(self.df)
+        self.global_stats = fit_global_stats(self.features)
+        store.save()
+
+        self.save_final_features()
+        self.save_instrumentation()
+
+    def run_backfill(self, cutoffs):
+        """
+        Features and churn labels at every cutoff date, as one long table
+        keyed by (CustomerID, snapshot_date).
+        """
+        self.snapshots = backfill_snapshots(self.df, cutoffs)
+
+        write_table(self.snapshots, SNAPSHOTS_PATH)
+        print(f"Snapshot features saved: {self.snapshots.shape}")
+
+        return self.snapshots
 
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build customer features")
+    parser.add_argument(
+        "input_path",
+        nargs="?",
+        default="data/processed/cleaned_transactions.parquet"
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Fold the input into the feature store as new transactions"
+    )
+    parser.add_argument(
+        "--snapshots",
+        nargs="+",
+        metavar="DATE",
+        help="Backfill features and labels at each of these cutoff dates"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Processes for customer-partitioned aggregation"
+    )
+    parser.add_argument(
+        "--trace",
+        default=None,
+        metavar="PATH",
+        help="Write a Chrome trace (JSON) of every pipeline step"
+    )
+    args = parser.parse_args()
 
     engineer = FeatureEngineer(
-        "data/processed/cleaned_transactions.csv"
+        args.input_path, workers=args.workers, trace_path=args.trace
     )
-    engineer.run_pipeline()
+
+    if args.snapshots:
+        engineer.run_backfill(args.snapshots)
+    elif args.incremental:
+        engineer.run_incremental()
+    else:
+        engineer.run_pipeline()
@@ -0,0 +1,123 @@
+import argparse
+import multiprocessing
+import resource
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from src.predict import predict_churn
+from src.storage import TableWriter, iter_table
+
+# -------------------------------------------------
+# Out-of-core batch scoring (python -m src.batch_score IN OUT)
+#
+# Streams a CSV or Parquet file of customer features through
+# predict_churn() in fixed-size chunks and appends each scored chunk to a
+# CSV or Parquet output. At most `workers * 2` chunks are in flight, so
+# memory depends on the chunk size, not on the file size. With workers
+# > 1 chunks are scored in forked processes (which inherit the loaded
+# model) and written back in input order.
+# -------------------------------------------------
+
+CHUNKSIZE = 100_000
+PREDICTION_COLUMNS = ["churn_probability", "churn_prediction"]
+
+
+def score_chunk(chunk, keep_columns=None):
+    scored = predict_churn(chunk)
+
+    if keep_columns is not None:
+        scored = scored[keep_columns + PREDICTION_COLUMNS]
+
+    return scored
+
+
+def peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return max(own, children) / 1024
+
+
+def _scored_chunks(chunks, keep_columns, workers):
+    if workers <= 1:
+        for chunk in chunks:
+            yield score_chunk(chunk, keep_columns)
+        return
+
+    context = multiprocessing.get_context("fork")
+    with ProcessPoolExecutor(workers, mp_context=context) as pool:
+        pending = deque()
+
+        for chunk in chunks:
+            pending.append(pool.submit(score_chunk, chunk, keep_columns))
+
+            # Bounded read-ahead: wait for the oldest chunk before reading more
+            if len(pending) >= workers * 2:
+                yield pending.popleft().result()
+
+        while pending:
+            yield pending.popleft().result()
+
+
+def score_file(input_path, output_path, chunksize=CHUNKSIZE, workers=1,
+               keep_columns=None, progress=True):
+    """
+    Scores input_path chunk by chunk into output_path; returns a summary.
+    """
+    # Load the model once here so forked workers inherit it
+    from src import predict
+    predict.registry.fused()
+
+    start = time.perf_counter()
+    chunks = iter_table(input_path, chunksize)
+
+    with TableWriter(output_path) as writer:
+        for scored in _scored_chunks(chunks, keep_columns, workers):
+            writer.write(scored)
+
+            if progress:
+                elapsed = time.perf_counter() - start
+                print(f"  {writer.rows:>12,} rows  "
+                      f"{writer.rows / elapsed:>10,.0f} rows/s  "
+                      f"peak RSS {peak_rss_mb():,.0f} MB")
+
+    elapsed = time.perf_counter() - start
+
+    summary = {
+        "rows": writer.rows,
+        "seconds": round(elapsed, 3),
+        "rows_per_second": round(writer.rows / max(elapsed, 1e-9), 1),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "chunksize": chunksize,
+        "workers": workers,
+    }
+
+    print(f"Scored {summary['rows']:,} rows in {summary['seconds']}s "
+          f"({summary['rows_per_second']:,.0f} rows/s) -> {output_path}")
+
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stream a feature file through the churn model")
+    parser.add_argument("input_path", help="CSV or Parquet customer features")
+    parser.add_argument("output_path", help="CSV or Parquet predictions")
+    parser.add_argument("--chunksize", type=int, default=CHUNKSIZE,
+                        help="Rows scored per chunk")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Scoring processes (forked)")
+    parser.add_argument("--keep-columns", nargs="+",
+                        help="Input columns copied to the output (default: all)")
+    parser.add_argument("--quiet", action="store_true",
+                        help="No per-chunk progress lines")
+    args = parser.parse_args()
+
+    score_file(
+        args.input_path,
+        args.output_path,
+        chunksize=args.chunksize,
+        workers=args.workers,
+        keep_columns=args.keep_columns,
+        progress=not args.quiet
+    )
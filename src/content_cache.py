@@ -0,0 +1,86 @@
+import hashlib
+import sys
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+# -------------------------------------------------
+# Size-bounded memo cache keyed by content hash
+#
+# Used by the Streamlit app to share parsed uploads and prediction
+# results across reruns and sessions: identical file bytes map to the
+# same key, whoever uploads them. Entries are evicted least recently used
+# first once their total (deep) size passes max_bytes.
+# -------------------------------------------------
+
+DEFAULT_MAX_BYTES = 256 * 1024 ** 2
+
+
+def content_key(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def sizeof(value):
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, (bytes, str)):
+        return len(value)
+
+    return sys.getsizeof(value)
+
+
+class ContentCache:
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get_or_compute(self, key, compute):
+        """
+        Returns the cached value for key, computing and storing it on a
+        miss. Values larger than the whole budget are returned uncached.
+        """
+        with self._lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key][0]
+
+            self.misses += 1
+
+        # Computed outside the lock so other sessions are not blocked
+        value = compute()
+        size = sizeof(value)
+
+        if size > self.max_bytes:
+            return value
+
+        with self._lock:
+            if key not in self.entries:
+                self.entries[key] = (value, size)
+                self.bytes += size
+
+            while self.bytes > self.max_bytes:
+                _, (_, evicted) = self.entries.popitem(last=False)
+                self.bytes -= evicted
+                self.evictions += 1
+
+        return value
+
+    def stats(self):
+        return {
+            "entries": len(self.entries),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
@@ -0,0 +1,104 @@
+import numpy as np
+import json
+import os
+
+# -------------------------------------------------
+# Precomputed dashboard summary
+#
+# A small JSON artifact written next to the feature table at the end of
+# FeatureEngineer: population counts, churn rate, and for every numeric
+# feature its quantiles and a fixed-bin histogram with churned counts per
+# bin. Churn rate is also broken down by RFM_Score (the summed R/F/M
+# quartiles, 0-9) and by Recency_Bucket. The dashboard renders from this
+# file without loading customer-level data.
+# -------------------------------------------------
+
+SUMMARY_PATH = "data/processed/dashboard_summary.json"
+
+HISTOGRAM_BINS = 20
+QUANTILES = [0.0, 0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99, 1.0]
+SEGMENT_COLUMNS = ["RFM_Score", "Recency_Bucket"]
+
+# Identifiers and the label itself are not summarized as features
+EXCLUDED_COLUMNS = ["CustomerID", "churn"]
+
+
+def churn_by(features, column):
+    """
+    Customers, churned customers and churn rate per value of `column`.
+    """
+    grouped = features.groupby(column)["churn"].agg(["size", "sum", "mean"])
+
+    return [
+        {
+            "value": value.item() if hasattr(value, "item") else value,
+            "customers": int(row["size"]),
+            "churned": int(row["sum"]),
+            "churn_rate": float(row["mean"]),
+        }
+        for value, row in grouped.iterrows()
+    ]
+
+
+def feature_summary(values, churn):
+    present = ~np.isnan(values)
+    values, churn = values[present], churn[present]
+
+    summary = {
+        "missing": int((~present).sum()),
+        "mean": float(values.mean()) if len(values) else None,
+    }
+
+    if not len(values):
+        return summary
+
+    summary["quantiles"] = dict(zip(
+        [str(q) for q in QUANTILES],
+        np.quantile(values, QUANTILES).tolist()
+    ))
+
+    counts, edges = np.histogram(values, bins=HISTOGRAM_BINS)
+    churned, _ = np.histogram(values[churn == 1], bins=edges)
+
+    summary["histogram"] = {
+        "edges": edges.tolist(),
+        "counts": counts.tolist(),
+        "churned": churned.tolist(),
+    }
+
+    return summary
+
+
+def build_summary(features):
+    """
+    Dashboard summary of a customer feature table with a `churn` column.
+    """
+    churn = features["churn"].to_numpy()
+    numeric = features.drop(columns=EXCLUDED_COLUMNS, errors="ignore")
+    numeric = numeric.select_dtypes(include="number")
+
+    return {
+        "customers": int(len(features)),
+        "churned": int(churn.sum()),
+        "churn_rate": float(churn.mean()),
+        "segments": {
+            column: churn_by(features, column)
+            for column in SEGMENT_COLUMNS if column in features.columns
+        },
+        "features": {
+            column: feature_summary(numeric[column].to_numpy(dtype=float), churn)
+            for column in numeric.columns
+        },
+    }
+
+
+def save_summary(summary, path=SUMMARY_PATH):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    with open(path, "w") as f:
+        json.dump(summary, f, indent=4)
+
+
+def load_summary(path=SUMMARY_PATH):
+    with open(path) as f:
+        return json.load(f)
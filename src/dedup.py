@@ -0,0 +1,194 @@
+import numpy as np
+import pandas as pd
+import os
+import shutil
+import tempfile
+
+# -------------------------------------------------
+# Hash-based deduplication
+#
+# Each row is reduced to a 64-bit fingerprint of its values. Seen
+# fingerprints are kept as sorted uint64 arrays (8 bytes per row):
+#   - each batch's new fingerprints are sorted once and pushed as a
+#     level; equal-sized levels are sort-merged (like a binary counter),
+#     so a fingerprint is merged O(log n) times and lookups probe
+#     O(log n) levels
+#   - past max_in_memory the levels are spilled to memory-mapped files,
+#     hash-partitioned (duplicates always share a partition), so a
+#     lookup reads only its own partition's runs; a partition's runs are
+#     sort-merged into one once there are more than MAX_RUNS_PER_PARTITION
+# -------------------------------------------------
+
+FINGERPRINT_BITS = 64
+
+SPILL_PARTITIONS = 16
+MAX_RUNS_PER_PARTITION = 4
+
+
+def fingerprint_rows(df):
+    """
+    64-bit fingerprint of each row's values (index ignored).
+    """
+    return pd.util.hash_pandas_object(
+        df, index=False, categorize=True
+    ).to_numpy(dtype=np.uint64)
+
+
+def hash_partition(fingerprints, n_partitions):
+    """
+    Partition number per row; duplicates always land in the same one.
+    """
+    return (fingerprints % np.uint64(n_partitions)).astype(np.int64)
+
+
+def expected_collisions(n):
+    # Birthday bound: expected colliding pairs among n distinct rows
+    return n * (n - 1) / 2 / 2.0 ** FINGERPRINT_BITS
+
+
+def _contains(sorted_values, values):
+    if len(sorted_values) == 0 or len(values) == 0:
+        return np.zeros(len(values), dtype=bool)
+
+    idx = np.searchsorted(sorted_values, values)
+    idx[idx == len(sorted_values)] = len(sorted_values) - 1
+
+    return sorted_values[idx] == values
+
+
+def _merge(*sorted_arrays):
+    # Timsort finds the sorted runs, so this is a linear merge
+    return np.sort(np.concatenate(sorted_arrays), kind="stable")
+
+
+class FingerprintSet:
+    def __init__(self, max_in_memory=None, spill_dir=None, n_partitions=SPILL_PARTITIONS):
+        """
+        max_in_memory: fingerprints held in RAM before spilling them to
+        disk as hash-partitioned sorted runs (None = never spill).
+        """
+        self.max_in_memory = max_in_memory
+        self.spill_dir = spill_dir
+        self.n_partitions = n_partitions
+        self.levels = []
+        self.runs = [[] for _ in range(n_partitions)]
+        self.count = 0
+        self._spills = 0
+        self._spill_path = None
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def in_memory(self):
+        return sum(len(level) for level in self.levels)
+
+    def add(self, fingerprints):
+        """
+        Adds fingerprints and returns a mask of the ones not seen before,
+        marking only the first occurrence of repeats within the batch.
+        """
+        fingerprints = np.asarray(fingerprints, dtype=np.uint64)
+
+        _, first = np.unique(fingerprints, return_index=True)
+        new = np.zeros(len(fingerprints), dtype=bool)
+        new[first] = True
+
+        for level in self.levels:
+            new[new] = ~_contains(level, fingerprints[new])
+
+        self._drop_spilled(fingerprints, new)
+
+        added = np.sort(fingerprints[new])
+        self.count += len(added)
+
+        if len(added):
+            self._push(added)
+
+        if self.max_in_memory is not None and self.in_memory > self.max_in_memory:
+            self._spill()
+
+        return new
+
+    def _push(self, added):
+        self.levels.append(added)
+
+        # Merge while the newest level is at least half its predecessor
+        while len(self.levels) > 1 and 2 * len(self.levels[-1]) >= len(self.levels[-2]):
+            newest = self.levels.pop()
+            self.levels[-1] = _merge(self.levels[-1], newest)
+
+    def _drop_spilled(self, fingerprints, new):
+        if not any(self.runs):
+            return
+
+        rows = np.flatnonzero(new)
+        partitions = hash_partition(fingerprints[rows], self.n_partitions)
+
+        for partition in np.unique(partitions):
+            candidates = rows[partitions == partition]
+
+            for run in self.runs[partition]:
+                found = _contains(run, fingerprints[candidates])
+                new[candidates[found]] = False
+                candidates = candidates[~found]
+
+    def _spill_dir(self):
+        if self._spill_path is None:
+            self._spill_path = tempfile.mkdtemp(
+                prefix="fingerprints_", dir=self.spill_dir
+            )
+
+        return self._spill_path
+
+    def _write_run(self, partition, values, kind="run"):
+        path = os.path.join(
+            self._spill_dir(), f"part_{partition:03d}_{kind}_{self._spills}.npy"
+        )
+        np.save(path, values)
+
+        return np.load(path, mmap_mode="r")
+
+    def _spill(self):
+        values = _merge(*self.levels)
+        partitions = hash_partition(values, self.n_partitions)
+
+        for partition in range(self.n_partitions):
+            # A subset of a sorted array stays sorted
+            part = values[partitions == partition]
+            if not len(part):
+                continue
+
+            runs = self.runs[partition]
+            runs.append(self._write_run(partition, part))
+
+            if len(runs) > MAX_RUNS_PER_PARTITION:
+                paths = [run.filename for run in runs]
+                self.runs[partition] = [self._write_run(partition, _merge(*runs), "merged")]
+
+                for path in paths:
+                    os.remove(path)
+
+        self.levels = []
+        self._spills += 1
+
+    def report(self):
+        collisions = expected_collisions(self.count)
+
+        return {
+            "fingerprints": self.count,
+            "fingerprint_bits": FINGERPRINT_BITS,
+            "in_memory": int(self.in_memory),
+            "spilled_runs": sum(len(runs) for runs in self.runs),
+            "spill_partitions": self.n_partitions,
+            "expected_collisions": collisions,
+            "collision_probability": float(-np.expm1(-collisions)),
+        }
+
+    def close(self):
+        self.levels = []
+        self.runs = [[] for _ in range(self.n_partitions)]
+
+        if self._spill_path is not None:
+            shutil.rmtree(self._spill_path, ignore_errors=True)
+            self._spill_path = None
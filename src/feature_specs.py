@@ -0,0 +1,477 @@
+import pandas as pd
+import numpy as np
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+# -------------------------------------------------
+# Feature-spec registry
+#
+# Every per-customer aggregate FeatureEngineer needs is declared here,
+# grouped by the key it is computed over. compile_aggregates() runs one
+# grouped pass per key and returns a single frame aligned on CustomerID,
+# which the derive functions below turn into feature columns.
+# -------------------------------------------------
+
+CUSTOMER_KEY = "CustomerID"
+CHURN_WINDOW_MONTHS = 3
+PRODUCT_KEY = (CUSTOMER_KEY, "StockCode")
+MONTH_KEY = (CUSTOMER_KEY, "Month")
+
+
+# Every aggregation is a built-in groupby kernel; no per-group Python callbacks
+def plan_aggregates():
+    """
+    Returns {group key: {output name: (source column, aggregation)}}.
+    """
+    return {
+        (CUSTOMER_KEY,): {
+            "FirstPurchaseDate": ("InvoiceDate", "min"),
+            "LastPurchaseDate": ("InvoiceDate", "max"),
+            "Frequency": ("InvoiceNo", "nunique"),
+            "Monetary": ("TotalPrice", "sum"),
+            "TotalQuantity": ("Quantity", "sum"),
+            "WeekendPurchaseRatio": ("IsWeekend", "mean"),
+            "EveningPurchaseRatio": ("IsEvening", "mean"),
+            "UniqueActiveMonths": ("Month", "nunique"),
+            "UniqueActiveDays": ("DayOfWeek", "nunique"),
+            "UniqueProducts": ("StockCode", "nunique"),
+        },
+        PRODUCT_KEY: {
+            "Count": ("InvoiceNo", "size"),
+        },
+        MONTH_KEY: {
+            "MonthlyInvoices": ("InvoiceNo", "nunique"),
+        },
+    }
+
+
+# Boolean columns computed once over a secondary key's grouped rows
+SECONDARY_FLAGS = {
+    PRODUCT_KEY: {
+        "IsRepeatProduct": lambda grouped: grouped["Count"] > 1,
+    },
+}
+
+# Secondary-key aggregates are reduced back to one row per customer
+SECONDARY_REDUCTIONS = {
+    PRODUCT_KEY: {
+        "RepeatPurchaseRatio": ("IsRepeatProduct", "mean"),
+        "TopProductCount": ("Count", "max"),
+        "TotalProductCount": ("Count", "sum"),
+    },
+    MONTH_KEY: {
+        "MonthlyPurchaseVariance": ("MonthlyInvoices", "std"),
+    },
+}
+
+
+def row_flag_columns(df):
+    # Boolean arrays; df may also be a dict of one customer's columns
+    return {
+        "IsWeekend": np.isin(df["DayOfWeek"], [5, 6]),
+        "IsEvening": np.asarray((df["Hour"] >= 17) & (df["Hour"] <= 22)),
+    }
+
+
+def add_row_flags(df):
+    """
+    Adds the row-level flags the aggregate plan reads from.
+    """
+    # Shallow copy: the transaction columns are shared, not copied, and
+    # the flags are the only new (1 byte per row) arrays
+    flagged = df.copy(deep=False)
+
+    for name, values in row_flag_columns(df).items():
+        flagged[name] = values
+
+    return flagged
+
+
+def compile_aggregates(df, plan):
+    """
+    Runs one grouped pass per key in the plan and assembles the results
+    into a single frame indexed by CustomerID.
+    """
+    frames = []
+
+    for key, specs in plan.items():
+        # observed=True: categorical keys must not expand to every category
+        grouped = df.groupby(list(key), observed=True).agg(**specs)
+
+        if len(key) > 1:
+            for name, flag in SECONDARY_FLAGS.get(key, {}).items():
+                grouped[name] = flag(grouped)
+
+            grouped = grouped.groupby(level=CUSTOMER_KEY).agg(
+                **SECONDARY_REDUCTIONS[key]
+            )
+
+        frames.append(grouped)
+
+    return pd.concat(frames, axis=1)
+
+
+def partition_by_customer(df, n_partitions):
+    """
+    Hash-partitions rows by CustomerID; every customer lands in one part.
+    """
+    hashes = pd.util.hash_array(df[CUSTOMER_KEY].to_numpy())
+    parts = hashes % np.uint64(n_partitions)
+
+    return [df[parts == i] for i in range(n_partitions)]
+
+
+# Partitions handed to forked workers by inheritance instead of pickling
+_PARTITIONS = []
+
+
+def _compile_partition(args):
+    part, plan = args
+
+    if isinstance(part, int):
+        part = _PARTITIONS[part]
+
+    return compile_aggregates(part, plan)
+
+
+def compile_aggregates_parallel(df, plan, workers):
+    """
+    compile_aggregates() over customer-hash partitions in a process pool.
+
+    All aggregates are per customer, so partition results are simply
+    concatenated and re-sorted into the serial CustomerID order. The
+    population statistics (min/max, qcut edges, medians) are reduced
+    afterwards over the combined table, exactly as in the serial path.
+    """
+    global _PARTITIONS
+
+    partitions = [part for part in partition_by_customer(df, workers) if len(part)]
+
+    # Forked workers read partitions from memory; spawn pickles them
+    if "fork" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("fork")
+        _PARTITIONS = partitions
+        tasks = [(i, plan) for i in range(len(partitions))]
+    else:
+        context = None
+        tasks = [(part, plan) for part in partitions]
+
+    try:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+            frames = list(pool.map(_compile_partition, tasks))
+    finally:
+        _PARTITIONS = []
+
+    return pd.concat(frames).sort_index()
+
+
+# -------------------------------------------------
+# Derived per-customer features
+#
+# The *_columns functions hold the formulas. They only use arithmetic and
+# NumPy ufuncs, so they evaluate the same way on aggregate frames (one
+# row per customer) and on a dict of scalars for a single customer (see
+# src/online_features.py); the *_features wrappers build the frames.
+# -------------------------------------------------
+ONE_DAY = np.timedelta64(1, "D")
+
+
+def days(delta):
+    # Whole days like Series.dt.days, for timedelta Series and scalars
+    return delta // ONE_DAY
+
+
+def rfm_columns(agg, snapshot_date):
+    return {
+        "Recency": days(snapshot_date - agg["LastPurchaseDate"]),
+        "Frequency": agg["Frequency"],
+        "Monetary": agg["Monetary"],
+        "TotalQuantity": agg["TotalQuantity"],
+        "AvgOrderValue": agg["Monetary"] / agg["Frequency"],
+    }
+
+
+def behavioral_columns(agg):
+    lifetime_days = days(agg["LastPurchaseDate"] - agg["FirstPurchaseDate"])
+    total_invoices = agg["Frequency"]
+
+    # Avoid division by zero
+    avg_days_between = np.where(
+        total_invoices > 1,
+        lifetime_days / np.maximum(total_invoices - 1, 1),
+        0
+    )
+
+    return {
+        "TotalInvoices": total_invoices,
+        "CustomerLifetimeDays": lifetime_days,
+        "AvgDaysBetweenPurchases": avg_days_between,
+        "PurchaseRatePerMonth": total_invoices / (lifetime_days / 30 + 1),
+    }
+
+
+def temporal_columns(agg):
+    variance = agg["MonthlyPurchaseVariance"]
+
+    return {
+        "WeekendPurchaseRatio": agg["WeekendPurchaseRatio"],
+        "EveningPurchaseRatio": agg["EveningPurchaseRatio"],
+        "UniqueActiveMonths": agg["UniqueActiveMonths"],
+        "UniqueActiveDays": agg["UniqueActiveDays"],
+        # Single-month customers have no variance
+        "MonthlyPurchaseVariance": np.where(np.isnan(variance), 0, variance),
+    }
+
+
+def product_columns(agg):
+    return {
+        "UniqueProducts": agg["UniqueProducts"],
+        "ProductDiversityRatio": agg["UniqueProducts"] / agg["Frequency"],
+        "AvgItemsPerInvoice": agg["TotalQuantity"] / agg["Frequency"],
+        "RepeatPurchaseRatio": agg["RepeatPurchaseRatio"],
+        "TopProductConcentration": (
+            agg["TopProductCount"] / agg["TotalProductCount"]
+        ),
+    }
+
+
+def engagement_columns(agg):
+    active_months = agg["UniqueActiveMonths"]
+
+    return {
+        "RevenuePerMonth": agg["Monetary"] / active_months,
+        "QuantityPerMonth": agg["TotalQuantity"] / active_months,
+        "InvoiceFrequencyScore": agg["Frequency"] / active_months,
+    }
+
+
+def rfm_features(agg, snapshot_date):
+    return pd.DataFrame(rfm_columns(agg, snapshot_date), index=agg.index)
+
+
+def behavioral_features(agg):
+    return pd.DataFrame(behavioral_columns(agg), index=agg.index)
+
+
+def temporal_features(agg):
+    return pd.DataFrame(temporal_columns(agg), index=agg.index)
+
+
+def product_features(agg):
+    return pd.DataFrame(product_columns(agg), index=agg.index)
+
+
+def engagement_features(agg):
+    return pd.DataFrame(engagement_columns(agg), index=agg.index)
+
+
+# -------------------------------------------------
+# Population-level features
+#
+# Min/max scores, RFM quartiles and risk flags depend on statistics over
+# all customers. fit_global_stats() captures them once; the transforms
+# below then apply them per row, so a single customer can be scored at
+# inference with the statistics saved alongside the model.
+# -------------------------------------------------
+GLOBAL_STATS_PATH = "models/global_stats.json"
+
+QUARTILE_COLUMNS = {
+    "Recency": "R_Quartile",
+    "Frequency": "F_Quartile",
+    "Monetary": "M_Quartile",
+}
+
+
+def fit_global_stats(features):
+    stats = {
+        "min": {},
+        "max": {},
+        "median": {},
+        "quartile_edges": {},
+    }
+
+    for col in QUARTILE_COLUMNS:
+        stats["min"][col] = float(features[col].min())
+        stats["max"][col] = float(features[col].max())
+        stats["median"][col] = float(features[col].median())
+
+        # Same edges as pd.qcut(q=4, duplicates="drop")
+        _, edges = pd.qcut(features[col], q=4, retbins=True, duplicates="drop")
+        stats["quartile_edges"][col] = [float(edge) for edge in edges]
+
+    return stats
+
+
+def save_global_stats(stats, path=GLOBAL_STATS_PATH):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    with open(path, "w") as f:
+        json.dump(stats, f, indent=4)
+
+
+def load_global_stats(path=GLOBAL_STATS_PATH):
+    with open(path) as f:
+        return json.load(f)
+
+
+def quartile(values, edges):
+    # Right-closed bins like pd.qcut; values outside the fitted range
+    # fall into the first or last quartile instead of NaN
+    return np.searchsorted(np.asarray(edges[1:-1]), values, side="left")
+
+
+def engagement_score_columns(features, stats):
+    # Normalize Recency & Monetary (min-max)
+    recency_min = stats["min"]["Recency"]
+    recency_max = stats["max"]["Recency"]
+
+    monetary_min = stats["min"]["Monetary"]
+    monetary_max = stats["max"]["Monetary"]
+
+    return {
+        "RecencyScore": (
+            (features["Recency"] - recency_min) /
+            (recency_max - recency_min + 1e-6)
+        ),
+        "MonetaryScore": (
+            (features["Monetary"] - monetary_min) /
+            (monetary_max - monetary_min + 1e-6)
+        ),
+    }
+
+
+def engagement_scores(features, stats):
+    return pd.DataFrame(engagement_score_columns(features, stats))
+
+
+def engagement_score(features):
+    # Composite engagement score
+    return (
+        features["Frequency"] *
+        features["MonetaryScore"] *
+        (1 - features["RecencyScore"])
+    )
+
+
+RECENCY_BUCKET_EDGES = [-1, 30, 60, 90, 180, 365]
+
+
+def recency_bucket(recency):
+    if np.ndim(recency):
+        return pd.cut(recency, bins=RECENCY_BUCKET_EDGES, labels=False)
+
+    # Single value: same right-closed bins, NaN outside them
+    bucket = np.searchsorted(RECENCY_BUCKET_EDGES, recency, side="left") - 1
+    return bucket if 0 <= bucket < len(RECENCY_BUCKET_EDGES) - 1 else np.nan
+
+
+def advanced_features(features, stats, copy=True):
+    # copy=False adds the columns to `features` itself, which may also be
+    # a dict of one customer's values
+    df = features.copy() if copy else features
+
+    # -------------------
+    # 1. RFM Quartile Scores (Robust Version)
+    # -------------------
+    for col, name in QUARTILE_COLUMNS.items():
+        df[name] = quartile(df[col], stats["quartile_edges"][col])
+
+    df["RFM_Score"] = (
+        df["R_Quartile"] +
+        df["F_Quartile"] +
+        df["M_Quartile"]
+    )
+
+    # -------------------
+    # 2. Interaction Features
+    # -------------------
+    df["Recency_Frequency"] = df["Recency"] * df["Frequency"]
+    df["Monetary_Frequency"] = df["Monetary"] * df["Frequency"]
+    df["Recency_Monetary"] = df["Recency"] * df["Monetary"]
+
+    # -------------------
+    # 3. Log Transformations
+    # -------------------
+    df["Log_Monetary"] = np.log1p(df["Monetary"])
+    df["Log_Frequency"] = np.log1p(df["Frequency"])
+    df["Log_Recency"] = np.log1p(df["Recency"])
+
+    # -------------------
+    # 4. Risk Flags
+    # -------------------
+    median = stats["median"]
+    df["High_Recency_Flag"] = (df["Recency"] > median["Recency"]).astype(int)
+    df["Low_Frequency_Flag"] = (df["Frequency"] < median["Frequency"]).astype(int)
+    df["Low_Monetary_Flag"] = (df["Monetary"] < median["Monetary"]).astype(int)
+
+    # -------------------
+    # 5. Recency Buckets
+    # -------------------
+    df["Recency_Bucket"] = recency_bucket(df["Recency"])
+
+    return df
+
+
+# Columns apply_global_features derives; every other model column is a
+# per-customer input
+GLOBAL_FEATURE_COLUMNS = [
+    "RecencyScore", "MonetaryScore", "EngagementScore",
+    *QUARTILE_COLUMNS.values(), "RFM_Score",
+    "Recency_Frequency", "Monetary_Frequency", "Recency_Monetary",
+    "Log_Monetary", "Log_Frequency", "Log_Recency",
+    "High_Recency_Flag", "Low_Frequency_Flag", "Low_Monetary_Flag",
+    "Recency_Bucket",
+]
+
+
+def apply_global_features(features, stats):
+    """
+    Adds every population-level column to per-customer features using
+    fitted statistics; O(1) per row.
+    """
+    df = features.copy()
+
+    attach(df, engagement_scores(df, stats))
+    df["EngagementScore"] = engagement_score(df)
+
+    return advanced_features(df, stats, copy=False)
+
+
+# -------------------------------------------------
+# Assembly
+# -------------------------------------------------
+def attach(features, columns):
+    # Aggregates and features share the same CustomerID order,
+    # so columns are attached positionally instead of merged
+    for name in columns.columns:
+        features[name] = columns[name].to_numpy()
+
+
+def assemble_features(agg, snapshot_date, customers_in_churn):
+    """
+    Builds the full customer feature table from compiled aggregates,
+    in the same column order as FeatureEngineer.run_pipeline.
+    """
+    features = pd.DataFrame({CUSTOMER_KEY: agg.index.to_numpy()})
+
+    features["churn"] = np.where(
+        features[CUSTOMER_KEY].isin(customers_in_churn),
+        0,
+        1
+    )
+
+    attach(features, rfm_features(agg, snapshot_date))
+    attach(features, behavioral_features(agg))
+    attach(features, temporal_features(agg))
+    attach(features, product_features(agg))
+
+    stats = fit_global_stats(features)
+
+    attach(features, engagement_scores(features, stats))
+    attach(features, engagement_features(agg))
+
+    features["EngagementScore"] = engagement_score(features)
+
+    return advanced_features(features, stats, copy=False)
@@ -0,0 +1,295 @@
+import pandas as pd
+import numpy as np
+import json
+import os
+
+from src.storage import read_table, write_table
+from src.schema import apply_schema
+from src.feature_specs import (
+    CUSTOMER_KEY,
+    CHURN_WINDOW_MONTHS,
+    add_row_flags,
+    assemble_features,
+)
+
+# -------------------------------------------------
+# Incremental feature store keyed by CustomerID
+#
+# Keeps mergeable per-customer state for the observation window on disk:
+#   customers.parquet  sums, row counts, first/last dates, and bitmasks of
+#                      active months and weekdays (OR-mergeable sets)
+#   invoices.parquet   distinct (CustomerID, Month, InvoiceNo) keys, giving
+#                      Frequency and per-month invoice counts
+#   products.parquet   (CustomerID, StockCode) line counts
+#
+# Invoice and product rows carry a 64-bit hash of their key, so a fold
+# looks each incoming key up among the stored hashes (one hash-table
+# pass in C) and appends or adds to it; the history itself is never
+# deduplicated, regrouped or sorted again.
+#   pending.parquet    transactions still inside the churn window
+#
+# update() folds a delta of new transactions into that state. Only the
+# customers touched by the fold get their aggregate rows rebuilt; the
+# feature table is then re-derived from the cached aggregates, which is
+# O(customers) and never rescans transaction history. Columns tied to
+# the snapshot date or the whole population (Recency, scores, quartiles,
+# medians) necessarily change for everyone when the window moves.
+# -------------------------------------------------
+
+STORE_PATH = "data/feature_store"
+
+SUM_COLUMNS = ["Rows", "Monetary", "TotalQuantity", "WeekendRows", "EveningRows"]
+MASK_COLUMNS = ["MonthMask", "DayMask"]
+
+INVOICE_KEY = [CUSTOMER_KEY, "Month", "InvoiceNo"]
+PRODUCT_KEY = [CUSTOMER_KEY, "StockCode"]
+
+
+def _distinct_mask(df, column):
+    # Sum of distinct powers of two == bitwise OR of the set members
+    pairs = df[[CUSTOMER_KEY, column]].drop_duplicates()
+    bits = np.left_shift(1, pairs[column].to_numpy(dtype=np.int64))
+
+    return pd.Series(bits, index=pairs[CUSTOMER_KEY].to_numpy()).groupby(level=0).sum()
+
+
+def key_hash(df, key):
+    # By value, so int32 / int64 IDs and str / categorical codes agree
+    return pd.util.hash_pandas_object(df[key], index=False).to_numpy()
+
+
+def summarize_transactions(df):
+    """
+    Mergeable per-customer state for a batch of observation transactions.
+    """
+    df = add_row_flags(df)
+
+    customers = df.groupby(CUSTOMER_KEY, observed=True).agg(
+        Rows=("InvoiceNo", "size"),
+        Monetary=("TotalPrice", "sum"),
+        TotalQuantity=("Quantity", "sum"),
+        WeekendRows=("IsWeekend", "sum"),
+        EveningRows=("IsEvening", "sum"),
+        FirstPurchaseDate=("InvoiceDate", "min"),
+        LastPurchaseDate=("InvoiceDate", "max"),
+    )
+    customers["MonthMask"] = _distinct_mask(df, "Month")
+    customers["DayMask"] = _distinct_mask(df, "DayOfWeek")
+
+    invoices = df[INVOICE_KEY].drop_duplicates()
+    invoices = invoices.astype({"InvoiceNo": str})
+    invoices["Key"] = key_hash(invoices, INVOICE_KEY)
+
+    products = df.groupby(
+        PRODUCT_KEY, observed=True
+    ).size().rename("Count").reset_index()
+    products = products.astype({"StockCode": str})
+    products["Key"] = key_hash(products, PRODUCT_KEY)
+
+    return customers, invoices, products
+
+
+def merge_customer_state(state, delta):
+    index = state.index.union(delta.index)
+    state = state.reindex(index)
+    delta = delta.reindex(index)
+
+    merged = pd.DataFrame(index=index)
+
+    for col in SUM_COLUMNS:
+        merged[col] = state[col].add(delta[col], fill_value=0)
+
+        # Customers missing on one side turn integer sums into floats
+        if col != "Monetary":
+            merged[col] = merged[col].astype(np.int64)
+
+    merged["FirstPurchaseDate"] = pd.concat(
+        [state["FirstPurchaseDate"], delta["FirstPurchaseDate"]], axis=1
+    ).min(axis=1)
+    merged["LastPurchaseDate"] = pd.concat(
+        [state["LastPurchaseDate"], delta["LastPurchaseDate"]], axis=1
+    ).max(axis=1)
+
+    for col in MASK_COLUMNS:
+        merged[col] = (
+            state[col].fillna(0).astype(np.int64) |
+            delta[col].fillna(0).astype(np.int64)
+        )
+
+    return merged
+
+
+def aggregates_from_state(customers, invoices, products):
+    """
+    Rebuilds compile_aggregates()-compatible rows from stored state.
+    """
+    agg = pd.DataFrame(index=customers.index)
+    agg.index.name = CUSTOMER_KEY
+
+    agg["FirstPurchaseDate"] = customers["FirstPurchaseDate"]
+    agg["LastPurchaseDate"] = customers["LastPurchaseDate"]
+    agg["Monetary"] = customers["Monetary"]
+    agg["TotalQuantity"] = customers["TotalQuantity"]
+    agg["WeekendPurchaseRatio"] = customers["WeekendRows"] / customers["Rows"]
+    agg["EveningPurchaseRatio"] = customers["EveningRows"] / customers["Rows"]
+    agg["UniqueActiveMonths"] = np.bitwise_count(customers["MonthMask"].to_numpy())
+    agg["UniqueActiveDays"] = np.bitwise_count(customers["DayMask"].to_numpy())
+
+    agg["Frequency"] = invoices.groupby(CUSTOMER_KEY)["InvoiceNo"].nunique()
+
+    monthly = invoices.groupby([CUSTOMER_KEY, "Month"]).size()
+    agg["MonthlyPurchaseVariance"] = monthly.groupby(level=CUSTOMER_KEY).std()
+
+    counts = products.groupby(CUSTOMER_KEY)["Count"]
+    agg["UniqueProducts"] = counts.size()
+    agg["RepeatPurchaseRatio"] = (
+        (products["Count"] > 1).groupby(products[CUSTOMER_KEY]).mean()
+    )
+    agg["TopProductCount"] = counts.max()
+    agg["TotalProductCount"] = counts.sum()
+
+    return agg
+
+
+class FeatureStore:
+    def __init__(self, path=STORE_PATH):
+        # path=None keeps the state in memory only (see src/snapshots.py)
+        self.path = path
+        self.meta = {"max_date": None, "observation_window_end": None}
+
+        self.customers = None
+        self.invoices = None
+        self.products = None
+        self.pending = None
+        self.aggregates = None
+        self.features = None
+
+        if path is not None and os.path.exists(self._file("meta.json")):
+            self.load()
+
+    def _file(self, name):
+        return os.path.join(self.path, name)
+
+    def load(self):
+        with open(self._file("meta.json")) as f:
+            self.meta = json.load(f)
+
+        self.customers = read_table(self._file("customers.parquet"))
+        self.customers = self.customers.set_index(CUSTOMER_KEY)
+        self.invoices = read_table(self._file("invoices.parquet"))
+        self.products = read_table(self._file("products.parquet"))
+
+        # Stores written before keys were hashed
+        if "Key" not in self.invoices.columns:
+            self.invoices["Key"] = key_hash(self.invoices, INVOICE_KEY)
+        if "Key" not in self.products.columns:
+            self.products["Key"] = key_hash(self.products, PRODUCT_KEY)
+        self.pending = read_table(self._file("pending.parquet"))
+        self.aggregates = read_table(self._file("aggregates.parquet"))
+        self.aggregates = self.aggregates.set_index(CUSTOMER_KEY)
+
+    def save(self):
+        os.makedirs(self.path, exist_ok=True)
+
+        write_table(self.customers.reset_index(), self._file("customers.parquet"))
+        write_table(self.invoices, self._file("invoices.parquet"))
+        write_table(self.products, self._file("products.parquet"))
+        write_table(self.pending, self._file("pending.parquet"))
+        write_table(self.aggregates.reset_index(), self._file("aggregates.parquet"))
+
+        with open(self._file("meta.json"), "w") as f:
+            json.dump(self.meta, f, indent=4)
+
+    def fold(self, df):
+        """
+        Merges observation-window transactions into the stored state and
+        returns the affected CustomerIDs.
+        """
+        customers, invoices, products = summarize_transactions(df)
+
+        if self.customers is None:
+            self.customers = customers
+            self.invoices = invoices
+            self.products = products
+        else:
+            self.customers = merge_customer_state(self.customers, customers)
+
+            # Only the delta's keys are looked up; new ones are appended
+            seen = invoices["Key"].isin(self.invoices["Key"])
+            self.invoices = pd.concat([self.invoices, invoices[~seen]], ignore_index=True)
+
+            # Known products add their line counts in place
+            position = pd.Index(self.products["Key"]).get_indexer(products["Key"])
+            known = position >= 0
+
+            counts = self.products["Count"].to_numpy().copy()
+            np.add.at(counts, position[known], products["Count"].to_numpy()[known])
+
+            self.products = pd.concat(
+                [self.products.assign(Count=counts), products[~known]],
+                ignore_index=True
+            )
+
+        return customers.index
+
+    def update(self, transactions):
+        """
+        Folds new transactions in and returns the refreshed feature table.
+        """
+        pending = transactions if self.pending is None else pd.concat(
+            [self.pending, transactions], ignore_index=True
+        )
+        pending = apply_schema(pending)
+
+        # Same windows as FeatureEngineer.define_time_windows
+        max_date = pending["InvoiceDate"].max()
+        if self.meta["max_date"] is not None:
+            max_date = max(max_date, pd.Timestamp(self.meta["max_date"]))
+
+        window_end = max_date - pd.DateOffset(months=CHURN_WINDOW_MONTHS)
+
+        observed = pending["InvoiceDate"] < window_end
+        affected = self.fold(pending[observed])
+        self.pending = pending[~observed].reset_index(drop=True)
+
+        self.meta["max_date"] = str(max_date)
+        self.meta["observation_window_end"] = str(window_end)
+
+        self.refresh(affected)
+
+        print(f"Folded {int(observed.sum())} transactions; "
+              f"{len(affected)} customers re-aggregated.")
+
+        return self.features
+
+    def refresh(self, affected, customers_in_churn=None):
+        """
+        Rebuilds aggregate rows for `affected` customers and re-derives
+        the feature table. Churn labels default to the pending window.
+        """
+        if customers_in_churn is None:
+            customers_in_churn = self.pending[CUSTOMER_KEY].unique()
+
+        mask = self.customers.index.isin(affected)
+
+        rebuilt = aggregates_from_state(
+            self.customers[mask],
+            self.invoices[self.invoices[CUSTOMER_KEY].isin(affected)],
+            self.products[self.products[CUSTOMER_KEY].isin(affected)]
+        )
+
+        if self.aggregates is None:
+            self.aggregates = rebuilt
+        else:
+            untouched = self.aggregates[~self.aggregates.index.isin(affected)]
+            self.aggregates = pd.concat([untouched, rebuilt[untouched.columns]])
+
+        self.aggregates = self.aggregates.sort_index()
+
+        snapshot_date = self.aggregates["LastPurchaseDate"].max()
+
+        self.features = assemble_features(
+            self.aggregates,
+            snapshot_date,
+            customers_in_churn
+        )
@@ -0,0 +1,261 @@
+import numpy as np
+import pandas as pd
+import functools
+import json
+import os
+import resource
+import time
+
+from numpy.lib.array_utils import byte_bounds
+
+# -------------------------------------------------
+# Per-step instrumentation for the pipeline classes
+#
+# Methods decorated with @instrumented_step record, per call:
+#   wall_s, cpu_s       wall-clock and process CPU time
+#   peak_mem_delta_mb   peak RSS during the step minus RSS at its start
+#   peak_mem_exact      whether that peak is exact. The process peak
+#                       (VmHWM) is read before and after the step: a step
+#                       raising it gets its exact peak, otherwise the
+#                       delta is an upper bound (the earlier process peak).
+#                       Instrumentation(reset_peak=True) resets VmHWM
+#                       through clear_refs before every step for exact
+#                       peaks, at the cost of resetting it process-wide
+#                       (read whole-process peaks via process_peak_rss())
+#   rows_in, rows_out   rows of the step's input and output frames
+#   copied_mb           bytes of the output frame not sharing memory
+#                       with the input frame, i.e. copies and new columns
+#
+# Calls of the same step (e.g. once per streamed chunk) are summed into
+# one entry; every call also becomes a Chrome trace event
+# (chrome://tracing or https://ui.perfetto.dev).
+# -------------------------------------------------
+
+MB = 1024 ** 2
+
+# Highest VmHWM seen before any reset; see process_peak_rss()
+_process_peak = 0
+
+
+def _read_status(field):
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(field):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+
+    return None
+
+
+def _reset_peak():
+    global _process_peak
+
+    # Writing 5 to clear_refs resets VmHWM (Linux >= 4.0); remember the
+    # old value so the process-wide peak is not lost
+    _process_peak = max(_process_peak, peak_rss())
+
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def current_rss():
+    rss = _read_status("VmRSS:")
+    if rss is None:
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    return rss
+
+
+def peak_rss():
+    peak = _read_status("VmHWM:")
+    if peak is None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    return peak
+
+
+def process_peak_rss():
+    """
+    Peak RSS of the whole process, including peaks before step resets
+    (which also reset ru_maxrss).
+    """
+    return max(_process_peak, peak_rss())
+
+
+def _buffers(frame):
+    # Underlying numpy buffers per column (categorical codes, datetime data)
+    if not isinstance(frame, pd.DataFrame):
+        return []
+
+    buffers = []
+    for _, values in frame.items():
+        values = values.values
+        if isinstance(values, pd.Categorical):
+            values = values.codes
+        if isinstance(values, np.ndarray) and values.size:
+            buffers.append(values)
+
+    return buffers
+
+
+def _frame_ranges(frame):
+    return [byte_bounds(buffer) for buffer in _buffers(frame)]
+
+
+def copied_bytes(frame, input_ranges):
+    """
+    Bytes of frame's buffers that overlap none of input_ranges.
+    """
+    total = 0
+    for buffer in _buffers(frame):
+        low, high = byte_bounds(buffer)
+        if not any(low < end and start < high for start, end in input_ranges):
+            total += buffer.nbytes
+
+    return total
+
+
+def _rows(frame):
+    return None if frame is None else len(frame)
+
+
+class Instrumentation:
+    def __init__(self, reset_peak=False):
+        """
+        reset_peak: reset the process's VmHWM before every step (Linux),
+        so every step's peak is exact; off by default since it also
+        resets the peak seen by anything measuring the whole process.
+        """
+        self.reset_peak = reset_peak
+        self.steps = {}
+        self.events = []
+        self._origin = time.perf_counter()
+        self._open = []
+
+    def _observe_peak(self):
+        # The peak counter is shared, so fold it into every open step
+        # before a nested step resets it
+        peak = peak_rss()
+        for frame in self._open:
+            frame["peak"] = max(frame["peak"], peak)
+
+    def begin(self, name, frame):
+        reset = False
+        if self.reset_peak:
+            self._observe_peak()
+            reset = _reset_peak()
+
+        rss = current_rss()
+        peak = rss if reset else peak_rss()
+        self._open.append({
+            "name": name,
+            "rss": rss,
+            "peak": peak,
+            "peak_before": None if reset else peak,
+            "rows_in": _rows(frame),
+            "ranges": _frame_ranges(frame),
+            "start": time.perf_counter(),
+            "cpu": time.process_time(),
+        })
+
+    def end(self, frame):
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        self._observe_peak()
+
+        step = self._open.pop()
+        record = {
+            "wall_s": wall - step["start"],
+            "cpu_s": cpu - step["cpu"],
+            "peak_mem_delta_mb": max(step["peak"] - step["rss"], 0) / MB,
+            # Without a reset, a peak the step did not raise may predate it
+            "peak_mem_exact": (
+                step["peak_before"] is None or step["peak"] > step["peak_before"]
+            ),
+            "rows_in": step["rows_in"],
+            "rows_out": _rows(frame),
+            "copied_mb": copied_bytes(frame, step["ranges"]) / MB,
+        }
+
+        self._accumulate(step["name"], record)
+
+        self.events.append({
+            "name": step["name"],
+            "ph": "X",
+            "ts": (step["start"] - self._origin) * 1e6,
+            "dur": (wall - step["start"]) * 1e6,
+            "pid": os.getpid(),
+            "tid": 0,
+            "args": record,
+        })
+
+    def _accumulate(self, name, record):
+        entry = self.steps.get(name)
+
+        if entry is None:
+            self.steps[name] = {"step": name, "calls": 1, **record}
+            return
+
+        entry["calls"] += 1
+        for key in ("wall_s", "cpu_s", "copied_mb"):
+            entry[key] += record[key]
+        for key in ("rows_in", "rows_out"):
+            if entry[key] is not None and record[key] is not None:
+                entry[key] += record[key]
+        if record["peak_mem_delta_mb"] > entry["peak_mem_delta_mb"]:
+            entry["peak_mem_delta_mb"] = record["peak_mem_delta_mb"]
+            entry["peak_mem_exact"] = record["peak_mem_exact"]
+        elif record["peak_mem_delta_mb"] == entry["peak_mem_delta_mb"]:
+            entry["peak_mem_exact"] |= record["peak_mem_exact"]
+
+    def report(self):
+        """
+        One entry per step, in first-call order, rounded for JSON.
+        """
+        return [
+            {
+                key: round(value, 4) if isinstance(value, float) else value
+                for key, value in entry.items()
+            }
+            for entry in self.steps.values()
+        ]
+
+    def write_chrome_trace(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+        with open(path, "w") as f:
+            json.dump({"traceEvents": self.events, "displayTimeUnit": "ms"}, f)
+
+
+def instrumented_step(rows_in=None, rows_out=None):
+    """
+    Records a pipeline method on self.instrumentation, if set. rows_in /
+    rows_out name the attributes holding the step's input and output
+    frames (rows_out defaults to rows_in).
+    """
+    rows_out = rows_out or rows_in
+
+    def decorate(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            instrumentation = getattr(self, "instrumentation", None)
+            if instrumentation is None:
+                return method(self, *args, **kwargs)
+
+            instrumentation.begin(
+                method.__name__, getattr(self, rows_in, None) if rows_in else None
+            )
+            try:
+                return method(self, *args, **kwargs)
+            finally:
+                instrumentation.end(
+                    getattr(self, rows_out, None) if rows_out else None
+                )
+
+        return wrapper
+
+    return decorate
@@ -0,0 +1,198 @@
+import numpy as np
+import hashlib
+import json
+import os
+import struct
+
+# -------------------------------------------------
+# Single-file model bundle
+#
+# Layout (little-endian):
+#   8 bytes   magic b"CHURNBDL"
+#   4 bytes   format version (uint32)
+#   8 bytes   manifest length in bytes (uint64)
+#   manifest  UTF-8 JSON: feature schema, intercept, global statistics,
+#             training metrics, source file hashes and a content hash
+#   padding   up to the next 64-byte boundary
+#   block     raw float64 coefficients, in schema column order
+#
+# The coefficient block is memory-mapped, so every process scoring from
+# the same file shares its pages. The content hash covers the manifest
+# (without the hash itself) and the block; load_bundle() checks it, the
+# layout and the schema before anything is scored.
+# -------------------------------------------------
+
+MAGIC = b"CHURNBDL"
+FORMAT_VERSION = 1
+
+HEADER = struct.Struct("<8sIQ")
+ALIGNMENT = 64
+
+COEF_DTYPE = "<f8"
+
+
+class BundleError(ValueError):
+    """
+    The file is not a readable bundle, or its content hash does not match.
+    """
+
+
+class SchemaMismatchError(ValueError):
+    """
+    Feature columns differ from the schema the model was trained on.
+    """
+
+
+def _aligned(offset):
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def content_hash(manifest, coef_bytes):
+    body = {key: value for key, value in manifest.items() if key != "content_hash"}
+    canonical = json.dumps(body, sort_keys=True, separators=(",", ":")).encode()
+
+    digest = hashlib.sha256(canonical)
+    digest.update(coef_bytes)
+    return "sha256:" + digest.hexdigest()
+
+
+def file_hash(path):
+    digest = hashlib.sha256()
+
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+
+    return "sha256:" + digest.hexdigest()
+
+
+def write_bundle(path, coef, intercept, feature_columns, global_stats,
+                 metrics=None, model=None, sources=None):
+    """
+    Writes a bundle atomically (temp file + rename); returns its manifest.
+    sources maps the files the bundle was exported from to file_hash().
+    """
+    coef = np.ascontiguousarray(coef, dtype=COEF_DTYPE)
+    feature_columns = list(feature_columns)
+
+    if coef.shape != (len(feature_columns),):
+        raise SchemaMismatchError(
+            f"{len(coef)} coefficients for {len(feature_columns)} feature columns"
+        )
+
+    manifest = {
+        "format_version": FORMAT_VERSION,
+        "schema": {
+            "feature_columns": feature_columns,
+            "dtype": "float64",
+        },
+        "coefficients": {
+            "dtype": COEF_DTYPE,
+            "shape": list(coef.shape),
+        },
+        "intercept": float(intercept),
+        "global_stats": global_stats,
+        "metrics": metrics or {},
+        "model": model or {},
+        "sources": sources or {},
+    }
+    manifest["content_hash"] = content_hash(manifest, coef.tobytes())
+
+    encoded = json.dumps(manifest, indent=4).encode()
+    offset = _aligned(HEADER.size + len(encoded))
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, FORMAT_VERSION, len(encoded)))
+        f.write(encoded)
+        f.write(b"\0" * (offset - HEADER.size - len(encoded)))
+        f.write(coef.tobytes())
+
+    os.replace(tmp_path, path)
+
+    return manifest
+
+
+def read_manifest(path):
+    """
+    (manifest, block offset) without touching the coefficients.
+    """
+    with open(path, "rb") as f:
+        header = f.read(HEADER.size)
+
+        if len(header) < HEADER.size:
+            raise BundleError(f"{path}: truncated header")
+
+        magic, version, length = HEADER.unpack(header)
+
+        if magic != MAGIC:
+            raise BundleError(f"{path}: not a model bundle")
+        if version != FORMAT_VERSION:
+            raise BundleError(
+                f"{path}: format version {version}, expected {FORMAT_VERSION}"
+            )
+
+        try:
+            manifest = json.loads(f.read(length))
+        except ValueError as error:
+            raise BundleError(f"{path}: unreadable manifest ({error})") from None
+
+    return manifest, _aligned(HEADER.size + length)
+
+
+def check_schema(expected, actual):
+    """
+    Raises SchemaMismatchError unless actual has expected's columns in
+    expected's order.
+    """
+    expected, actual = list(expected), list(actual)
+
+    if expected == actual:
+        return
+
+    missing = [col for col in expected if col not in actual]
+    extra = [col for col in actual if col not in expected]
+
+    detail = []
+    if missing:
+        detail.append(f"missing {missing}")
+    if extra:
+        detail.append(f"unexpected {extra}")
+    if not detail:
+        detail.append("columns are in a different order")
+
+    raise SchemaMismatchError("Feature schema mismatch: " + "; ".join(detail))
+
+
+def load_bundle(path, feature_columns=None, verify=True):
+    """
+    Manifest with the coefficients memory-mapped under "coef".
+
+    feature_columns, if given, must match the bundle's schema exactly.
+    verify=False skips the content hash (it reads every page of the block).
+    """
+    manifest, offset = read_manifest(path)
+
+    columns = manifest["schema"]["feature_columns"]
+    shape = tuple(manifest["coefficients"]["shape"])
+
+    if shape != (len(columns),):
+        raise BundleError(f"{path}: {shape} coefficients for {len(columns)} columns")
+
+    expected_size = offset + int(np.prod(shape)) * np.dtype(COEF_DTYPE).itemsize
+    if os.path.getsize(path) != expected_size:
+        raise BundleError(f"{path}: truncated coefficient block")
+
+    if feature_columns is not None:
+        check_schema(columns, feature_columns)
+
+    coef = np.memmap(
+        path, dtype=manifest["coefficients"]["dtype"], mode="r",
+        offset=offset, shape=shape
+    )
+
+    if verify and content_hash(manifest, coef.tobytes()) != manifest["content_hash"]:
+        raise BundleError(f"{path}: content hash mismatch")
+
+    manifest["coef"] = coef
+    return manifest
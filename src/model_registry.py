@@ -0,0 +1,246 @@
+import numpy as np
+import argparse
+import json
+import os
+
+from src.model_bundle import check_schema, file_hash, load_bundle, write_bundle
+
+# -------------------------------------------------
+# Lazy, cached model artifacts
+#
+# Nothing is read at import time. Each artifact is loaded on first use
+# and cached process-wide under (absolute path, mtime), so every
+# ModelRegistry pointing at the same files shares one copy, and a file
+# replaced on disk is picked up on the next call (hot reload).
+#
+# Scoring only needs the scaler folded into the logistic regression
+# weights. export_bundle() writes those, the feature schema, the global
+# statistics and training metrics as one file (src/model_bundle.py),
+# with the sha256 of each source pickle. While every pickle on disk
+# still has its recorded hash (or is absent), the registry reads only
+# the bundle, so a cold start never imports joblib, scipy or
+# scikit-learn. Freshness is decided by content, not mtimes, which git
+# clones, image builds and archive extraction do not preserve. Global
+# statistics are frozen into the bundle at export.
+# -------------------------------------------------
+
+MODEL_DIR = "models"
+
+MODEL_FILE = "final_churn_model.pkl"
+SCALER_FILE = "scaler.pkl"
+FEATURE_FILE = "feature_columns.pkl"
+GLOBAL_STATS_FILE = "global_stats.json"
+
+BUNDLE_FILE = "churn_model.bundle"
+
+# (absolute paths, mtimes) -> loaded object
+_CACHE = {}
+
+# (absolute path, mtime, size) -> file_hash(path)
+_HASHES = {}
+
+
+def _load_pickle(path):
+    import joblib
+
+    return joblib.load(path)
+
+
+def _load_json(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def load_cached(paths, loader):
+    """
+    Returns loader(*paths), reusing the cached object while none of the
+    files has changed. Stale versions of the same files are dropped.
+    """
+    paths = tuple(os.path.abspath(path) for path in paths)
+    key = (paths, tuple(os.stat(path).st_mtime_ns for path in paths))
+
+    if key not in _CACHE:
+        for stale in [k for k in _CACHE if k[0] == paths]:
+            del _CACHE[stale]
+
+        _CACHE[key] = loader(*paths)
+
+    return _CACHE[key]
+
+
+def clear_cache():
+    _CACHE.clear()
+    _HASHES.clear()
+
+
+def cached_file_hash(path):
+    """
+    file_hash(path), recomputed only when the file's mtime or size changes.
+    """
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+    key = (path, stat.st_mtime_ns, stat.st_size)
+
+    if key not in _HASHES:
+        for stale in [k for k in _HASHES if k[0] == path]:
+            del _HASHES[stale]
+
+        _HASHES[key] = file_hash(path)
+
+    return _HASHES[key]
+
+
+def fold_scaler(model, scaler):
+    """
+    Folds StandardScaler into the logistic regression weights:
+    w . (x - mean) / scale + b  ==  (w / scale) . x + (b - w . mean / scale)
+    """
+    coef = model.coef_[0] / scaler.scale_
+    intercept = model.intercept_[0] - np.dot(coef, scaler.mean_)
+
+    return np.ascontiguousarray(coef), float(intercept)
+
+
+class ModelRegistry:
+    def __init__(self, model_dir=MODEL_DIR, feature_columns=None):
+        self.model_dir = model_dir
+
+        # Expected schema; loading artifacts with other columns fails
+        self.expected_columns = feature_columns
+
+    def path(self, name):
+        return os.path.join(self.model_dir, name)
+
+    @property
+    def model(self):
+        return load_cached([self.path(MODEL_FILE)], _load_pickle)
+
+    @property
+    def scaler(self):
+        return load_cached([self.path(SCALER_FILE)], _load_pickle)
+
+    @property
+    def global_stats(self):
+        if self.has_fresh_bundle():
+            return self.bundle()["global_stats"]
+
+        return load_cached([self.path(GLOBAL_STATS_FILE)], _load_json)
+
+    @property
+    def feature_columns(self):
+        if self.has_fresh_bundle():
+            return self.bundle()["schema"]["feature_columns"]
+
+        columns = load_cached([self.path(FEATURE_FILE)], _load_pickle)
+
+        if self.expected_columns is not None:
+            check_schema(columns, self.expected_columns)
+
+        return columns
+
+    def fused(self):
+        """
+        (coef, intercept) of the scaler-folded model.
+        """
+        if self.has_fresh_bundle():
+            bundle = self.bundle()
+            return bundle["coef"], bundle["intercept"]
+
+        return load_cached(
+            [self.path(MODEL_FILE), self.path(SCALER_FILE)],
+            lambda model_path, scaler_path: fold_scaler(
+                _load_pickle(model_path), _load_pickle(scaler_path)
+            )
+        )
+
+    def version(self):
+        """
+        Modification times of the artifacts scoring currently uses; any
+        replaced file changes it (e.g. to invalidate cached predictions).
+        """
+        if self.has_fresh_bundle():
+            names = [BUNDLE_FILE]
+        else:
+            names = [MODEL_FILE, SCALER_FILE, FEATURE_FILE, GLOBAL_STATS_FILE]
+
+        return tuple(os.stat(self.path(name)).st_mtime_ns for name in names)
+
+    def _sources(self):
+        return [self.path(name) for name in (MODEL_FILE, SCALER_FILE, FEATURE_FILE)]
+
+    def has_fresh_bundle(self):
+        """
+        True when the bundle exists and every source pickle present has
+        the content hash recorded at export.
+        """
+        if not os.path.exists(self.path(BUNDLE_FILE)):
+            return False
+
+        recorded = self.bundle()["sources"]
+
+        # Bundles exported before source hashes were recorded
+        if not isinstance(recorded, dict):
+            return False
+
+        return all(
+            recorded.get(os.path.basename(path)) == cached_file_hash(path)
+            for path in self._sources() if os.path.exists(path)
+        )
+
+    def bundle(self):
+        """
+        Bundle manifest with memory-mapped coefficients; integrity and
+        schema are checked when the file is (re)loaded.
+        """
+        bundle = load_cached([self.path(BUNDLE_FILE)], load_bundle)
+
+        if self.expected_columns is not None:
+            check_schema(bundle["schema"]["feature_columns"], self.expected_columns)
+
+        return bundle
+
+    def export_bundle(self, metrics=None, model_info=None):
+        """
+        Writes the folded weights, feature schema, global statistics and
+        training metrics as one bundle next to the pickles.
+        """
+        model = self.model
+        coef, intercept = fold_scaler(model, self.scaler)
+
+        manifest = write_bundle(
+            self.path(BUNDLE_FILE),
+            coef,
+            intercept,
+            feature_columns=load_cached([self.path(FEATURE_FILE)], _load_pickle),
+            global_stats=load_cached([self.path(GLOBAL_STATS_FILE)], _load_json),
+            metrics=metrics,
+            model={
+                "type": type(model).__name__,
+                "params": model.get_params(),
+                **(model_info or {}),
+            },
+            sources={
+                os.path.basename(path): file_hash(path) for path in self._sources()
+            },
+        )
+
+        print(f"Exported {len(coef)} folded coefficients to {self.path(BUNDLE_FILE)} "
+              f"({manifest['content_hash'][:19]})")
+
+        return manifest
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the model bundle")
+    parser.add_argument(
+        "--report",
+        default=None,
+        help="training_report.json whose hold-out metrics go into the bundle"
+    )
+    args = parser.parse_args()
+
+    metrics = None
+    if args.report is not None:
+        metrics = _load_json(args.report)["best"]["test"]
+
+    ModelRegistry().export_bundle(metrics=metrics)
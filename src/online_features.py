@@ -0,0 +1,188 @@
+import numpy as np
+import pandas as pd
+
+from src import predict
+from src.feature_specs import (
+    SECONDARY_FLAGS,
+    SECONDARY_REDUCTIONS,
+    plan_aggregates,
+    row_flag_columns,
+    rfm_columns,
+    behavioral_columns,
+    temporal_columns,
+    product_columns,
+    engagement_columns,
+    engagement_score_columns,
+    engagement_score,
+    advanced_features,
+)
+
+# -------------------------------------------------
+# Online features for a single customer
+#
+# FeatureEngineer derives features for every customer from grouped
+# frames. For one customer that is mostly pandas overhead, so here the
+# same aggregate plan (plan_aggregates, SECONDARY_FLAGS/REDUCTIONS) is
+# evaluated with NumPy reductions over the customer's invoice lines, and
+# the feature formulas (the *_columns functions) run on the resulting
+# scalars. Population statistics come from the saved global stats, so
+# the values match the batch pipeline for the same snapshot date.
+#
+# Input lines use the DataCleaner schema (InvoiceNo, StockCode,
+# Quantity, InvoiceDate and UnitPrice or TotalPrice; Month, DayOfWeek
+# and Hour are derived when missing), as a DataFrame or a dict of columns.
+# -------------------------------------------------
+
+LINE_COLUMNS = ["InvoiceNo", "StockCode", "Quantity", "InvoiceDate"]
+CODE_COLUMNS = ["InvoiceNo", "StockCode"]
+
+
+def _reduce(values, how):
+    if how == "size":
+        return np.int64(values.size)
+    if how == "nunique":
+        return np.int64(np.unique(values).size)
+    if how == "std":
+        # Sample std like pandas; undefined for a single value
+        return np.std(values, ddof=1) if values.size > 1 else np.float64(np.nan)
+
+    return getattr(np, how)(values)
+
+
+def _reduce_groups(values, groups, n_groups, how):
+    # groups: group number per line, 0 .. n_groups - 1
+    if how == "size":
+        return np.bincount(groups, minlength=n_groups)
+
+    if how == "nunique":
+        _, codes = np.unique(values, return_inverse=True)
+        width = codes.max() + 1
+        pairs = np.unique(groups * width + codes)
+        return np.bincount(pairs // width, minlength=n_groups)
+
+    return np.array([
+        _reduce(values[groups == group], how) for group in range(n_groups)
+    ])
+
+
+def _codes(values):
+    # Hashed codes instead of strings, so no step sorts Python objects;
+    # Series (e.g. categoricals) are factorized without conversion
+    if not isinstance(values, pd.Series):
+        values = np.asarray(values)
+
+    return pd.factorize(values)[0]
+
+
+def invoice_line_columns(lines):
+    """
+    Column arrays the aggregate plan reads, from a customer's cleaned
+    invoice lines.
+    """
+    columns = {
+        col: _codes(lines[col]) if col in CODE_COLUMNS else np.asarray(lines[col])
+        for col in LINE_COLUMNS
+    }
+
+    dates = columns["InvoiceDate"]
+    if not np.issubdtype(dates.dtype, np.datetime64):
+        dates = pd.to_datetime(dates).to_numpy()
+    columns["InvoiceDate"] = dates.astype("datetime64[ns]")
+
+    # Same derived columns as DataCleaner.add_derived_columns
+    if "TotalPrice" in lines:
+        columns["TotalPrice"] = np.asarray(lines["TotalPrice"])
+    else:
+        columns["TotalPrice"] = columns["Quantity"] * np.asarray(lines["UnitPrice"])
+
+    for col, field in [("Month", "month"), ("DayOfWeek", "dayofweek"), ("Hour", "hour")]:
+        if col in lines:
+            columns[col] = np.asarray(lines[col])
+        else:
+            calendar = pd.DatetimeIndex(columns["InvoiceDate"])
+            columns[col] = getattr(calendar, field).to_numpy()
+
+    columns.update(row_flag_columns(columns))
+
+    return columns
+
+
+def customer_aggregates(lines, plan=None):
+    """
+    One customer's compile_aggregates() row as a dict of scalars.
+    """
+    columns = invoice_line_columns(lines)
+
+    if not len(columns["InvoiceNo"]):
+        raise ValueError("No invoice lines to aggregate")
+
+    agg = {}
+
+    for key, specs in (plan or plan_aggregates()).items():
+        if len(key) == 1:
+            for name, (source, how) in specs.items():
+                agg[name] = _reduce(columns[source], how)
+            continue
+
+        # Secondary key within the customer, e.g. (CustomerID, StockCode)
+        group_column = key[1]
+        _, groups = np.unique(columns[group_column], return_inverse=True)
+        n_groups = groups.max() + 1
+
+        grouped = {
+            name: _reduce_groups(columns[source], groups, n_groups, how)
+            for name, (source, how) in specs.items()
+        }
+
+        for name, flag in SECONDARY_FLAGS.get(key, {}).items():
+            grouped[name] = flag(grouped)
+
+        for name, (source, how) in SECONDARY_REDUCTIONS[key].items():
+            agg[name] = _reduce(np.asarray(grouped[source]), how)
+
+    return agg
+
+
+def customer_features(lines, snapshot_date, stats):
+    """
+    Model features for one customer, as {column: float}, in the column
+    order of FeatureEngineer.run_pipeline.
+    """
+    agg = customer_aggregates(lines)
+    snapshot_date = pd.Timestamp(snapshot_date).to_datetime64().astype("datetime64[ns]")
+
+    features = {}
+
+    # Scalar division by zero is masked by np.where, as in the batch path
+    with np.errstate(divide="ignore", invalid="ignore"):
+        features.update(rfm_columns(agg, snapshot_date))
+        features.update(behavioral_columns(agg))
+        features.update(temporal_columns(agg))
+        features.update(product_columns(agg))
+        features.update(engagement_score_columns(features, stats))
+        features.update(engagement_columns(agg))
+
+        features["EngagementScore"] = engagement_score(features)
+
+        advanced_features(features, stats, copy=False)
+
+    return {name: float(value) for name, value in features.items()}
+
+
+def score_customer(lines, snapshot_date=None, registry=None):
+    """
+    Churn probability for one customer's invoice lines, as of
+    snapshot_date (default: now).
+    """
+    registry = registry or predict.registry
+
+    if snapshot_date is None:
+        snapshot_date = pd.Timestamp.now()
+
+    features = customer_features(lines, snapshot_date, registry.global_stats)
+    coef, intercept = registry.fused()
+
+    x = np.array([features[col] for col in registry.feature_columns])
+
+    return float(predict.sigmoid(x @ coef + intercept))
+
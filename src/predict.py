@@ -1,37 +1,156 @@
-import joblib
+import numpy as np
 import pandas as pd
+import math
+import numbers
 import os
 
-# Load artifacts
-# Load artifacts from data/processed
-MODEL_PATH = os.path.join("models", "final_churn_model.pkl")
-SCALER_PATH = os.path.join("models", "scaler.pkl")
-FEATURE_PATH = os.path.join("models", "feature_columns.pkl")
+from src.feature_specs import GLOBAL_FEATURE_COLUMNS, apply_global_features
+from src.model_bundle import SchemaMismatchError
+from src.model_registry import (
+    MODEL_DIR,
+    MODEL_FILE,
+    SCALER_FILE,
+    FEATURE_FILE,
+    GLOBAL_STATS_FILE,
+    ModelRegistry,
+)
 
+# Artifacts load lazily on first use and reload when the files change
+MODEL_PATH = os.path.join(MODEL_DIR, MODEL_FILE)
+SCALER_PATH = os.path.join(MODEL_DIR, SCALER_FILE)
+FEATURE_PATH = os.path.join(MODEL_DIR, FEATURE_FILE)
+GLOBAL_STATS_PATH = os.path.join(MODEL_DIR, GLOBAL_STATS_FILE)
 
-model = joblib.load(MODEL_PATH)
-scaler = joblib.load(SCALER_PATH)
-feature_columns = joblib.load(FEATURE_PATH)
+registry = ModelRegistry(MODEL_DIR)
+
+THRESHOLD = 0.5
+
+
+def __getattr__(name):
+    # Keeps predict.model, predict.feature_columns, predict.coef, ... working
+    if name in ("model", "scaler", "feature_columns", "global_stats"):
+        return getattr(registry, name)
+    if name == "coef":
+        return registry.fused()[0]
+    if name == "intercept":
+        return registry.fused()[1]
+
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def _registry(registry):
+    # Looked up at call time, so a reassigned predict.registry is used
+    return registry if registry is not None else globals()["registry"]
+
+
+def sigmoid(z):
+    # 1 / (1 + exp(-z)) without overflow; same values as scipy's expit,
+    # which also passes NaN features through silently
+    with np.errstate(invalid="ignore"):
+        return np.exp(-np.logaddexp(0.0, -z))
+
+
+def add_global_features(df: pd.DataFrame, registry=None):
+    """
+    Derives the population-level columns (scores, quartiles, flags)
+    from per-customer features using the training statistics, so a
+    single customer can be scored without the training population.
+    """
+    registry = _registry(registry)
+
+    if all(col in df.columns for col in registry.feature_columns):
+        return df
+
+    return apply_global_features(df, registry.global_stats)
+
+
+def validate_record(record, registry=None):
+    """
+    Checks one customer's feature dict before it is batched with others,
+    where a missing key would silently become NaN. Raises
+    SchemaMismatchError for missing per-customer features, ValueError for
+    values that are not finite numbers.
+    """
+    if not isinstance(record, dict):
+        raise ValueError(f"Expected a JSON object per customer, got {type(record).__name__}")
+
+    columns = _registry(registry).feature_columns
+
+    # Global columns may be omitted; they are derived from the others
+    missing = [
+        col for col in columns
+        if col not in record and col not in GLOBAL_FEATURE_COLUMNS
+    ]
+    if missing:
+        raise SchemaMismatchError(f"Feature schema mismatch: missing {missing}")
+
+    invalid = [
+        col for col in columns
+        if col in record and not (
+            isinstance(record[col], numbers.Real) and math.isfinite(record[col])
+        )
+    ]
+    if invalid:
+        raise ValueError(f"Features must be finite numbers: {invalid}")
 
 
 def preprocess_input(df: pd.DataFrame):
     """
     Ensures correct feature order and scaling.
     """
-    df = df.copy()
-    df = df[feature_columns]  # enforce column order
-    df_scaled = scaler.transform(df)
+    df = add_global_features(df)
+    df = df[registry.feature_columns]  # enforce column order
+    df_scaled = registry.scaler.transform(df)
     return df_scaled
 
 
+def feature_matrix(df: pd.DataFrame, dtype=np.float64, registry=None):
+    """
+    Contiguous feature matrix in model column order.
+    """
+    registry = _registry(registry)
+
+    df = add_global_features(df, registry)
+    columns = registry.feature_columns
+
+    # Fail with the model's schema instead of a bare KeyError
+    missing = [col for col in columns if col not in df.columns]
+    if missing:
+        raise SchemaMismatchError(f"Feature schema mismatch: missing {missing}")
+
+    return np.ascontiguousarray(df[columns].to_numpy(dtype=dtype))
+
+
+def score_matrix(X: np.ndarray, registry=None):
+    """
+    Churn probabilities for a feature matrix: one dot product + sigmoid.
+    """
+    coef, intercept = _registry(registry).fused()
+    return sigmoid(X @ coef.astype(X.dtype, copy=False) + intercept)
+
+
+def predict_arrays(df: pd.DataFrame, dtype=np.float64):
+    """
+    Returns (probabilities, predictions) arrays without copying the frame.
+    """
+    probabilities = score_matrix(feature_matrix(df, dtype))
+    predictions = (probabilities >= THRESHOLD).astype(int)
+
+    return probabilities, predictions
+
+
+def predict_churn_sklearn(df: pd.DataFrame):
+    """
+    Reference probabilities through scaler.transform + predict_proba.
+    """
+    return registry.model.predict_proba(preprocess_input(df))[:, 1]
+
+
 def predict_churn(df: pd.DataFrame):
     """
     Returns churn probability and label.
     """
-    df_processed = preprocess_input(df)
-
-    probabilities = model.predict_proba(df_processed)[:, 1]
-    predictions = (probabilities >= 0.5).astype(int)
+    probabilities, predictions = predict_arrays(df)
 
     result = df.copy()
     result["churn_probability"] = probabilities
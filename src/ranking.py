@@ -0,0 +1,228 @@
+import numpy as np
+import pandas as pd
+import argparse
+import time
+
+from src import predict
+from src.dashboard_summary import SEGMENT_COLUMNS
+from src.instrumentation import process_peak_rss
+from src.storage import iter_table, write_table
+
+# -------------------------------------------------
+# Top-K at-risk customers (python -m src.ranking IN)
+#
+# Ranks customers by churn probability without predict_churn's copied
+# frame and full sort: customers are scored chunk by chunk (feature
+# matrix + folded weights), and per segment only the K best survive
+# each chunk. A full ranking first drops every chunk row at or below its
+# current K-th score, then selects among the rest with a partial sort
+# (np.partition). Memory is O(chunksize + K x segments), whatever the
+# number of customers.
+#
+# Ties go to the earlier input row, so the result equals a stable
+# descending sort of all probabilities cut at K. Customers with a NaN
+# probability (missing features) or without a segment value are not
+# ranked.
+# -------------------------------------------------
+
+CHUNKSIZE = 100_000
+
+# Carried into the result when present, in addition to keep_columns
+ID_COLUMN = "CustomerID"
+
+PROBABILITY_COLUMN = "churn_probability"
+
+
+def top_k_indices(scores, positions, k):
+    """
+    Indices of the k highest scores, best first; ties go to the lower
+    position and NaN never ranks.
+    """
+    candidates = np.flatnonzero(~np.isnan(scores))
+
+    if len(candidates) > k:
+        values = scores[candidates]
+        kth = np.partition(values, len(values) - k)[len(values) - k]
+
+        above = candidates[values > kth]
+        tied = candidates[values == kth]
+        tied = tied[np.argsort(positions[tied], kind="stable")][:k - len(above)]
+
+        candidates = np.concatenate([above, tied])
+
+    order = np.lexsort((positions[candidates], -scores[candidates]))
+    return candidates[order]
+
+
+class TopK:
+    """
+    The k best (score, position, carried values) seen so far. Positions
+    must increase from one push to the next.
+    """
+    def __init__(self, k):
+        self.k = k
+        self.scores = np.empty(0)
+        self.positions = np.empty(0, dtype=np.int64)
+        self.columns = {}
+
+    def push(self, scores, positions, columns):
+        # Once full, a later row must beat the K-th score outright: on a
+        # tie the earlier row, already kept, wins
+        if len(self.scores) == self.k:
+            rows = np.flatnonzero(scores > self.scores[-1])
+        else:
+            rows = np.arange(len(scores))
+
+        if not len(rows):
+            return
+
+        rows = rows[top_k_indices(scores[rows], positions[rows], self.k)]
+
+        scores = np.concatenate([self.scores, scores[rows]])
+        positions = np.concatenate([self.positions, positions[rows]])
+        keep = top_k_indices(scores, positions, self.k)
+
+        self.scores = scores[keep]
+        self.positions = positions[keep]
+        self.columns = {
+            col: np.concatenate([self.columns.get(col, values[:0]), values[rows]])[keep]
+            for col, values in columns.items()
+        }
+
+
+class AtRiskRanking:
+    def __init__(self, k, segment=None, keep_columns=None, registry=None):
+        """
+        Top k customers by churn probability, overall or per value of
+        the `segment` column (e.g. Recency_Bucket, RFM_Score).
+        """
+        self.k = k
+        self.segment = segment
+        self.keep_columns = list(keep_columns or [])
+        self.registry = registry
+        self.rows = 0
+        self.heaps = {}
+
+    def add(self, chunk: pd.DataFrame):
+        """
+        Scores one chunk of customer features and merges it into the
+        ranking.
+        """
+        # Global features once: feature_matrix reuses them, and a
+        # segment such as Recency_Bucket may be one of them
+        chunk = predict.add_global_features(chunk, self.registry)
+        scores = predict.score_matrix(
+            predict.feature_matrix(chunk, registry=self.registry), self.registry
+        )
+        positions = np.arange(self.rows, self.rows + len(chunk))
+        self.rows += len(chunk)
+
+        carried = self.keep_columns
+        if ID_COLUMN in chunk.columns and ID_COLUMN not in carried:
+            carried = [ID_COLUMN, *carried]
+        columns = {col: chunk[col].to_numpy() for col in carried}
+
+        if self.segment is None:
+            self._heap(None).push(scores, positions, columns)
+            return
+
+        codes, segments = pd.factorize(chunk[self.segment])
+
+        for code, segment in enumerate(segments):
+            rows = np.flatnonzero(codes == code)
+            self._heap(segment).push(
+                scores[rows],
+                positions[rows],
+                {col: values[rows] for col, values in columns.items()},
+            )
+
+    def _heap(self, segment):
+        if segment not in self.heaps:
+            self.heaps[segment] = TopK(self.k)
+
+        return self.heaps[segment]
+
+    def result(self):
+        """
+        One row per ranked customer: [segment], rank, carried columns,
+        churn_probability and row (position in the scored input).
+        """
+        frames = []
+
+        for segment in sorted(self.heaps, key=lambda s: (s is None, s)):
+            heap = self.heaps[segment]
+
+            frame = {}
+            if self.segment is not None:
+                frame[self.segment] = np.repeat(segment, len(heap.scores))
+            frame["rank"] = np.arange(1, len(heap.scores) + 1)
+            frame.update(heap.columns)
+            frame[PROBABILITY_COLUMN] = heap.scores
+            frame["row"] = heap.positions
+
+            frames.append(pd.DataFrame(frame))
+
+        if not frames:
+            return pd.DataFrame(columns=["rank", PROBABILITY_COLUMN, "row"])
+
+        return pd.concat(frames, ignore_index=True)
+
+
+def _chunks(source, chunksize):
+    if isinstance(source, str):
+        yield from iter_table(source, chunksize)
+    elif isinstance(source, pd.DataFrame):
+        for start in range(0, len(source), chunksize):
+            yield source.iloc[start:start + chunksize]
+    else:
+        yield from source
+
+
+def top_at_risk(source, k=100, segment=None, chunksize=CHUNKSIZE,
+                keep_columns=None, registry=None):
+    """
+    Top k customers most likely to churn, overall or per segment.
+
+    source: a CSV / Parquet path (streamed), a DataFrame, or an iterable
+    of DataFrame chunks of customer features.
+    """
+    ranking = AtRiskRanking(k, segment, keep_columns, registry)
+
+    for chunk in _chunks(source, chunksize):
+        ranking.add(chunk)
+
+    return ranking.result()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rank the customers most likely to churn")
+    parser.add_argument("input_path", help="CSV or Parquet customer features")
+    parser.add_argument("-k", "--top", type=int, default=100,
+                        help="Customers kept per segment")
+    parser.add_argument("--segment", default=None,
+                        help=f"Rank within each value of this column, e.g. {SEGMENT_COLUMNS}")
+    parser.add_argument("--chunksize", type=int, default=CHUNKSIZE,
+                        help="Customers scored per chunk")
+    parser.add_argument("--keep-columns", nargs="+",
+                        help=f"Input columns copied to the result ({ID_COLUMN} always is)")
+    parser.add_argument("--output", default=None,
+                        help="Write the ranking as CSV / Parquet instead of printing it")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    ranking = AtRiskRanking(args.top, args.segment, args.keep_columns)
+
+    for chunk in iter_table(args.input_path, args.chunksize):
+        ranking.add(chunk)
+
+    result = ranking.result()
+    elapsed = time.perf_counter() - start
+
+    if args.output:
+        write_table(result, args.output)
+    else:
+        print(result.to_string(index=False))
+
+    print(f"Ranked {ranking.rows:,} customers in {elapsed:.2f}s "
+          f"({ranking.rows / max(elapsed, 1e-9):,.0f} rows/s), "
+          f"peak RSS {process_peak_rss() / 1024 ** 2:,.0f} MB")
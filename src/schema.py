@@ -0,0 +1,91 @@
+# -------------------------------------------------
+# Compact dtype plan for transaction tables
+#
+# Repeated strings become categoricals (dictionary-encoded in Parquet),
+# calendar fields use the smallest integer type that fits, and CustomerID
+# is int32. Prices stay float64: they are summed into Monetary, and
+# float32 rounding would change the engineered features.
+# -------------------------------------------------
+
+TRANSACTION_SCHEMA = {
+    "InvoiceNo": "category",
+    "StockCode": "category",
+    "Description": "category",
+    "Country": "category",
+    "Quantity": "int32",
+    "UnitPrice": "float64",
+    "CustomerID": "int32",
+    "TotalPrice": "float64",
+    "Year": "int16",
+    "Month": "int8",
+    "DayOfWeek": "int8",
+    "Hour": "int8"
+}
+
+# Raw export columns, before renaming; CustomerID still has missing values
+# and float32 holds every ID below 2**24 exactly
+RAW_SCHEMA = {
+    "Invoice": "category",
+    "StockCode": "category",
+    "Description": "category",
+    "Country": "category",
+    "Quantity": "int32",
+    "Price": "float64",
+    "Customer ID": "float32"
+}
+
+
+def apply_schema(df, schema=TRANSACTION_SCHEMA):
+    """
+    Casts the columns present in both the frame and the schema.
+    """
+    dtypes = {
+        col: dtype for col, dtype in schema.items()
+        if col in df.columns and str(df[col].dtype) != dtype
+    }
+
+    if not dtypes:
+        return df
+
+    # Shallow copy: columns already in the right dtype are shared, and the
+    # caller's frame is left untouched
+    converted = df.copy(deep=False)
+
+    for col, dtype in dtypes.items():
+        values = df[col]
+
+        # Numeric or mixed int/str codes (e.g. StockCode) become strings
+        # first, so every chunk encodes the same code the same way
+        if dtype == "category":
+            values = values.where(values.isna(), values.astype(str))
+
+        converted[col] = values.astype(dtype)
+
+    return converted
+
+
+def memory_report(before, after):
+    """
+    Per-column and total bytes (deep) before and after a dtype change.
+    """
+    before_usage = before.memory_usage(deep=True, index=False)
+    after_usage = after.memory_usage(deep=True, index=False)
+
+    columns = {
+        col: {
+            "dtype_before": str(before[col].dtype),
+            "dtype_after": str(after[col].dtype),
+            "bytes_before": int(before_usage[col]),
+            "bytes_after": int(after_usage[col])
+        }
+        for col in before.columns
+    }
+
+    return {
+        "rows": len(before),
+        "bytes_before": int(before_usage.sum()),
+        "bytes_after": int(after_usage.sum()),
+        "bytes_per_row_before": round(before_usage.sum() / max(len(before), 1), 1),
+        "bytes_per_row_after": round(after_usage.sum() / max(len(after), 1), 1),
+        "columns": columns
+    }
@@ -0,0 +1,317 @@
+import argparse
+import json
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+
+from src import predict
+from src.shadow import MODES, ShadowScorer, parse_challengers
+
+# -------------------------------------------------
+# Local HTTP scoring service (python -m src.service)
+#
+#   POST /predict   one customer (JSON object) or a list of them
+#   GET  /health    liveness + content hash of the served model bundle
+#   GET  /metrics   request, batch and latency counters
+#
+# Each request thread validates its rows (predict.validate_record), so
+# a malformed row fails on its own instead of turning into NaN features
+# in a shared batch, then hands them to a MicroBatcher and waits. A single
+# worker thread drains the queue into batches of up to max_batch_size
+# rows, waiting at most max_wait_ms for a batch to fill, and scores each
+# batch with one vectorized predict_arrays() call. Concurrent
+# single-customer calls therefore share one DataFrame build and one
+# matrix product instead of paying for them per request.
+#
+# With --challenger, batches go through a ShadowScorer (src/shadow.py)
+# instead: responses still carry the champion's scores, challengers are
+# logged for offline comparison and their overhead shows in /metrics.
+# -------------------------------------------------
+
+LATENCY_WINDOW = 10000
+
+
+class MicroBatcher:
+    def __init__(self, max_batch_size=64, max_wait_ms=2.0, shadow=None):
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.queue = queue.Queue()
+        self.batches = 0
+        self.rows = 0
+        self.errors = 0
+        self.shadow = shadow
+        self._errors_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._worker = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._worker.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._worker.join()
+
+    def submit(self, record):
+        """
+        Queues one customer's feature dict; returns a Future that
+        resolves to (probability, prediction).
+        """
+        future = Future()
+
+        try:
+            predict.validate_record(record)
+        except Exception as e:
+            self._count_error()
+            future.set_exception(e)
+            return future
+
+        self.queue.put((record, future))
+        return future
+
+    def _count_error(self):
+        with self._errors_lock:
+            self.errors += 1
+
+    def _collect(self):
+        try:
+            batch = [self.queue.get(timeout=0.1)]
+        except queue.Empty:
+            return []
+
+        deadline = time.perf_counter() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                batch.append(
+                    self.queue.get(timeout=remaining) if remaining > 0
+                    else self.queue.get_nowait()
+                )
+            except queue.Empty:
+                break
+
+        return batch
+
+    def _score(self, batch):
+        df = pd.DataFrame.from_records([record for record, _ in batch])
+
+        if self.shadow is None:
+            probabilities, predictions = predict.predict_arrays(df)
+        else:
+            probabilities, predictions = self.shadow.score(df)
+
+        for (_, future), probability, prediction in zip(batch, probabilities, predictions):
+            # Never answer NaN (not valid JSON), e.g. for a Recency
+            # outside every Recency_Bucket
+            if not np.isfinite(probability):
+                self._count_error()
+                future.set_exception(ValueError("Customer could not be scored: "
+                                                "non-finite churn probability"))
+                continue
+
+            future.set_result((float(probability), int(prediction)))
+
+    def _run(self):
+        while not self._stop.is_set():
+            batch = self._collect()
+            if not batch:
+                continue
+
+            self.batches += 1
+            self.rows += len(batch)
+
+            try:
+                self._score(batch)
+            except Exception:
+                # Isolate the bad rows so one malformed request does not
+                # fail everyone it was batched with
+                for item in batch:
+                    try:
+                        self._score([item])
+                    except Exception as e:
+                        self._count_error()
+                        item[1].set_exception(e)
+
+
+class ScoringService:
+    def __init__(self, max_batch_size=64, max_wait_ms=2.0, shadow=None):
+        self.batcher = MicroBatcher(max_batch_size, max_wait_ms, shadow)
+        self.started = time.time()
+        self.requests = 0
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self._lock = threading.Lock()
+
+    def predict(self, payload):
+        start = time.perf_counter()
+
+        records = payload if isinstance(payload, list) else [payload]
+        futures = [self.batcher.submit(record) for record in records]
+        results = [future.result() for future in futures]
+
+        with self._lock:
+            self.requests += 1
+            self.latencies.append(time.perf_counter() - start)
+
+        scored = [
+            {"churn_probability": probability, "churn_prediction": prediction}
+            for probability, prediction in results
+        ]
+
+        return scored if isinstance(payload, list) else scored[0]
+
+    def health(self):
+        registry = predict.registry
+        bundle = registry.bundle() if registry.has_fresh_bundle() else None
+
+        return {
+            "status": "ok",
+            "model_bundle": bundle["content_hash"] if bundle else None,
+            "threshold": predict.THRESHOLD,
+        }
+
+    def metrics(self):
+        with self._lock:
+            latencies = np.array(self.latencies) * 1000.0
+            requests = self.requests
+
+        batcher = self.batcher
+        report = {
+            "uptime_s": round(time.time() - self.started, 1),
+            "requests": requests,
+            "rows": batcher.rows,
+            "batches": batcher.batches,
+            "errors": batcher.errors,
+            "mean_batch_size": round(batcher.rows / max(batcher.batches, 1), 2),
+            "queue_depth": batcher.queue.qsize(),
+            "max_batch_size": batcher.max_batch_size,
+            "max_wait_ms": batcher.max_wait * 1000.0,
+        }
+
+        if len(latencies):
+            report["latency_ms"] = {
+                "p50": round(float(np.percentile(latencies, 50)), 3),
+                "p99": round(float(np.percentile(latencies, 99)), 3),
+                "max": round(float(latencies.max()), 3),
+            }
+
+        if batcher.shadow is not None:
+            report["shadow"] = batcher.shadow.report()
+
+        return report
+
+
+def make_handler(service):
+    class Handler(BaseHTTPRequestHandler):
+        # Keep-alive, so clients can reuse one connection per worker
+        protocol_version = "HTTP/1.1"
+
+        def _send(self, status, body):
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            if self.path == "/health":
+                self._send(200, service.health())
+            elif self.path == "/metrics":
+                self._send(200, service.metrics())
+            else:
+                self._send(404, {"error": "not found"})
+
+        def do_POST(self):
+            if self.path != "/predict":
+                self._send(404, {"error": "not found"})
+                return
+
+            length = int(self.headers.get("Content-Length", 0))
+
+            try:
+                payload = json.loads(self.rfile.read(length))
+            except ValueError:
+                self._send(400, {"error": "invalid JSON"})
+                return
+
+            try:
+                self._send(200, service.predict(payload))
+            except Exception as e:
+                self._send(422, {"error": str(e)})
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+class ScoringHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # Default backlog of 5 resets connections when many clients connect at once
+    request_queue_size = 256
+
+
+def make_server(host="127.0.0.1", port=8000, max_batch_size=64, max_wait_ms=2.0,
+                shadow=None):
+    """
+    Builds the HTTP server and starts its batcher; call serve_forever().
+    """
+    service = ScoringService(max_batch_size, max_wait_ms, shadow)
+    service.batcher.start()
+
+    server = ScoringHTTPServer((host, port), make_handler(service))
+    server.service = service
+
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local churn scoring service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--max-batch-size", type=int, default=64,
+                        help="Most rows scored in one vectorized call")
+    parser.add_argument("--max-wait-ms", type=float, default=2.0,
+                        help="Longest a request waits for its batch to fill")
+    parser.add_argument("--challenger", action="append",
+                        help="[NAME=]model directory scored in shadow; repeatable")
+    parser.add_argument("--shadow-mode", choices=MODES, default="threads",
+                        help="Score challengers inline or in a thread pool")
+    parser.add_argument("--shadow-workers", type=int, default=1,
+                        help="Threads scoring challengers (--shadow-mode threads)")
+    parser.add_argument("--shadow-log", default="shadow_scores.csv",
+                        help="CSV or Parquet log of champion and challenger scores")
+    args = parser.parse_args()
+
+    shadow = None
+    if args.challenger:
+        shadow = ShadowScorer(
+            parse_challengers(args.challenger),
+            mode=args.shadow_mode,
+            workers=args.shadow_workers,
+            log_path=args.shadow_log,
+        )
+
+    server = make_server(
+        args.host, args.port, args.max_batch_size, args.max_wait_ms, shadow
+    )
+    print(f"Scoring service on http://{args.host}:{server.server_address[1]} "
+          f"(batch <= {args.max_batch_size}, wait <= {args.max_wait_ms} ms)")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.service.batcher.stop()
+        server.server_close()
+
+        if shadow is not None:
+            shadow.close()
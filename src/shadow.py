@@ -0,0 +1,387 @@
+import numpy as np
+import pandas as pd
+import argparse
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from src import predict
+from src.model_bundle import check_schema
+from src.model_registry import ModelRegistry
+from src.storage import TableWriter, iter_table
+
+# -------------------------------------------------
+# Champion / challenger scoring (python -m src.shadow)
+#
+# ShadowScorer serves the champion's predictions and scores the same
+# batches with any number of challengers (e.g. versions written by
+# src.train, or the notebook's RandomForest / XGBoost / MLP pickles):
+#   - the feature matrix (global features, column order) is built once
+#     per batch and shared by every model; linear models score it
+#     through folded weights, models trained on scaled features share
+#     one scaled copy per distinct scaler, tree models read it as is
+#   - challengers run inline after the champion (mode="inline"), or in a
+#     thread pool (mode="threads") so the champion's result returns
+#     without waiting for them. At most max_pending batches wait for the
+#     pool; later ones are dropped from the shadow log instead of
+#     delaying serving (offline replays pass wait_for_pool=True)
+#   - challenger probabilities are appended to a CSV / Parquet shadow
+#     log next to the champion's, one row per scored customer
+#   - a failing challenger is counted, never raised to the caller
+#
+# report() gives the CPU time per row of the serving path (feature
+# matrix + champion) and of each challenger, the challenger's overhead
+# relative to serving, and where to run it: inline while the overhead
+# stays within INLINE_OVERHEAD, otherwise in the thread pool.
+# -------------------------------------------------
+
+CHAMPION = "champion"
+
+MODES = ("inline", "threads")
+
+# Challengers adding at most this share of the serving CPU time run inline
+INLINE_OVERHEAD = 0.25
+
+
+def trained_on_scaled(model):
+    # Notebook convention (SEARCH_SPACES in src.train agrees): linear
+    # models and the MLP see scaled features, tree ensembles raw ones
+    return hasattr(model, "coef_") or hasattr(model, "coefs_")
+
+
+class ModelScorer:
+    """
+    One model scoring the shared, unscaled feature matrix.
+    """
+    def __init__(self, name, registry):
+        self.name = name
+        self.registry = registry
+
+    @property
+    def linear(self):
+        # A fresh bundle never touches the pickles (or scikit-learn)
+        registry = self.registry
+        return registry.has_fresh_bundle() or hasattr(registry.model, "coef_")
+
+    def warm(self):
+        if self.linear:
+            self.registry.fused()
+        else:
+            self.registry.model
+            self.registry.scaler
+
+    def score(self, X, scaled):
+        """
+        Probabilities for X; scaled(scaler) returns the batch's shared
+        scaled copy of X for that scaler.
+        """
+        if self.linear:
+            return predict.score_matrix(X, registry=self.registry)
+
+        model = self.registry.model
+        if trained_on_scaled(model):
+            X = scaled(self.registry.scaler)
+
+        return model.predict_proba(X)[:, 1]
+
+
+def shared_scaling(X):
+    """
+    scaled(scaler) -> X scaled by that StandardScaler, computed once per
+    distinct scaler; the first model needing it pays for the copy.
+    """
+    copies = {}
+
+    def scaled(scaler):
+        # Same arithmetic as scaler.transform, without its input validation
+        key = (scaler.mean_.tobytes(), scaler.scale_.tobytes())
+        if key not in copies:
+            copies[key] = (X - scaler.mean_) / scaler.scale_
+        return copies[key]
+
+    return scaled
+
+
+def _new_stats():
+    return {
+        "batches": 0, "rows": 0, "errors": 0, "cpu_s": 0.0, "wall_s": 0.0,
+        "abs_diff": 0.0, "agree": 0,
+    }
+
+
+class ShadowScorer:
+    def __init__(self, challengers, champion=None, mode="inline", workers=1,
+                 max_pending=None, log_path=None, keep_columns=None,
+                 wait_for_pool=False):
+        """
+        challengers: {name: model directory or ModelRegistry}. champion
+        defaults to the served model (predict.registry).
+        """
+        if mode not in MODES:
+            raise ValueError(f"mode must be one of {MODES}, got {mode!r}")
+
+        self.champion = ModelScorer(CHAMPION, champion or predict.registry)
+        self.challengers = [
+            ModelScorer(
+                name,
+                registry if isinstance(registry, ModelRegistry) else ModelRegistry(registry)
+            )
+            for name, registry in challengers.items()
+        ]
+
+        for challenger in self.challengers:
+            self._check_shareable(challenger)
+
+        # Load everything now, so no model's load time counts as overhead
+        # (or happens in a pool thread)
+        for scorer in [self.champion, *self.challengers]:
+            scorer.warm()
+
+        self.mode = mode
+        self.keep_columns = keep_columns
+        self.wait_for_pool = wait_for_pool
+        self.batches = 0
+        self.dropped = 0
+        self.stats = {
+            scorer.name: _new_stats() for scorer in [self.champion, *self.challengers]
+        }
+
+        self._lock = threading.Lock()
+        self._log = TableWriter(log_path) if log_path else None
+        self._pool = None
+
+        if mode == "threads":
+            self._pool = ThreadPoolExecutor(workers, thread_name_prefix="shadow")
+            self._pending = threading.BoundedSemaphore(max_pending or workers * 2)
+
+    def _check_shareable(self, challenger):
+        # The shared matrix is built with the champion's schema and global
+        # statistics; a challenger trained on others would score it wrongly
+        champion = self.champion.registry
+        check_schema(champion.feature_columns, challenger.registry.feature_columns)
+
+        try:
+            stats = challenger.registry.global_stats
+        except FileNotFoundError:
+            return
+
+        if stats != champion.global_stats:
+            raise ValueError(
+                f"Challenger {challenger.name!r} was trained with other global "
+                "statistics than the champion; it cannot share its feature matrix"
+            )
+
+    def _record(self, name, rows, wall, cpu, probabilities=None, reference=None):
+        with self._lock:
+            stats = self.stats[name]
+            stats["batches"] += 1
+            stats["rows"] += rows
+            stats["wall_s"] += wall
+            stats["cpu_s"] += cpu
+
+            if reference is not None:
+                stats["abs_diff"] += float(np.abs(probabilities - reference).sum())
+                stats["agree"] += int(np.sum(
+                    (probabilities >= predict.THRESHOLD) == (reference >= predict.THRESHOLD)
+                ))
+
+    def score(self, df: pd.DataFrame):
+        """
+        Returns the champion's (probabilities, predictions); challengers
+        score the same feature matrix inline or in the thread pool.
+        """
+        wall, cpu = time.perf_counter(), time.thread_time()
+
+        X = predict.feature_matrix(df, registry=self.champion.registry)
+        scaled = shared_scaling(X)
+        probabilities = self.champion.score(X, scaled)
+
+        self._record(
+            CHAMPION, len(X), time.perf_counter() - wall, time.thread_time() - cpu
+        )
+
+        with self._lock:
+            batch = self.batches
+            self.batches += 1
+
+        kept = None
+        if self._log is not None and self.keep_columns:
+            kept = {col: df[col].to_numpy() for col in self.keep_columns}
+
+        if self._pool is None:
+            self._score_challengers(batch, X, scaled, probabilities, kept)
+        elif self._pending.acquire(blocking=self.wait_for_pool):
+            self._pool.submit(
+                self._score_challengers, batch, X, scaled, probabilities, kept
+            )
+        else:
+            with self._lock:
+                self.dropped += 1
+
+        return probabilities, (probabilities >= predict.THRESHOLD).astype(int)
+
+    def _score_challengers(self, batch, X, scaled, champion, kept=None):
+        try:
+            log = {"batch": batch, "row": np.arange(len(X)), **(kept or {}),
+                   CHAMPION: champion}
+
+            for challenger in self.challengers:
+                wall, cpu = time.perf_counter(), time.thread_time()
+
+                try:
+                    probabilities = challenger.score(X, scaled)
+                except Exception:
+                    with self._lock:
+                        self.stats[challenger.name]["errors"] += 1
+                    log[challenger.name] = np.full(len(X), np.nan)
+                    continue
+
+                self._record(
+                    challenger.name, len(X),
+                    time.perf_counter() - wall, time.thread_time() - cpu,
+                    probabilities, champion,
+                )
+                log[challenger.name] = probabilities
+
+            if self._log is not None:
+                with self._lock:
+                    self._log.write(pd.DataFrame(log))
+        finally:
+            if self._pool is not None:
+                self._pending.release()
+
+    def report(self):
+        """
+        CPU cost per row of the serving path and of each challenger, the
+        challenger's overhead relative to serving, and where to run it.
+        """
+        with self._lock:
+            stats = {name: dict(entry) for name, entry in self.stats.items()}
+            batches, dropped = self.batches, self.dropped
+
+        def per_row_us(entry):
+            return entry["cpu_s"] / max(entry["rows"], 1) * 1e6
+
+        serving = stats[CHAMPION]
+        serving_us = per_row_us(serving)
+
+        challengers = []
+        for challenger in self.challengers:
+            entry = stats[challenger.name]
+            rows = max(entry["rows"], 1)
+            overhead = per_row_us(entry) / serving_us if serving_us else 0.0
+
+            challengers.append({
+                "model": challenger.name,
+                "batches": entry["batches"],
+                "rows": entry["rows"],
+                "errors": entry["errors"],
+                "cpu_s": round(entry["cpu_s"], 4),
+                "wall_s": round(entry["wall_s"], 4),
+                "cpu_us_per_row": round(per_row_us(entry), 3),
+                "overhead": round(overhead, 3),
+                "run": "inline" if overhead <= INLINE_OVERHEAD else "threads",
+                "mean_abs_diff": round(entry["abs_diff"] / rows, 6),
+                "agreement": round(entry["agree"] / rows, 4),
+            })
+
+        return {
+            "mode": self.mode,
+            "batches": batches,
+            "dropped_batches": dropped,
+            "serving": {
+                "rows": serving["rows"],
+                "cpu_s": round(serving["cpu_s"], 4),
+                "wall_s": round(serving["wall_s"], 4),
+                "cpu_us_per_row": round(serving_us, 3),
+            },
+            "challengers": challengers,
+            "total_overhead": round(sum(c["overhead"] for c in challengers), 3),
+        }
+
+    def close(self):
+        """
+        Waits for queued challenger batches and closes the shadow log.
+        """
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+
+        if self._log is not None:
+            self._log.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def parse_challengers(specs):
+    """
+    ["rf=models/versions/rf", "models/versions/v2"] -> {name: directory};
+    the name defaults to the directory's base name.
+    """
+    challengers = {}
+    for spec in specs or []:
+        name, _, path = spec.rpartition("=")
+        challengers[name or os.path.basename(os.path.normpath(path))] = path
+
+    return challengers
+
+
+def print_report(report):
+    serving = report["serving"]
+    print(f"Serving path: {serving['cpu_us_per_row']:.2f} us CPU per row "
+          f"({serving['rows']:,} rows, {report['batches']} batches, "
+          f"{report['dropped_batches']} dropped from the shadow log)")
+
+    for entry in report["challengers"]:
+        print(f"  {entry['model']:<24} {entry['cpu_us_per_row']:>10.2f} us/row  "
+              f"overhead x{entry['overhead']:<8.3f} run {entry['run']:<8} "
+              f"agreement {entry['agreement']:.3f}  errors {entry['errors']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Replay a feature file through the champion and challenger models"
+    )
+    parser.add_argument("input_path", help="CSV or Parquet customer features")
+    parser.add_argument(
+        "--challenger",
+        action="append",
+        required=True,
+        help="[NAME=]model directory; repeat for several challengers"
+    )
+    parser.add_argument("--mode", choices=MODES, default="inline")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Threads scoring challengers (--mode threads)")
+    parser.add_argument("--chunksize", type=int, default=1000,
+                        help="Customers per scored batch")
+    parser.add_argument("--log", default=None,
+                        help="CSV or Parquet shadow log of every model's scores")
+    parser.add_argument("--keep-columns", nargs="+",
+                        help="Input columns copied to the shadow log (e.g. an ID)")
+    parser.add_argument("--report", default=None,
+                        help="Write the overhead report as JSON")
+    args = parser.parse_args()
+
+    with ShadowScorer(
+        parse_challengers(args.challenger),
+        mode=args.mode,
+        workers=args.workers,
+        log_path=args.log,
+        keep_columns=args.keep_columns,
+        wait_for_pool=True,
+    ) as scorer:
+        for chunk in iter_table(args.input_path, args.chunksize):
+            scorer.score(chunk.drop(columns=["churn"], errors="ignore"))
+
+    report = scorer.report()
+    print_report(report)
+
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=4)
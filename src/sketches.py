@@ -0,0 +1,110 @@
+import numpy as np
+
+# -------------------------------------------------
+# KLL quantile sketch
+#
+# Mergeable streaming quantiles with a bounded rank error. Values are
+# added in batches; each level holds items of weight 2**level and is
+# compacted (sorted, every other item promoted) once it overflows, so
+# memory stays O(k log(n / k)) however many values are seen. Sketches
+# built on separate chunks or partitions can be merged into one.
+# -------------------------------------------------
+
+
+class KLLSketch:
+    def __init__(self, error=0.01, seed=0):
+        """
+        error: target normalized rank error (e.g. 0.01 = 1% of n).
+        """
+        self.error = error
+        # k ~ 3 / error keeps the worst rank error across quantiles near `error`
+        self.k = max(8, int(np.ceil(3.0 / error)))
+        self.count = 0
+        self.levels = [np.empty(0)]
+        self.rng = np.random.default_rng(seed)
+
+    def _capacity(self, level):
+        # Lower levels get geometrically smaller buffers
+        depth = len(self.levels) - level - 1
+        return max(2, int(np.ceil(self.k * (2 / 3) ** depth)))
+
+    def _compress(self):
+        level = 0
+
+        while level < len(self.levels):
+            items = self.levels[level]
+
+            if len(items) < self._capacity(level):
+                level += 1
+                continue
+
+            if level + 1 == len(self.levels):
+                self.levels.append(np.empty(0))
+
+            items = np.sort(items)
+
+            # An odd item out stays behind so weights remain exact
+            leftover = items[len(items) - len(items) % 2:]
+            items = items[:len(items) - len(items) % 2]
+
+            offset = self.rng.integers(2)
+            self.levels[level + 1] = np.concatenate(
+                [self.levels[level + 1], items[offset::2]]
+            )
+            self.levels[level] = leftover
+
+            # Capacities shift when a level is added; rescan from the bottom
+            level = 0
+
+    def update(self, values):
+        values = np.asarray(values, dtype=float)
+        values = values[~np.isnan(values)]
+
+        self.count += len(values)
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+
+        return self
+
+    def merge(self, other):
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items])
+
+        self.count += other.count
+        self._compress()
+
+        return self
+
+    def quantile(self, q):
+        """
+        Linear-interpolated quantile, matching pandas' default when the
+        sketch has not compacted anything yet.
+        """
+        if self.count == 0:
+            return np.nan
+
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([
+            np.full(len(values), 2 ** level)
+            for level, values in enumerate(self.levels)
+        ])
+
+        order = np.argsort(items, kind="stable")
+        items = items[order]
+        cumulative = np.cumsum(weights[order])
+
+        # Position in the (weighted) sorted sample, as in Series.quantile
+        position = q * (cumulative[-1] - 1)
+        lower = int(np.floor(position))
+        upper = int(np.ceil(position))
+
+        lower_value = items[np.searchsorted(cumulative, lower, side="right")]
+        upper_value = items[np.searchsorted(cumulative, upper, side="right")]
+
+        return lower_value + (upper_value - lower_value) * (position - lower)
+
+    def size(self):
+        return int(sum(len(values) for values in self.levels))
@@ -0,0 +1,69 @@
+import pandas as pd
+import numpy as np
+
+from src.feature_store import FeatureStore
+from src.feature_specs import CUSTOMER_KEY, CHURN_WINDOW_MONTHS
+
+# -------------------------------------------------
+# Multi-snapshot backfill
+#
+# Computes features and churn labels for many cutoff dates in one sorted
+# scan of the transactions. The segment between consecutive cutoffs is
+# folded into the same running per-customer state (FeatureStore), so each
+# cutoff reuses the sums, sets and counts of the previous one instead of
+# re-aggregating the history before it.
+#
+# For a cutoff c, features use transactions before c and a customer is
+# labelled active (churn = 0) if they buy in [c, c + 3 months]; with
+# c = max_date - 3 months this is exactly FeatureEngineer.run_pipeline.
+# -------------------------------------------------
+
+SNAPSHOTS_PATH = "data/processed/snapshot_features.parquet"
+
+
+def backfill_snapshots(transactions, cutoffs):
+    """
+    Returns one long table keyed by (CustomerID, snapshot_date), where
+    snapshot_date is the cutoff the row was computed at. Cutoffs with no
+    earlier transactions are skipped; ValueError if all of them are.
+    """
+    df = transactions.sort_values("InvoiceDate", kind="stable")
+    dates = df["InvoiceDate"].to_numpy()
+    customer_ids = df[CUSTOMER_KEY].to_numpy()
+
+    store = FeatureStore(path=None)
+    frames = []
+    start = 0
+
+    for cutoff in sorted(pd.Timestamp(c) for c in cutoffs):
+        churn_end = cutoff + pd.DateOffset(months=CHURN_WINDOW_MONTHS)
+
+        end = np.searchsorted(dates, cutoff.to_datetime64(), side="left")
+        label_end = np.searchsorted(dates, churn_end.to_datetime64(), side="right")
+
+        # Only the rows since the previous cutoff are aggregated
+        affected = store.fold(df.iloc[start:end])
+        start = end
+
+        if store.customers is None or len(store.customers) == 0:
+            continue
+
+        store.refresh(
+            affected,
+            customers_in_churn=np.unique(customer_ids[end:label_end])
+        )
+
+        features = store.features
+        features.insert(1, "snapshot_date", cutoff)
+        frames.append(features)
+
+        print(f"Snapshot {cutoff.date()}: {len(features)} customers")
+
+    if not frames:
+        first = pd.Timestamp(dates[0]).date() if len(dates) else None
+        raise ValueError(
+            f"No customers before any snapshot date (first invoice: {first}); "
+            "choose cutoffs after the first invoice"
+        )
+
+    return pd.concat(frames, ignore_index=True)
@@ -0,0 +1,135 @@
+import pandas as pd
+import os
+
+# -------------------------------------------------
+# Columnar storage for pipeline artifacts
+#
+# Intermediate tables are written as Parquet (or Arrow IPC / Feather),
+# which keeps datetimes, categoricals and integer IDs typed on disk, and
+# lets each stage load only the columns it needs. CSV is still accepted
+# on read and can be exported alongside for notebooks and spreadsheets.
+# -------------------------------------------------
+
+PARQUET_SUFFIXES = (".parquet", ".pq")
+ARROW_SUFFIXES = (".feather", ".arrow")
+
+# Columns parsed as datetimes when falling back to CSV
+DATE_COLUMNS = ["InvoiceDate"]
+
+
+def csv_path(path):
+    return os.path.splitext(path)[0] + ".csv"
+
+
+def write_table(df, path, export_csv=False):
+    """
+    Writes a frame to a typed columnar file chosen by the path suffix.
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    suffix = os.path.splitext(path)[1].lower()
+
+    if suffix in PARQUET_SUFFIXES:
+        df.to_parquet(path, index=False)
+    elif suffix in ARROW_SUFFIXES:
+        df.reset_index(drop=True).to_feather(path)
+    elif suffix == ".csv":
+        df.to_csv(path, index=False)
+    else:
+        raise ValueError(f"Unsupported table format: {path}")
+
+    if export_csv and suffix != ".csv":
+        df.to_csv(csv_path(path), index=False)
+
+
+def read_table(path, columns=None):
+    """
+    Reads a table written by write_table, loading only `columns` if given.
+    """
+    suffix = os.path.splitext(path)[1].lower()
+
+    if suffix in PARQUET_SUFFIXES:
+        return pd.read_parquet(path, columns=columns)
+
+    if suffix in ARROW_SUFFIXES:
+        return pd.read_feather(path, columns=columns)
+
+    if suffix == ".csv":
+        header = pd.read_csv(path, nrows=0).columns
+        wanted = header if columns is None else columns
+
+        return pd.read_csv(
+            path,
+            usecols=columns,
+            parse_dates=[c for c in DATE_COLUMNS if c in wanted]
+        )[wanted]
+
+    raise ValueError(f"Unsupported table format: {path}")
+
+
+def iter_table(path, chunksize, columns=None):
+    """
+    Yields a table as frames of at most `chunksize` rows, never holding
+    more than one chunk (plus a Parquet row group) in memory.
+    """
+    suffix = os.path.splitext(path)[1].lower()
+
+    if suffix in PARQUET_SUFFIXES:
+        import pyarrow.parquet as pq
+
+        parquet = pq.ParquetFile(path)
+        for batch in parquet.iter_batches(batch_size=chunksize, columns=columns):
+            yield batch.to_pandas()
+
+    elif suffix == ".csv":
+        yield from pd.read_csv(path, usecols=columns, chunksize=chunksize)
+
+    else:
+        raise ValueError(f"Unsupported table format for streaming: {path}")
+
+
+class TableWriter:
+    """
+    Appends frames to one CSV or Parquet file, chosen by the path suffix.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.suffix = os.path.splitext(path)[1].lower()
+        self.rows = 0
+        self._writer = None
+
+        if self.suffix not in PARQUET_SUFFIXES + (".csv",):
+            raise ValueError(f"Unsupported table format for streaming: {path}")
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    def write(self, df):
+        if self.suffix == ".csv":
+            df.to_csv(self.path, index=False, header=self.rows == 0,
+                      mode="w" if self.rows == 0 else "a")
+        else:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            table = pa.Table.from_pandas(df, preserve_index=False)
+
+            # Later chunks take the first chunk's schema
+            if self._writer is None:
+                self._writer = pq.ParquetWriter(self.path, table.schema)
+            else:
+                table = table.cast(self._writer.schema)
+
+            self._writer.write_table(table)
+
+        self.rows += len(df)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
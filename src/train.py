@@ -0,0 +1,507 @@
+import numpy as np
+import pandas as pd
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import (
+    accuracy_score,
+    f1_score,
+    precision_score,
+    recall_score,
+    roc_auc_score,
+)
+from sklearn.model_selection import ParameterGrid, StratifiedKFold, train_test_split
+from sklearn.preprocessing import StandardScaler
+
+from src.model_registry import (
+    MODEL_DIR,
+    MODEL_FILE,
+    SCALER_FILE,
+    FEATURE_FILE,
+    GLOBAL_STATS_FILE,
+    ModelRegistry,
+)
+
+# -------------------------------------------------
+# Model selection and training (python -m src.train)
+#
+# Replaces the grid searches in notebooks/04_model_training.ipynb:
+#   - same hold-out split, CV scheme and search spaces as the notebook
+#   - successive halving per model family: every candidate is scored on a
+#     small share of each fold's training rows (and of its trees, for
+#     ensembles), the best 1/factor move on to `factor` times more, until
+#     the full folds decide
+#   - folds are split and scaled once (FoldCache); each candidate fit
+#     reads row-prefix views of the cached matrices
+#   - candidate x fold fits run in forked worker processes, which inherit
+#     the cached matrices instead of receiving copies
+#   - the winner is refit on the full training split and written with its
+#     scaler, feature columns and a timing report to models/versions/<v>/;
+#     --promote also installs it as the served model, so it searches
+#     only the families the scoring path can serve (SERVABLE_FAMILIES)
+# -------------------------------------------------
+
+DATASET_PATH = "data/processed/model_ready_dataset.csv"
+# Versions live in <model_dir>/versions/<version>/
+VERSIONS_DIR = "versions"
+REPORT_FILE = "training_report.json"
+
+TARGET = "churn"
+
+# Notebook settings
+TEST_SIZE = 0.2
+SPLIT_SEED = 7
+CV_SPLITS = 5
+CV_SEED = 42
+
+HALVING_FACTOR = 3
+
+# Smallest training share a first-round candidate is fitted on
+MIN_ROWS = 200
+
+# Ensembles also get a share of their trees in early rounds, at least
+MIN_ESTIMATORS = 50
+
+
+def _logistic_regression(params):
+    return LogisticRegression(max_iter=3000, random_state=42, **params)
+
+
+def _random_forest(params):
+    return RandomForestClassifier(random_state=42, **params)
+
+
+def _xgboost(params):
+    from xgboost import XGBClassifier
+
+    return XGBClassifier(eval_metric="logloss", random_state=42, **params)
+
+
+# family: (estimator builder, trained on scaled features, parameter grid)
+SEARCH_SPACES = {
+    "logistic_regression": (_logistic_regression, True, {
+        "C": [0.01, 0.1, 1, 5, 10],
+        "class_weight": [None, "balanced"],
+    }),
+    "random_forest": (_random_forest, False, {
+        "n_estimators": [300, 500],
+        "max_depth": [5, 8, 12],
+        "min_samples_split": [2, 5],
+        "class_weight": [None, "balanced"],
+    }),
+    "xgboost": (_xgboost, False, {
+        "n_estimators": [300, 500],
+        "learning_rate": [0.03, 0.05, 0.1],
+        "max_depth": [2, 3, 4],
+        "subsample": [0.8],
+        "colsample_bytree": [0.8],
+    }),
+}
+
+
+# Scoring folds the scaler into linear weights, so only these can be promoted
+SERVABLE_FAMILIES = ["logistic_regression"]
+
+
+def promotable_families(families=None):
+    """
+    Families to search for a version that will be promoted: the servable
+    ones by default; ValueError if any requested family cannot be served.
+    """
+    unservable = sorted(set(families or []) - set(SERVABLE_FAMILIES))
+    if unservable:
+        raise ValueError(
+            f"--promote needs a linear model; {unservable} cannot be served "
+            f"(use --families {' '.join(SERVABLE_FAMILIES)})"
+        )
+
+    return list(families or SERVABLE_FAMILIES)
+
+
+def available_families(families=None):
+    families = list(families or SEARCH_SPACES)
+
+    # xgboost is optional at training time
+    if "xgboost" in families:
+        try:
+            import xgboost  # noqa: F401
+        except ImportError:
+            print("xgboost is not installed; skipping the xgboost search.")
+            families.remove("xgboost")
+
+    return families
+
+
+class FoldCache:
+    """
+    Stratified CV folds of the training split, sliced (and scaled) once.
+
+    Training rows of every fold are stored in a fixed random order, so
+    the first n rows are a random subsample and a budget of n rows is a
+    view, not a copy.
+    """
+    def __init__(self, X, y, n_splits=CV_SPLITS, seed=CV_SEED):
+        self.X = np.ascontiguousarray(X, dtype=np.float64)
+        self.y = np.asarray(y)
+
+        rng = np.random.default_rng(seed)
+        splitter = StratifiedKFold(n_splits=n_splits, shuffle=True, random_state=seed)
+
+        self.folds = [
+            (rng.permutation(train), valid)
+            for train, valid in splitter.split(self.X, self.y)
+        ]
+        self._matrices = {}
+
+    def __len__(self):
+        return len(self.folds)
+
+    @property
+    def train_rows(self):
+        return max(len(train) for train, _ in self.folds)
+
+    def matrices(self, fold, scaled):
+        """
+        (X_train, y_train, X_valid, y_valid) of a fold.
+        """
+        key = (fold, scaled)
+
+        if key not in self._matrices:
+            train, valid = self.folds[fold]
+            X_train, X_valid = self.X[train], self.X[valid]
+
+            if scaled:
+                scaler = StandardScaler().fit(X_train)
+                X_train = scaler.transform(X_train)
+                X_valid = scaler.transform(X_valid)
+
+            self._matrices[key] = (X_train, self.y[train], X_valid, self.y[valid])
+
+        return self._matrices[key]
+
+    def warm(self, scaled_options):
+        for fold in range(len(self)):
+            for scaled in scaled_options:
+                self.matrices(fold, scaled)
+
+
+def budget_params(params, fraction):
+    """
+    Early rounds fit ensembles with the same share of their trees as of
+    the rows: tree count, not rows, dominates their fit time.
+    """
+    if "n_estimators" not in params or fraction >= 1:
+        return params
+
+    trees = max(MIN_ESTIMATORS, round(params["n_estimators"] * fraction))
+    return {**params, "n_estimators": min(trees, params["n_estimators"])}
+
+
+# Fold cache handed to forked workers by inheritance instead of pickling
+_FOLDS = None
+
+
+def fit_candidate(task):
+    """
+    Fits one candidate on the first n_rows of a fold; returns its
+    validation ROC-AUC and fit time.
+    """
+    family, params, fold, n_rows = task
+    build, scaled, _ = SEARCH_SPACES[family]
+
+    X_train, y_train, X_valid, y_valid = _FOLDS.matrices(fold, scaled)
+    params = budget_params(params, n_rows / _FOLDS.train_rows)
+
+    start = time.perf_counter()
+    model = build(params).fit(X_train[:n_rows], y_train[:n_rows])
+    fit_s = time.perf_counter() - start
+
+    score = roc_auc_score(y_valid, model.predict_proba(X_valid)[:, 1])
+
+    return float(score), fit_s
+
+
+def _run_tasks(tasks, workers):
+    if workers <= 1:
+        return [fit_candidate(task) for task in tasks]
+
+    context = multiprocessing.get_context("fork")
+    with ProcessPoolExecutor(workers, mp_context=context) as pool:
+        return list(pool.map(fit_candidate, tasks))
+
+
+def halving_schedule(n_candidates, max_rows, factor=HALVING_FACTOR, min_rows=MIN_ROWS):
+    """
+    Training rows per round: the last round uses the full folds, each
+    earlier round 1/factor as many. Rounds are capped so the first one
+    still gets min_rows; the last round may then compare a few candidates.
+    """
+    needed = 1 + math.ceil(math.log(max(n_candidates, 1), factor))
+    affordable = 1 + math.floor(math.log(max(max_rows / min_rows, 1), factor))
+    rounds = min(needed, affordable)
+
+    return [max_rows // factor ** (rounds - 1 - i) for i in range(rounds)]
+
+
+def successive_halving(family, folds, factor=HALVING_FACTOR, workers=1):
+    """
+    Successive-halving search over one family's grid on cached folds.
+    Returns (best candidate, per-round summaries, every evaluation).
+    """
+    grid = SEARCH_SPACES[family][2]
+    candidates = [dict(params) for params in ParameterGrid(grid)]
+
+    rounds = []
+    evaluations = []
+
+    schedule = halving_schedule(len(candidates), folds.train_rows, factor)
+
+    for i, n_rows in enumerate(schedule):
+        start = time.perf_counter()
+
+        tasks = [
+            (family, params, fold, n_rows)
+            for params in candidates for fold in range(len(folds))
+        ]
+        results = np.array(_run_tasks(tasks, workers)).reshape(len(candidates), len(folds), 2)
+
+        scores = results[:, :, 0]
+        fit_s = results[:, :, 1].sum(axis=1)
+
+        for params, fold_scores, seconds in zip(candidates, scores, fit_s):
+            evaluations.append({
+                "family": family,
+                "params": params,
+                "rows": n_rows,
+                "mean_roc_auc": float(fold_scores.mean()),
+                "std_roc_auc": float(fold_scores.std()),
+                "fit_s": round(float(seconds), 4),
+            })
+
+        # Stable sort keeps grid order between equal scores
+        order = np.argsort(-scores.mean(axis=1), kind="stable")
+
+        rounds.append({
+            "rows": n_rows,
+            "candidates": len(candidates),
+            "best_roc_auc": float(scores.mean(axis=1)[order[0]]),
+            "wall_s": round(time.perf_counter() - start, 4),
+        })
+
+        print(f"  {family}: {len(candidates):>3} candidates on {n_rows:>7,} rows, "
+              f"best CV ROC-AUC {rounds[-1]['best_roc_auc']:.4f}")
+
+        if i < len(schedule) - 1:
+            keep = math.ceil(len(candidates) / factor)
+            candidates = [candidates[j] for j in order[:keep]]
+
+    best = {"params": candidates[order[0]], "cv_roc_auc": rounds[-1]["best_roc_auc"]}
+
+    return best, rounds, evaluations
+
+
+def holdout_metrics(y_true, probabilities, threshold=0.5):
+    predictions = (probabilities >= threshold).astype(int)
+
+    return {
+        "accuracy": float(accuracy_score(y_true, predictions)),
+        "precision": float(precision_score(y_true, predictions, zero_division=0)),
+        "recall": float(recall_score(y_true, predictions)),
+        "f1": float(f1_score(y_true, predictions)),
+        "roc_auc": float(roc_auc_score(y_true, probabilities)),
+    }
+
+
+def promote(version_dir, model_dir=MODEL_DIR):
+    """
+    Installs a trained version as the served model and exports the
+    bundle the scoring path reads, with the version's hold-out metrics.
+    """
+    import joblib
+
+    # Scoring folds the scaler into linear weights (see model_registry);
+    # the CLI checks this before searching, direct callers land here
+    model = joblib.load(os.path.join(version_dir, MODEL_FILE))
+    if not hasattr(model, "coef_"):
+        raise ValueError(
+            f"{type(model).__name__} cannot be served: the scoring path "
+            f"needs a linear model (train with --families {' '.join(SERVABLE_FAMILIES)})"
+        )
+
+    for name in (MODEL_FILE, SCALER_FILE, FEATURE_FILE, GLOBAL_STATS_FILE):
+        if os.path.exists(os.path.join(version_dir, name)):
+            shutil.copy2(os.path.join(version_dir, name), os.path.join(model_dir, name))
+
+    with open(os.path.join(version_dir, REPORT_FILE)) as f:
+        report = json.load(f)
+
+    ModelRegistry(model_dir).export_bundle(
+        metrics=report["best"]["test"],
+        model_info={"version": report["version"], "family": report["best"]["family"]},
+    )
+
+
+def train(dataset_path=DATASET_PATH, families=None, factor=HALVING_FACTOR,
+          workers=1, model_dir=MODEL_DIR, version=None):
+    """
+    Searches every family, refits the best candidate on the training split
+    and writes it as a new version; returns the version directory.
+    """
+    global _FOLDS
+
+    timings = {}
+    started = time.perf_counter()
+
+    start = time.perf_counter()
+    df = pd.read_csv(dataset_path)
+    X = df.drop(columns=[TARGET])
+    y = df[TARGET].to_numpy()
+    timings["load_s"] = time.perf_counter() - start
+
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=TEST_SIZE, random_state=SPLIT_SEED, stratify=y
+    )
+
+    families = available_families(families)
+
+    start = time.perf_counter()
+    folds = FoldCache(X_train.to_numpy(), y_train)
+    folds.warm({SEARCH_SPACES[family][1] for family in families})
+    timings["fold_cache_s"] = time.perf_counter() - start
+
+    print(f"Training on {len(X_train):,} customers, {X.shape[1]} features, "
+          f"{len(folds)} cached folds")
+
+    search = {}
+    evaluations = []
+
+    # Workers fork after the cache is built, so they share its matrices
+    _FOLDS = folds
+    try:
+        for family in families:
+            start = time.perf_counter()
+            best, rounds, evaluated = successive_halving(family, folds, factor, workers)
+            timings[f"search_{family}_s"] = time.perf_counter() - start
+
+            search[family] = {**best, "rounds": rounds}
+            evaluations.extend(evaluated)
+    finally:
+        _FOLDS = None
+
+    winner = max(search, key=lambda family: search[family]["cv_roc_auc"])
+    build, scaled, _ = SEARCH_SPACES[winner]
+
+    # Refit on the full training split; the scaler is saved either way
+    start = time.perf_counter()
+    scaler = StandardScaler().fit(X_train)
+    X_fit, X_eval = X_train.to_numpy(), X_test.to_numpy()
+    if scaled:
+        X_fit, X_eval = scaler.transform(X_train), scaler.transform(X_test)
+
+    model = build(search[winner]["params"]).fit(X_fit, y_train)
+    timings["refit_s"] = time.perf_counter() - start
+
+    metrics = holdout_metrics(y_test, model.predict_proba(X_eval)[:, 1])
+    timings["total_s"] = time.perf_counter() - started
+
+    version = version or time.strftime("%Y%m%d-%H%M%S")
+    version_dir = os.path.join(model_dir, VERSIONS_DIR, version)
+    os.makedirs(version_dir, exist_ok=True)
+
+    import joblib
+
+    joblib.dump(model, os.path.join(version_dir, MODEL_FILE))
+    joblib.dump(scaler, os.path.join(version_dir, SCALER_FILE))
+    joblib.dump(X.columns.tolist(), os.path.join(version_dir, FEATURE_FILE))
+
+    # Scoring derives population features with these statistics
+    global_stats = os.path.join(model_dir, GLOBAL_STATS_FILE)
+    if os.path.exists(global_stats):
+        shutil.copy2(global_stats, os.path.join(version_dir, GLOBAL_STATS_FILE))
+
+    report = {
+        "version": version,
+        "created_at": pd.Timestamp.now().isoformat(timespec="seconds"),
+        "dataset": {
+            "path": dataset_path,
+            "customers": int(len(df)),
+            "train": int(len(X_train)),
+            "test": int(len(X_test)),
+            "churn_rate": float(y.mean()),
+        },
+        "search": {
+            "method": "successive_halving",
+            "factor": factor,
+            "cv_splits": len(folds),
+            "workers": workers,
+            "families": search,
+        },
+        "best": {
+            "family": winner,
+            "params": search[winner]["params"],
+            "cv_roc_auc": search[winner]["cv_roc_auc"],
+            "test": metrics,
+        },
+        "timings": {key: round(value, 4) for key, value in timings.items()},
+        "evaluations": evaluations,
+    }
+
+    with open(os.path.join(version_dir, REPORT_FILE), "w") as f:
+        json.dump(report, f, indent=4)
+
+    print(f"Best: {winner} {search[winner]['params']} "
+          f"(CV ROC-AUC {search[winner]['cv_roc_auc']:.4f}, "
+          f"test ROC-AUC {metrics['roc_auc']:.4f})")
+    print(f"Saved version {version} to {version_dir} in {timings['total_s']:.1f}s")
+
+    return version_dir
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Search, train and version the churn model")
+    parser.add_argument("dataset_path", nargs="?", default=DATASET_PATH)
+    parser.add_argument(
+        "--families",
+        nargs="+",
+        choices=list(SEARCH_SPACES),
+        help="Model families to search (default: all installed)"
+    )
+    parser.add_argument("--factor", type=int, default=HALVING_FACTOR,
+                        help="Successive-halving reduction factor")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Processes for candidate evaluation")
+    parser.add_argument("--version", default=None,
+                        help="Version name (default: timestamp)")
+    parser.add_argument(
+        "--promote",
+        action="store_true",
+        help="Install the trained version as the served model "
+             f"(searches {SERVABLE_FAMILIES} by default)"
+    )
+    args = parser.parse_args()
+
+    # Fail before the search, not after it picks a model that cannot be served
+    if args.promote:
+        try:
+            args.families = promotable_families(args.families)
+        except ValueError as e:
+            parser.error(str(e))
+
+    version_dir = train(
+        args.dataset_path,
+        families=args.families,
+        factor=args.factor,
+        workers=args.workers,
+        version=args.version,
+    )
+
+    if args.promote:
+        promote(version_dir)
@@ -1,13 +1,82 @@
 import streamlit as st
 import pandas as pd
+import io
 import os
+from src import predict
 from src.predict import predict_churn
+from src.online_features import score_customer
+from src.content_cache import ContentCache, content_key
+from src.dashboard_summary import SEGMENT_COLUMNS, SUMMARY_PATH, build_summary, load_summary
+from src.model_bundle import SchemaMismatchError
+from src.ranking import top_at_risk
 
 st.set_page_config(
     page_title="E-Commerce Churn Prediction",
     layout="wide"
 )
 
+DATASET_PATH = os.path.join("data", "processed", "model_ready_dataset.csv")
+
+# Parsed uploads + predictions kept across reruns and sessions
+CACHE_MAX_BYTES = 256 * 1024 ** 2
+
+
+# -------------------------------------------------
+# CACHING
+# -------------------------------------------------
+@st.cache_resource
+def load_model():
+    # One registry per server process; it reloads itself when the
+    # artifacts on disk change
+    predict.registry.fused()
+    return predict.registry
+
+
+@st.cache_resource
+def upload_cache():
+    return ContentCache(max_bytes=CACHE_MAX_BYTES)
+
+
+@st.cache_data(max_entries=4)
+def load_dataset(path, mtime):
+    # mtime is part of the cache key, so a rewritten file is re-read
+    return pd.read_csv(path)
+
+
+@st.cache_data(max_entries=4)
+def load_dashboard_summary(path, mtime):
+    return load_summary(path)
+
+
+@st.cache_data(max_entries=4)
+def summarize_dataset(path, mtime):
+    # Fallback when the pipeline has not written a summary yet
+    return build_summary(load_dataset(path, mtime))
+
+
+def read_upload(uploaded):
+    data = uploaded.getvalue()
+    key = content_key(data)
+
+    df = upload_cache().get_or_compute(
+        ("upload", key), lambda: pd.read_csv(io.BytesIO(data))
+    )
+    return df, key
+
+
+def cached_predictions(df, key):
+    # Keyed by upload content and model version
+    version = load_model().version()
+
+    results = upload_cache().get_or_compute(
+        ("predict", key, version), lambda: predict_churn(df)
+    )
+    csv = upload_cache().get_or_compute(
+        ("csv", key, version), lambda: results.to_csv(index=False)
+    )
+    return results, csv
+
+
 # Sidebar Navigation
 st.sidebar.title("Navigation")
 page = st.sidebar.radio(
@@ -38,27 +107,61 @@ if page == "Home":
 elif page == "Single Prediction":
     st.title("🔍 Single Customer Prediction")
 
-    st.markdown("Enter customer feature values below:")
-
-    uploaded = st.file_uploader(
-        "Upload a single customer CSV (one row)",
-        type=["csv"]
+    source = st.radio(
+        "Input",
+        ["Customer features (one row)", "Invoice lines (one customer)"]
     )
 
-    if uploaded is not None:
-        input_df = pd.read_csv(uploaded)
+    if source.startswith("Invoice"):
+        st.markdown(
+            "Upload one customer's invoice lines (InvoiceNo, StockCode, "
+            "Quantity, InvoiceDate, UnitPrice); features are computed on the fly."
+        )
 
-        st.write("### Uploaded Data")
-        st.dataframe(input_df)
+        uploaded = st.file_uploader("Upload invoice lines CSV", type=["csv"])
+        snapshot_date = st.date_input("Score as of")
+
+        if uploaded is not None:
+            lines, upload_key = read_upload(uploaded)
+
+            st.write("### Uploaded Invoice Lines")
+            st.dataframe(lines)
+
+            if st.button("Predict"):
+                version = load_model().version()
+                prob = upload_cache().get_or_compute(
+                    ("online", upload_key, version, str(snapshot_date)),
+                    lambda: score_customer(lines, snapshot_date)
+                )
+
+                st.metric("Churn Probability", f"{prob:.2f}")
+                st.write(
+                    "Prediction:",
+                    "Churn" if prob >= predict.THRESHOLD else "No churn"
+                )
+
+    else:
+        st.markdown("Enter customer feature values below:")
+
+        uploaded = st.file_uploader(
+            "Upload a single customer CSV (one row)",
+            type=["csv"]
+        )
 
-        if st.button("Predict"):
-            result = predict_churn(input_df)
+        if uploaded is not None:
+            input_df, upload_key = read_upload(uploaded)
 
-            st.write("### Prediction Result")
-            st.dataframe(result[["churn_probability", "churn_prediction"]])
+            st.write("### Uploaded Data")
+            st.dataframe(input_df)
 
-            prob = result["churn_probability"].iloc[0]
-            st.metric("Churn Probability", f"{prob:.2f}")
+            if st.button("Predict"):
+                result, _ = cached_predictions(input_df, upload_key)
+
+                st.write("### Prediction Result")
+                st.dataframe(result[["churn_probability", "churn_prediction"]])
+
+                prob = result["churn_probability"].iloc[0]
+                st.metric("Churn Probability", f"{prob:.2f}")
 
 
 # -------------------------------------------------
@@ -73,24 +176,44 @@ elif page == "Batch Prediction":
     )
 
     if uploaded_file is not None:
-        batch_df = pd.read_csv(uploaded_file)
+        batch_df, upload_key = read_upload(uploaded_file)
 
         st.write("### Uploaded Data")
         st.dataframe(batch_df.head())
 
         if st.button("Run Batch Prediction"):
-            results = predict_churn(batch_df)
+            results, results_csv = cached_predictions(batch_df, upload_key)
 
             st.write("### Prediction Results")
             st.dataframe(results.head())
 
             st.download_button(
                 label="Download Results CSV",
-                data=results.to_csv(index=False),
+                data=results_csv,
                 file_name="churn_predictions.csv",
                 mime="text/csv"
             )
 
+        st.write("### Top At-Risk Customers")
+
+        col1, col2 = st.columns(2)
+        top_k = col1.number_input("Customers per segment", min_value=1, value=20)
+        segment = col2.selectbox("Segment", ["All customers", *SEGMENT_COLUMNS])
+
+        segment = None if segment == "All customers" else segment
+
+        # Ranked on request only; repeats are served from the upload cache
+        if st.button("Rank Customers"):
+            try:
+                ranking = upload_cache().get_or_compute(
+                    ("top", upload_key, load_model().version(), int(top_k), segment),
+                    lambda: top_at_risk(batch_df, k=int(top_k), segment=segment)
+                )
+            except (SchemaMismatchError, KeyError) as e:
+                st.error(f"Cannot rank this file: {e}")
+            else:
+                st.dataframe(ranking)
+
 
 # -------------------------------------------------
 # DASHBOARD
@@ -98,20 +221,46 @@ elif page == "Batch Prediction":
 elif page == "Dashboard":
     st.title("📈 Model Dashboard")
 
-    dataset_path = os.path.join("data", "processed", "model_ready_dataset.csv")
-
-    if os.path.exists(dataset_path):
-        df = pd.read_csv(dataset_path)
-
-        churn_rate = df["churn"].mean()
+    if os.path.exists(SUMMARY_PATH):
+        summary = load_dashboard_summary(SUMMARY_PATH, os.path.getmtime(SUMMARY_PATH))
+    elif os.path.exists(DATASET_PATH):
+        summary = summarize_dataset(DATASET_PATH, os.path.getmtime(DATASET_PATH))
+    else:
+        summary = None
 
-        col1, col2 = st.columns(2)
+    if summary is not None:
+        col1, col2, col3 = st.columns(3)
 
-        col1.metric("Total Customers", len(df))
-        col2.metric("Churn Rate", f"{churn_rate:.2%}")
+        col1.metric("Total Customers", summary["customers"])
+        col2.metric("Churned Customers", summary["churned"])
+        col3.metric("Churn Rate", f"{summary['churn_rate']:.2%}")
 
         st.write("### Churn Distribution")
-        st.bar_chart(df["churn"].value_counts())
+        st.bar_chart(pd.Series(
+            [summary["customers"] - summary["churned"], summary["churned"]],
+            index=[0, 1],
+            name="count"
+        ))
+
+        for column, segments in summary["segments"].items():
+            st.write(f"### Churn Rate by {column}")
+            st.bar_chart(pd.DataFrame(segments).set_index("value")["churn_rate"])
+
+        st.write("### Feature Distributions")
+        feature = st.selectbox("Feature", list(summary["features"]))
+        stats = summary["features"][feature]
+
+        if "histogram" in stats:
+            histogram = stats["histogram"]
+            bins = pd.DataFrame({
+                "customers": histogram["counts"],
+                "churned": histogram["churned"],
+            }, index=histogram["edges"][:-1])
+
+            st.bar_chart(bins)
+            st.dataframe(pd.Series(stats["quantiles"], name=feature))
+
+        st.caption(f"Missing values: {stats['missing']}")
 
     else:
         st.warning("Dataset not found.")
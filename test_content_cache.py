@@ -0,0 +1,36 @@
+import pandas as pd
+
+from src.content_cache import ContentCache, content_key, sizeof
+
+
+def test_content_cache_memoizes_by_hash_and_evicts_least_recent():
+    frames = {
+        content_key(f"customer-{i}".encode()): pd.DataFrame({"x": range(i, i + 100)})
+        for i in range(3)
+    }
+    keys = list(frames)
+    budget = sizeof(frames[keys[0]]) + sizeof(frames[keys[1]])
+    cache = ContentCache(max_bytes=budget)
+    calls = []
+
+    def compute(key):
+        calls.append(key)
+        return frames[key]
+
+    cache.get_or_compute(keys[0], lambda: compute(keys[0]))
+    cache.get_or_compute(keys[1], lambda: compute(keys[1]))
+    assert cache.get_or_compute(keys[0], lambda: compute(keys[0])) is frames[keys[0]]
+    assert calls == keys[:2]
+
+    # keys[1] is least recently used and makes room for keys[2]
+    cache.get_or_compute(keys[2], lambda: compute(keys[2]))
+    assert keys[1] not in cache.entries and keys[0] in cache.entries
+    assert cache.bytes <= budget
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["evictions"]) == (1, 3, 1)
+
+    # Values bigger than the whole budget are returned but not kept
+    huge = pd.DataFrame({"x": range(10_000)})
+    assert cache.get_or_compute("huge", lambda: huge) is huge
+    assert "huge" not in cache.entries
@@ -0,0 +1,245 @@
+import importlib
+import json
+
+import numpy as np
+import pandas as pd
+
+from src.dedup import MAX_RUNS_PER_PARTITION, FingerprintSet, fingerprint_rows
+from src.instrumentation import Instrumentation, current_rss, peak_rss
+
+DataCleaner = importlib.import_module("src.02_data_cleaning").DataCleaner
+
+
+def make_raw_transactions(n=20000, seed=1):
+    rng = np.random.default_rng(seed)
+
+    invoices = rng.integers(489000, 489000 + n // 10, n).astype(str)
+    cancelled = rng.random(n) < 0.02
+    invoices = np.where(cancelled, np.char.add("C", invoices), invoices)
+
+    customers = (12000 + rng.integers(0, 400, n)).astype(float)
+    customers[rng.random(n) < 0.2] = np.nan
+
+    quantity = rng.integers(1, 40, n)
+    quantity[cancelled] *= -1
+    quantity[rng.random(n) < 0.01] = 500
+
+    dates = pd.Timestamp("2009-12-01") + pd.to_timedelta(
+        rng.integers(0, 365 * 24 * 60, n), unit="min"
+    )
+
+    df = pd.DataFrame({
+        "Invoice": invoices,
+        "StockCode": rng.choice([f"{i}A" for i in range(85000, 85300)], n),
+        "Description": np.where(rng.random(n) < 0.005, None, "ITEM"),
+        "Quantity": quantity,
+        "InvoiceDate": dates.strftime("%Y-%m-%d %H:%M:%S"),
+        "Price": rng.choice(
+            [0.42, 0.85, 1.25, 2.95, 4.95, 0.0, 25.0],
+            n,
+            p=[0.25, 0.25, 0.2, 0.15, 0.1, 0.01, 0.04]
+        ),
+        "Customer ID": customers,
+        "Country": rng.choice(["United Kingdom", "France", "Germany"], n),
+    })
+
+    # Exact duplicate rows spread through the file
+    duplicates = df.sample(frac=0.03, random_state=seed)
+    return pd.concat([df, duplicates]).sample(frac=1, random_state=seed)
+
+
+def run_cleaner(tmp_path, monkeypatch, raw, name, **kwargs):
+    workdir = tmp_path / name
+    workdir.mkdir()
+    monkeypatch.chdir(workdir)
+
+    input_path = tmp_path / "online_retail.csv"
+    if not input_path.exists():
+        raw.to_csv(input_path, index=False, encoding="latin1")
+
+    cleaner = DataCleaner(str(input_path), **kwargs)
+    cleaner.run_pipeline()
+
+    cleaned = pd.read_parquet(workdir / "data/processed/cleaned_transactions.parquet")
+    with open(workdir / "data/processed/cleaning_statistics.json") as f:
+        stats = json.load(f)
+
+    return cleaned, stats
+
+
+def test_streaming_matches_in_memory(tmp_path, monkeypatch):
+    raw = make_raw_transactions()
+
+    expected, expected_stats = run_cleaner(tmp_path, monkeypatch, raw, "memory")
+    streamed, streamed_stats = run_cleaner(
+        tmp_path, monkeypatch, raw, "stream", chunksize=3000
+    )
+
+    dedup = streamed_stats.pop("deduplication")
+    memory = expected_stats.pop("memory_usage")
+
+    # Timings differ run to run; row counts per step must not
+    streamed_steps = streamed_stats.pop("instrumentation")
+    expected_steps = expected_stats.pop("instrumentation")
+    rows_out = {s["step"]: s["rows_out"] for s in expected_steps}
+    for step in streamed_steps:
+        if step["step"] in rows_out and step["step"] != "read_input":
+            assert step["rows_out"] == rows_out[step["step"]], step["step"]
+
+    assert streamed_stats == expected_stats
+    assert dedup["fingerprints"] == len(streamed)
+    assert memory["bytes_after"] < memory["bytes_before"]
+    # Chunks unify their category dictionaries in a different order
+    pd.testing.assert_frame_equal(
+        streamed,
+        expected.reset_index(drop=True),
+        check_dtype=False,
+        check_categorical=False
+    )
+
+
+def test_streaming_quantile_sketch_reports_differences(tmp_path, monkeypatch):
+    raw = make_raw_transactions()
+
+    expected, _ = run_cleaner(tmp_path, monkeypatch, raw, "memory")
+    streamed, stats = run_cleaner(
+        tmp_path, monkeypatch, raw, "sketch",
+        chunksize=3000, quantile_error=0.01, verify_quantiles=True
+    )
+
+    report = stats["quantile_sketch"]
+    removed = sum(step["rows_removed"] for step in stats["steps_applied"])
+
+    assert removed == stats["rows_removed"]
+    assert report["rows_kept_differently"] == 0
+    assert len(streamed) == len(expected)
+
+
+def test_in_memory_sketch_verifies_quantiles_only_on_request(tmp_path, monkeypatch):
+    raw = make_raw_transactions(n=5000)
+
+    _, stats = run_cleaner(tmp_path, monkeypatch, raw, "plain", quantile_error=0.01)
+    _, verified = run_cleaner(
+        tmp_path, monkeypatch, raw, "verified",
+        quantile_error=0.01, verify_quantiles=True
+    )
+
+    assert "quantile_sketch" not in stats
+    assert verified["quantile_sketch"]["error"] == 0.01
+
+
+def test_fingerprint_dedup_matches_drop_duplicates_with_spill(tmp_path):
+    raw = make_raw_transactions()
+    expected = raw.drop_duplicates()
+
+    seen = FingerprintSet(max_in_memory=500, spill_dir=tmp_path, n_partitions=2)
+    keep = np.concatenate([
+        seen.add(fingerprint_rows(raw.iloc[start:start + 600]))
+        for start in range(0, len(raw), 600)
+    ])
+    report = seen.report()
+    runs = [len(partition) for partition in seen.runs]
+    seen.close()
+
+    assert keep.sum() == len(expected)
+    pd.testing.assert_frame_equal(raw[keep], expected)
+    assert report["spilled_runs"] > 0
+    # Runs of a partition are merged instead of piling up
+    assert seen._spills > MAX_RUNS_PER_PARTITION
+    assert max(runs) <= MAX_RUNS_PER_PARTITION
+    assert report["collision_probability"] < 1e-9
+
+
+def test_synthetic_retail_generator_is_seeded_and_cleanable(tmp_path, monkeypatch):
+    from benchmarks.synthetic_retail import generate_chunks
+
+    first = pd.concat(generate_chunks(20000, seed=3, chunksize=7000))
+    again = pd.concat(generate_chunks(20000, seed=3, chunksize=7000))
+    pd.testing.assert_frame_equal(first, again)
+
+    assert abs(len(first) - 20000) < 500
+    assert first["InvoiceDate"].is_monotonic_increasing
+    assert first["Invoice"].str.startswith("C").any()
+    assert (first.loc[first["Invoice"].str.startswith("C"), "Quantity"] < 0).all()
+    assert first["Customer ID"].isna().any() and first.duplicated().any()
+
+    cleaned, stats = run_cleaner(tmp_path, monkeypatch, first, "synthetic")
+
+    assert 0 < stats["rows_after_cleaning"] < stats["original_rows"]
+    assert cleaned["CustomerID"].notna().all()
+
+
+def test_instrumentation_records_steps_and_chrome_trace(tmp_path, monkeypatch):
+    raw = make_raw_transactions(n=5000)
+    trace_path = tmp_path / "trace.json"
+
+    cleaned, stats = run_cleaner(
+        tmp_path, monkeypatch, raw, "traced", trace_path=str(trace_path)
+    )
+    steps = {entry["step"]: entry for entry in stats["instrumentation"]}
+
+    assert list(steps)[:2] == ["read_input", "apply_row_filters"]
+    assert steps["read_input"]["rows_out"] == len(raw)
+    assert steps["save_outputs"]["rows_out"] == len(cleaned)
+
+    removed = {s["step"]: s["rows_removed"] for s in stats["steps_applied"]}
+    for name in ["remove_outliers", "remove_duplicates"]:
+        assert steps[name]["rows_in"] - steps[name]["rows_out"] == removed.pop(name)
+
+    # Steps 1-5 are applied as one combined mask
+    filters = steps["apply_row_filters"]
+    assert filters["rows_in"] - filters["rows_out"] == sum(removed.values())
+
+    for entry in steps.values():
+        assert entry["calls"] == 1
+        assert entry["wall_s"] >= 0 and entry["cpu_s"] >= 0
+        assert entry["peak_mem_delta_mb"] >= 0 and entry["copied_mb"] >= 0
+        assert isinstance(entry["peak_mem_exact"], bool)
+
+    # Filters copy the surviving rows; derived columns add new buffers
+    assert steps["apply_row_filters"]["copied_mb"] > 0
+    assert steps["add_derived_columns"]["copied_mb"] > 0
+
+    with open(trace_path) as f:
+        events = json.load(f)["traceEvents"]
+
+    assert {event["name"] for event in events} == set(steps)
+    assert all(event["ph"] == "X" and event["dur"] >= 0 for event in events)
+
+
+def test_instrumentation_leaves_process_peak_alone():
+    # An outer measurement's peak must survive the steps measured inside it
+    peak = np.ones(64 * 1024 ** 2 // 8)
+    del peak
+    outer_peak = peak_rss()
+
+    instrumentation = Instrumentation()
+    instrumentation.begin("small", None)
+    instrumentation.end(None)
+
+    instrumentation.begin("large", None)
+    peak = np.ones((outer_peak - current_rss()) // 8 + 32 * 1024 ** 2 // 8)
+    instrumentation.end(None)
+    del peak
+
+    steps = {entry["step"]: entry for entry in instrumentation.report()}
+
+    assert peak_rss() > outer_peak
+    # The small step's peak may predate it; the large one raised it
+    assert not steps["small"]["peak_mem_exact"]
+    assert steps["large"]["peak_mem_exact"]
+
+
+def test_remove_wrappers_match_combined_row_filters(tmp_path):
+    input_path = tmp_path / "online_retail.csv"
+    make_raw_transactions(n=5000).to_csv(input_path, index=False, encoding="latin1")
+
+    combined = DataCleaner(str(input_path))
+    combined.apply_row_filters()
+
+    stepwise = DataCleaner(str(input_path))
+    for step, _, _ in DataCleaner.ROW_FILTERS:
+        getattr(stepwise, step)()
+
+    pd.testing.assert_frame_equal(stepwise.df, combined.df)
+    assert stepwise.stats == combined.stats
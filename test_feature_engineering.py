@@ -0,0 +1,357 @@
+import importlib
+import json
+import os
+import pytest
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from src import feature_specs, predict
+from src.feature_store import FeatureStore
+from src.model_registry import ModelRegistry
+from src.online_features import customer_features, score_customer
+from src.schema import apply_schema
+
+feature_engineering = importlib.import_module("src.03_feature_engineering")
+FeatureEngineer = feature_engineering.FeatureEngineer
+
+
+def make_transactions(n=5000, customers=120, seed=0):
+    rng = np.random.default_rng(seed)
+
+    dates = pd.Timestamp("2010-01-01") + pd.to_timedelta(
+        rng.integers(0, 365 * 24 * 60, n), unit="min"
+    )
+
+    df = pd.DataFrame({
+        "InvoiceNo": rng.integers(500000, 500000 + n // 6, n).astype(str),
+        "StockCode": rng.choice([f"{i:05d}" for i in range(150)], n),
+        "Description": "ITEM",
+        "Quantity": rng.integers(1, 24, n),
+        "InvoiceDate": dates,
+        "UnitPrice": rng.choice([0.42, 0.85, 1.25, 2.95, 4.95], n),
+        "CustomerID": 12000 + (rng.pareto(0.8, n) * 5).astype(int) % customers,
+        "Country": rng.choice(["United Kingdom", "France", "Germany"], n),
+    })
+
+    df["TotalPrice"] = df["Quantity"] * df["UnitPrice"]
+    df["Year"] = df["InvoiceDate"].dt.year
+    df["Month"] = df["InvoiceDate"].dt.month
+    df["DayOfWeek"] = df["InvoiceDate"].dt.dayofweek
+    df["Hour"] = df["InvoiceDate"].dt.hour
+
+    return df
+
+
+def run_engineer(tmp_path, monkeypatch, df):
+    input_path = tmp_path / "cleaned_transactions.csv"
+    df.to_csv(input_path, index=False)
+
+    monkeypatch.chdir(tmp_path)
+
+    engineer = FeatureEngineer(str(input_path))
+    engineer.run_pipeline()
+
+    return engineer
+
+
+def test_output_columns_match_saved_features(tmp_path, monkeypatch):
+    expected = pd.read_csv(
+        "data/processed/customer_features.csv", nrows=0
+    ).columns.tolist()
+
+    engineer = run_engineer(tmp_path, monkeypatch, make_transactions())
+
+    saved = pd.read_csv(tmp_path / "data/processed/customer_features.csv")
+
+    assert engineer.features.columns.tolist() == expected
+    assert saved.columns.tolist() == expected
+    assert saved["CustomerID"].is_monotonic_increasing
+
+
+def test_vectorized_kernels_match_per_customer_lambdas(tmp_path, monkeypatch):
+    engineer = run_engineer(tmp_path, monkeypatch, make_transactions())
+    obs = engineer.observation_df
+    snapshot_date = obs["InvoiceDate"].max()
+
+    recency = obs.groupby("CustomerID")["InvoiceDate"].apply(
+        lambda x: (snapshot_date - x.max()).days
+    )
+
+    product_counts = obs.groupby(["CustomerID", "StockCode"], observed=True).size()
+    repeat_ratio = product_counts.groupby(level="CustomerID").apply(
+        lambda x: (x > 1).mean()
+    )
+
+    features = engineer.features.set_index("CustomerID")
+
+    np.testing.assert_array_equal(features["Recency"], recency.to_numpy())
+    np.testing.assert_allclose(
+        features["RepeatPurchaseRatio"], repeat_ratio.to_numpy(), rtol=1e-12
+    )
+
+
+def test_spec_formulas_match_hand_written_groupby(tmp_path, monkeypatch):
+    engineer = run_engineer(
+        tmp_path, monkeypatch, make_transactions(n=800, customers=30, seed=3)
+    )
+    obs = engineer.observation_df.copy()
+    snapshot_date = obs["InvoiceDate"].max()
+
+    # Baseline formulas, one pandas groupby at a time, independent of
+    # feature_specs
+    obs["IsWeekend"] = obs["DayOfWeek"].isin([5, 6]).astype(int)
+    obs["IsEvening"] = obs["Hour"].between(17, 22).astype(int)
+    by_customer = obs.groupby("CustomerID")
+
+    expected = pd.DataFrame({
+        "Recency": by_customer["InvoiceDate"].max().rsub(snapshot_date).dt.days,
+        "Frequency": by_customer["InvoiceNo"].nunique(),
+        "Monetary": by_customer["TotalPrice"].sum(),
+        "TotalQuantity": by_customer["Quantity"].sum(),
+        "CustomerLifetimeDays": (
+            by_customer["InvoiceDate"].max() - by_customer["InvoiceDate"].min()
+        ).dt.days,
+        "WeekendPurchaseRatio": by_customer["IsWeekend"].mean(),
+        "EveningPurchaseRatio": by_customer["IsEvening"].mean(),
+        "UniqueActiveMonths": by_customer["Month"].nunique(),
+        "UniqueActiveDays": by_customer["DayOfWeek"].nunique(),
+        "UniqueProducts": by_customer["StockCode"].nunique(),
+    })
+
+    invoices = expected["Frequency"]
+    lifetime = expected["CustomerLifetimeDays"]
+    months = expected["UniqueActiveMonths"]
+
+    expected["AvgOrderValue"] = expected["Monetary"] / invoices
+    expected["AvgDaysBetweenPurchases"] = np.where(
+        invoices > 1, lifetime / (invoices - 1), 0
+    )
+    expected["PurchaseRatePerMonth"] = invoices / (lifetime / 30 + 1)
+    month_invoices = obs.groupby(["CustomerID", "Month"], observed=True)["InvoiceNo"].nunique()
+    expected["MonthlyPurchaseVariance"] = month_invoices.groupby(
+        level="CustomerID"
+    ).std().fillna(0)
+    expected["ProductDiversityRatio"] = expected["UniqueProducts"] / invoices
+    expected["AvgItemsPerInvoice"] = expected["TotalQuantity"] / invoices
+
+    product_counts = obs.groupby(["CustomerID", "StockCode"], observed=True).size()
+    by_product = product_counts.groupby(level="CustomerID")
+    expected["RepeatPurchaseRatio"] = by_product.apply(lambda x: (x > 1).mean())
+    expected["TopProductConcentration"] = by_product.max() / by_product.sum()
+
+    expected["RevenuePerMonth"] = expected["Monetary"] / months
+    expected["QuantityPerMonth"] = expected["TotalQuantity"] / months
+    expected["InvoiceFrequencyScore"] = invoices / months
+
+    features = engineer.features.set_index("CustomerID")
+
+    for column in expected.columns:
+        np.testing.assert_allclose(
+            features[column].to_numpy(dtype=float),
+            expected.loc[features.index, column].to_numpy(dtype=float),
+            rtol=1e-12, err_msg=column
+        )
+
+
+# Cleaned transactions the saved customer_features.csv was built from
+# (Parquet since the typed storage; older checkouts have the CSV)
+CLEANED_PATHS = [
+    "data/processed/cleaned_transactions.parquet",
+    "data/processed/cleaned_transactions.csv",
+]
+
+
+def test_parity_with_saved_customer_features(tmp_path, monkeypatch):
+    cleaned = [os.path.abspath(path) for path in CLEANED_PATHS if os.path.exists(path)]
+    if not cleaned:
+        pytest.skip("cleaned transactions not available")
+
+    saved = pd.read_csv("data/processed/customer_features.csv")
+
+    # Rebuilt from the transactions, so the pipeline derives the same
+    # snapshot date and windows the saved file was cut at
+    monkeypatch.chdir(tmp_path)
+    engineer = FeatureEngineer(cleaned[0])
+    engineer.run_pipeline()
+
+    rebuilt = pd.read_csv(tmp_path / "data/processed/customer_features.csv")
+
+    assert rebuilt.columns.tolist() == saved.columns.tolist()
+    pd.testing.assert_frame_equal(
+        rebuilt, saved, check_dtype=False, check_exact=False, rtol=1e-9
+    )
+
+
+def test_incremental_store_matches_full_rebuild(tmp_path, monkeypatch):
+    df = make_transactions()
+    engineer = run_engineer(tmp_path, monkeypatch, df)
+
+    # Fold the same history in as monthly deltas, reloading between updates
+    deltas = df.groupby(df["InvoiceDate"].dt.to_period("M"))
+    for _, delta in deltas:
+        store = FeatureStore(str(tmp_path / "store"))
+        features = store.update(apply_schema(delta))
+        store.save()
+
+    # Stored sums are int64 where the single pass keeps int32
+    pd.testing.assert_frame_equal(
+        features, engineer.features, check_dtype=False, check_exact=False, rtol=1e-9
+    )
+
+
+def test_store_fold_merges_only_new_keys():
+    df = apply_schema(make_transactions(n=1500))
+
+    store = FeatureStore(path=None)
+    store.fold(df)
+    invoices, products = len(store.invoices), len(store.products)
+
+    # Re-folding known keys appends nothing and adds product line counts
+    store.fold(df.iloc[:700])
+    store.fold(df.iloc[700:])
+
+    assert len(store.invoices) == invoices
+    assert len(store.products) == products
+    assert store.products["Key"].is_unique
+    assert store.products["Count"].sum() == 2 * len(df)
+
+
+def test_snapshot_backfill_matches_per_cutoff_runs(tmp_path, monkeypatch):
+    df = make_transactions()
+    engineer = run_engineer(tmp_path, monkeypatch, df)
+
+    early = pd.Timestamp("2010-05-01")
+    latest = engineer.observation_window_end
+
+    snapshots = engineer.run_backfill([latest, early])
+    assert snapshots["snapshot_date"].unique().tolist() == [early, latest]
+
+    # Latest cutoff is exactly the regular pipeline
+    pd.testing.assert_frame_equal(
+        snapshots[snapshots["snapshot_date"] == latest]
+        .drop(columns="snapshot_date").reset_index(drop=True),
+        engineer.features,
+        check_dtype=False, check_exact=False, rtol=1e-9
+    )
+
+    # Earlier cutoff matches aggregating that window from scratch
+    observation = engineer.df[engineer.df["InvoiceDate"] < early]
+    churn_window = engineer.df[
+        (engineer.df["InvoiceDate"] >= early) &
+        (engineer.df["InvoiceDate"] <= early + pd.DateOffset(months=3))
+    ]
+    expected = feature_specs.assemble_features(
+        feature_specs.compile_aggregates(
+            feature_specs.add_row_flags(observation),
+            feature_specs.plan_aggregates()
+        ),
+        observation["InvoiceDate"].max(),
+        churn_window["CustomerID"].unique()
+    )
+
+    pd.testing.assert_frame_equal(
+        snapshots[snapshots["snapshot_date"] == early]
+        .drop(columns="snapshot_date").reset_index(drop=True),
+        expected,
+        check_dtype=False, check_exact=False, rtol=1e-9
+    )
+
+    # Cutoffs before the first invoice have no customers to snapshot
+    with pytest.raises(ValueError, match="first invoice"):
+        engineer.run_backfill([pd.Timestamp("2009-06-01")])
+
+
+def test_parallel_workers_match_serial(tmp_path, monkeypatch):
+    df = make_transactions()
+    serial = run_engineer(tmp_path, monkeypatch, df)
+
+    parallel = FeatureEngineer(str(tmp_path / "cleaned_transactions.csv"), workers=3)
+    parallel.run_pipeline()
+
+    pd.testing.assert_frame_equal(parallel.features, serial.features)
+
+
+def test_pipeline_writes_dashboard_summary(tmp_path, monkeypatch):
+    from src.dashboard_summary import SUMMARY_PATH, load_summary
+
+    engineer = run_engineer(tmp_path, monkeypatch, make_transactions())
+    features = engineer.features
+    summary = load_summary(SUMMARY_PATH)
+
+    assert summary["customers"] == len(features)
+    assert summary["churn_rate"] == features["churn"].mean()
+
+    by_bucket = {
+        row["value"]: row["churn_rate"]
+        for row in summary["segments"]["Recency_Bucket"]
+    }
+    expected = features.groupby("Recency_Bucket")["churn"].mean()
+    assert by_bucket == pytest.approx(expected.to_dict())
+    assert sum(row["customers"] for row in summary["segments"]["RFM_Score"]) == len(features)
+
+    recency = summary["features"]["Recency"]
+    assert sum(recency["histogram"]["counts"]) == len(features) - recency["missing"]
+    assert recency["quantiles"]["0.5"] == features["Recency"].median()
+    assert "CustomerID" not in summary["features"]
+
+
+def test_pipeline_records_step_instrumentation(tmp_path, monkeypatch):
+    engineer = run_engineer(tmp_path, monkeypatch, make_transactions())
+
+    with open(tmp_path / feature_engineering.STATS_PATH) as f:
+        steps = {e["step"]: e for e in json.load(f)["instrumentation"]}
+
+    assert list(steps)[0] == "read_input" and "save_final_features" in steps
+    assert steps["split_data"]["rows_out"] == len(engineer.observation_df)
+    assert steps["compute_aggregates"]["rows_out"] == len(engineer.features)
+    assert all(entry["calls"] == 1 for entry in steps.values())
+
+
+def test_online_features_match_batch_pipeline(tmp_path, monkeypatch):
+    models = os.path.abspath("models")
+    engineer = run_engineer(tmp_path, monkeypatch, make_transactions())
+    obs = engineer.observation_df
+    features = engineer.features.set_index("CustomerID").drop(columns=["churn"])
+
+    sampled = np.random.default_rng(1).choice(features.index, 25, replace=False)
+
+    for customer in sampled:
+        lines = obs[obs["CustomerID"] == customer]
+        online = customer_features(lines, engineer.snapshot_date, engineer.global_stats)
+
+        assert list(online) == features.columns.tolist()
+        np.testing.assert_allclose(
+            list(online.values()), features.loc[customer].to_numpy(dtype=float),
+            rtol=1e-9
+        )
+
+    # Raw lines: string dates, no derived columns, dict of columns
+    lines = obs[obs["CustomerID"] == sampled[0]]
+    raw = {
+        "InvoiceNo": lines["InvoiceNo"].astype(str).tolist(),
+        "StockCode": lines["StockCode"].astype(str).tolist(),
+        "Quantity": lines["Quantity"].tolist(),
+        "InvoiceDate": lines["InvoiceDate"].astype(str).tolist(),
+        "UnitPrice": (lines["TotalPrice"] / lines["Quantity"]).tolist(),
+    }
+    assert customer_features(raw, engineer.snapshot_date, engineer.global_stats) == (
+        pytest.approx(customer_features(lines, engineer.snapshot_date, engineer.global_stats))
+    )
+
+    # Scoring with this run's global stats matches predict_churn on its features
+    # Pickles only: a bundle would bring its own frozen global stats
+    for name in os.listdir(models):
+        if name.endswith(".pkl"):
+            shutil.copy2(os.path.join(models, name), tmp_path / "models")
+
+    registry = ModelRegistry(str(tmp_path / "models"))
+    monkeypatch.setattr(predict, "registry", registry)
+
+    expected = predict.predict_churn(features.loc[sampled])["churn_probability"]
+    scored = [
+        score_customer(obs[obs["CustomerID"] == customer], engineer.snapshot_date)
+        for customer in sampled
+    ]
+    np.testing.assert_allclose(scored, expected.to_numpy(), rtol=1e-9)
@@ -0,0 +1,286 @@
+import numpy as np
+import pandas as pd
+import os
+import pytest
+import shutil
+import subprocess
+import sys
+
+from src.feature_specs import QUARTILE_COLUMNS
+from src import predict
+from src.model_bundle import BundleError, SchemaMismatchError, load_bundle, write_bundle
+from src.model_registry import BUNDLE_FILE, ModelRegistry
+from src.predict import predict_churn
+
+GLOBAL_COLUMNS = [
+    "RecencyScore", "MonetaryScore", "EngagementScore",
+    *QUARTILE_COLUMNS.values(), "RFM_Score",
+    "Recency_Frequency", "Monetary_Frequency", "Recency_Monetary",
+    "Log_Monetary", "Log_Frequency", "Log_Recency",
+    "High_Recency_Flag", "Low_Frequency_Flag", "Low_Monetary_Flag",
+    "Recency_Bucket",
+]
+
+
+def load_customers(n=200):
+    df = pd.read_csv("data/processed/model_ready_dataset.csv", nrows=n)
+    return df.drop(columns=["churn"])
+
+
+def test_single_customer_scoring_uses_stored_global_stats():
+    customers = load_customers()
+    expected = predict_churn(customers)["churn_probability"].to_numpy()
+
+    # Score one row at a time from per-customer columns only
+    base = customers.drop(columns=GLOBAL_COLUMNS)
+    scored = np.array([
+        predict_churn(base.iloc[[i]])["churn_probability"].iloc[0]
+        for i in range(len(base))
+    ])
+
+    np.testing.assert_allclose(scored, expected, rtol=1e-12)
+
+
+def test_fused_scorer_matches_sklearn_path():
+    customers = load_customers(n=None)
+
+    expected = predict.predict_churn_sklearn(customers)
+    probabilities, predictions = predict.predict_arrays(customers)
+    probabilities32, _ = predict.predict_arrays(customers, np.float32)
+
+    np.testing.assert_allclose(probabilities, expected, rtol=0, atol=1e-12)
+    np.testing.assert_allclose(probabilities32, expected, rtol=0, atol=1e-5)
+    np.testing.assert_array_equal(predictions, (expected >= 0.5).astype(int))
+
+
+def test_registry_prefers_fresh_bundle_and_reloads_changed_artifacts(tmp_path):
+    for name in os.listdir("models"):
+        if name.endswith((".pkl", ".json")):
+            shutil.copy(os.path.join("models", name), tmp_path)
+
+    registry = ModelRegistry(str(tmp_path))
+    coef, intercept = registry.fused()
+    assert not registry.has_fresh_bundle()
+
+    manifest = registry.export_bundle(metrics={"roc_auc": 0.73})
+    assert registry.has_fresh_bundle()
+
+    exported, exported_intercept = registry.fused()
+    assert isinstance(exported, np.memmap)
+    np.testing.assert_array_equal(exported, coef)
+    assert exported_intercept == intercept
+    assert registry.feature_columns == list(predict.feature_columns)
+    assert registry.bundle()["metrics"] == {"roc_auc": 0.73}
+    assert registry.bundle()["content_hash"] == manifest["content_hash"]
+
+    # Clones and image builds rewrite mtimes: newer, unchanged pickles
+    # keep the bundle in use
+    stamp = os.stat(registry.path(BUNDLE_FILE)).st_mtime_ns
+    for name in ("final_churn_model.pkl", "scaler.pkl", "feature_columns.pkl"):
+        os.utime(registry.path(name), ns=(stamp + 10**9, stamp + 10**9))
+
+    assert registry.has_fresh_bundle()
+    assert isinstance(registry.fused()[0], np.memmap)
+
+    # A retrained pickle makes the bundle stale; the pickles win again
+    import joblib
+
+    model = registry.model
+    model.intercept_ = model.intercept_ + 1.0
+    joblib.dump(model, registry.path("final_churn_model.pkl"))
+
+    assert not registry.has_fresh_bundle()
+    assert registry.fused()[1] == pytest.approx(intercept + 1.0)
+
+
+def test_bundle_loader_fails_fast_on_corruption_and_schema_mismatch(tmp_path):
+    path = str(tmp_path / BUNDLE_FILE)
+    columns = ["Recency", "Frequency", "Monetary"]
+    stats = {"median": {"Recency": 50.0}}
+
+    write_bundle(path, [0.5, -1.0, 2.0], 0.25, columns, stats)
+    bundle = load_bundle(path, feature_columns=columns)
+
+    assert bundle["global_stats"] == stats
+    assert bundle["coef"].tolist() == [0.5, -1.0, 2.0]
+
+    with pytest.raises(SchemaMismatchError, match="missing \\['Monetary'\\]"):
+        load_bundle(path, feature_columns=["Recency", "Frequency"])
+    with pytest.raises(SchemaMismatchError, match="order"):
+        load_bundle(path, feature_columns=columns[::-1])
+
+    # Flip one byte of the coefficient block
+    with open(path, "r+b") as f:
+        f.seek(-1, os.SEEK_END)
+        last = f.read(1)
+        f.seek(-1, os.SEEK_END)
+        f.write(bytes([last[0] ^ 0xFF]))
+
+    with pytest.raises(BundleError, match="hash"):
+        load_bundle(path)
+
+    with open(path, "r+b") as f:
+        f.write(b"NOTABNDL")
+
+    with pytest.raises(BundleError, match="not a model bundle"):
+        load_bundle(path)
+
+    with pytest.raises(SchemaMismatchError, match="missing"):
+        predict.feature_matrix(load_customers().drop(columns=["UniqueProducts"]))
+
+
+def test_scoring_cold_start_skips_sklearn_with_bundle():
+    registry = ModelRegistry()
+    if not registry.has_fresh_bundle():
+        registry.export_bundle()
+
+    code = (
+        "import sys, pandas as pd\n"
+        "from src.predict import predict_arrays\n"
+        "row = pd.read_csv('data/processed/model_ready_dataset.csv', nrows=1)\n"
+        "predict_arrays(row.drop(columns=['churn']))\n"
+        "print('sklearn' in sys.modules)\n"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True,
+        check=True, env={**os.environ, "PYTHONPATH": os.getcwd()}
+    ).stdout
+
+    assert output.strip() == "False"
+
+
+def test_batch_scorer_streams_chunks_to_csv_and_parquet(tmp_path):
+    from src.batch_score import score_file
+    from src.storage import read_table
+
+    customers = load_customers(n=None)
+    expected = predict_churn(customers)
+
+    input_path = str(tmp_path / "customers.csv")
+    customers.to_csv(input_path, index=False)
+
+    for output, workers in [("scored.csv", 1), ("scored.parquet", 2)]:
+        summary = score_file(
+            input_path, str(tmp_path / output),
+            chunksize=500, workers=workers, progress=False
+        )
+        scored = read_table(str(tmp_path / output))
+
+        assert summary["rows"] == len(customers)
+        np.testing.assert_allclose(
+            scored["churn_probability"], expected["churn_probability"], rtol=1e-12
+        )
+        np.testing.assert_array_equal(
+            scored["churn_prediction"], expected["churn_prediction"]
+        )
+
+    summary = score_file(
+        str(tmp_path / "scored.parquet"), str(tmp_path / "slim.csv"),
+        chunksize=1000, keep_columns=["Recency"], progress=False
+    )
+    assert list(read_table(str(tmp_path / "slim.csv")).columns) == [
+        "Recency", "churn_probability", "churn_prediction"
+    ]
+
+
+def test_shadow_scorer_serves_champion_and_logs_challengers(tmp_path):
+    import joblib
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.neural_network import MLPClassifier
+    from src.shadow import ShadowScorer
+    from src.storage import read_table
+
+    data = pd.read_csv("data/processed/model_ready_dataset.csv")
+    X, y = data.drop(columns=["churn"]), data["churn"].to_numpy()
+    scaler = predict.registry.scaler
+
+    # Notebook convention: trees on raw features, the MLP on scaled ones
+    challengers = {
+        "random_forest": RandomForestClassifier(n_estimators=20, max_depth=4,
+                                                random_state=0).fit(X.to_numpy(), y),
+        "mlp": MLPClassifier(hidden_layer_sizes=(8,), max_iter=300,
+                             random_state=0).fit(scaler.transform(X), y),
+    }
+    for name, model in challengers.items():
+        (tmp_path / name).mkdir()
+        joblib.dump(model, tmp_path / name / "final_churn_model.pkl")
+        for artifact in ("scaler.pkl", "feature_columns.pkl", "global_stats.json"):
+            shutil.copy(os.path.join("models", artifact), tmp_path / name)
+
+    customers = X.iloc[:600]
+    expected = predict.predict_arrays(customers)
+
+    for mode in ("inline", "threads"):
+        log_path = str(tmp_path / f"shadow_{mode}.csv")
+        with ShadowScorer(
+            {name: str(tmp_path / name) for name in challengers},
+            mode=mode, workers=2, max_pending=10, log_path=log_path,
+        ) as scorer:
+            served = [scorer.score(customers.iloc[i:i + 200]) for i in (0, 200, 400)]
+
+        np.testing.assert_array_equal(np.concatenate([p for p, _ in served]), expected[0])
+        np.testing.assert_array_equal(np.concatenate([l for _, l in served]), expected[1])
+
+        log = read_table(log_path).sort_values(["batch", "row"])
+        assert list(log.columns) == ["batch", "row", "champion", "random_forest", "mlp"]
+        np.testing.assert_allclose(log["champion"], expected[0], rtol=1e-12)
+        np.testing.assert_allclose(
+            log["random_forest"],
+            challengers["random_forest"].predict_proba(customers.to_numpy())[:, 1]
+        )
+        np.testing.assert_allclose(
+            log["mlp"],
+            challengers["mlp"].predict_proba(scaler.transform(customers))[:, 1]
+        )
+
+        report = scorer.report()
+        assert report["mode"] == mode and report["dropped_batches"] == 0
+        assert report["serving"]["rows"] == len(customers)
+        for entry in report["challengers"]:
+            assert entry["rows"] == len(customers) and entry["errors"] == 0
+            assert entry["overhead"] > 0 and entry["run"] in ("inline", "threads")
+            assert 0 <= entry["agreement"] <= 1
+
+    # A challenger with another schema cannot share the feature matrix
+    joblib.dump(list(X.columns[:-1]), tmp_path / "mlp" / "feature_columns.pkl")
+    with pytest.raises(SchemaMismatchError):
+        ShadowScorer({"mlp": str(tmp_path / "mlp")})
+
+
+def test_top_at_risk_matches_full_sort_with_bounded_buffers():
+    from src.ranking import AtRiskRanking, top_at_risk
+
+    customers = load_customers(n=None)
+    # Every customer twice: equal scores must rank the earlier row first,
+    # also when the tie spans two chunks
+    customers = pd.concat([customers, customers], ignore_index=True)
+    customers.insert(0, "CustomerID", np.arange(len(customers)) + 10000)
+
+    scored = predict_churn(customers).sort_values(
+        "churn_probability", ascending=False, kind="stable"
+    )
+
+    top = top_at_risk(customers, k=30, chunksize=700)
+    expected = scored.head(30)
+
+    assert list(top.columns) == ["rank", "CustomerID", "churn_probability", "row"]
+    np.testing.assert_array_equal(top["CustomerID"], expected["CustomerID"])
+    np.testing.assert_array_equal(top["row"], expected.index)
+    np.testing.assert_array_equal(top["churn_probability"], expected["churn_probability"])
+
+    # Per segment, from per-customer columns only (Recency_Bucket is derived)
+    base = customers.drop(columns=GLOBAL_COLUMNS)
+    ranking = AtRiskRanking(k=15, segment="Recency_Bucket", keep_columns=["Recency"])
+    for start in range(0, len(base), 500):
+        ranking.add(base.iloc[start:start + 500])
+        assert all(len(heap.scores) <= 15 for heap in ranking.heaps.values())
+
+    by_segment = ranking.result()
+    expected = scored.groupby("Recency_Bucket").head(15).sort_values(
+        "Recency_Bucket", kind="stable"
+    )
+
+    assert ranking.rows == len(customers)
+    np.testing.assert_array_equal(by_segment["Recency_Bucket"], expected["Recency_Bucket"])
+    np.testing.assert_array_equal(by_segment["CustomerID"], expected["CustomerID"])
+    np.testing.assert_array_equal(by_segment["Recency"], expected["Recency"])
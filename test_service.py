@@ -0,0 +1,87 @@
+import http.client
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from src.predict import predict_churn
+from src.service import make_server
+
+
+def request(server, method, path, body=None):
+    connection = http.client.HTTPConnection(*server.server_address)
+    connection.request(method, path, body)
+    response = connection.getresponse()
+    payload = json.loads(response.read())
+    connection.close()
+
+    return response.status, payload
+
+
+def test_service_batches_concurrent_requests_and_matches_predict_churn():
+    customers = pd.read_csv("data/processed/model_ready_dataset.csv", nrows=40)
+    customers = customers.drop(columns=["churn"])
+    expected = predict_churn(customers)["churn_probability"].to_numpy()
+
+    server = make_server(port=0, max_batch_size=16, max_wait_ms=20)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    try:
+        bodies = [json.dumps(r) for r in customers.to_dict(orient="records")]
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            responses = list(pool.map(
+                lambda body: request(server, "POST", "/predict", body), bodies
+            ))
+
+        assert all(status == 200 for status, _ in responses)
+        scored = np.array([body["churn_probability"] for _, body in responses])
+        np.testing.assert_allclose(scored, expected, rtol=1e-12)
+
+        # A list payload is scored in one request
+        status, body = request(server, "POST", "/predict", json.dumps(
+            customers.head(3).to_dict(orient="records")
+        ))
+        assert status == 200 and len(body) == 3
+
+        # A malformed row fails alone
+        status, _ = request(server, "POST", "/predict", json.dumps({"Recency": 1}))
+        assert status == 422
+
+        # ... also when batched with valid rows, where a missing key would
+        # otherwise become NaN
+        records = customers.head(6).to_dict(orient="records")
+        missing = dict(records[1])
+        del missing["Frequency"]
+        not_finite = {**records[4], "Monetary": float("inf")}
+        bodies = [json.dumps(r) for r in [records[0], missing, records[2], records[3],
+                                          not_finite, records[5]]]
+
+        with ThreadPoolExecutor(max_workers=6) as pool:
+            responses = list(pool.map(
+                lambda body: request(server, "POST", "/predict", body), bodies
+            ))
+
+        assert [status for status, _ in responses] == [200, 422, 200, 200, 422, 200]
+        assert "Frequency" in responses[1][1]["error"]
+        assert "Monetary" in responses[4][1]["error"]
+        np.testing.assert_allclose(
+            [responses[i][1]["churn_probability"] for i in (0, 2, 3, 5)],
+            expected[[0, 2, 3, 5]], rtol=1e-12
+        )
+
+        status, health = request(server, "GET", "/health")
+        assert status == 200 and health["status"] == "ok"
+
+        status, metrics = request(server, "GET", "/metrics")
+        # Rejected rows never reach a batch
+        assert metrics["rows"] == len(customers) + 3 + 4
+        assert metrics["batches"] < metrics["rows"]
+        assert metrics["errors"] == 3
+        assert metrics["latency_ms"]["p99"] >= metrics["latency_ms"]["p50"]
+    finally:
+        server.shutdown()
+        server.service.batcher.stop()
+        server.server_close()
@@ -0,0 +1,101 @@
+import numpy as np
+import pandas as pd
+import json
+import os
+import pytest
+import shutil
+
+from src import train
+from src.model_registry import ModelRegistry
+
+
+def make_dataset(path, n=2000, n_features=6, seed=0):
+    rng = np.random.default_rng(seed)
+
+    X = rng.normal(size=(n, n_features))
+    logits = X @ rng.normal(size=n_features) + rng.normal(scale=1.5, size=n)
+
+    df = pd.DataFrame(X, columns=[f"f{i}" for i in range(n_features)])
+    df.insert(0, "churn", (logits > 0).astype(int))
+    df.to_csv(path, index=False)
+
+    return df
+
+
+def test_fold_cache_scales_each_fold_once():
+    rng = np.random.default_rng(1)
+    X = rng.normal(5, 3, size=(300, 4))
+    y = rng.integers(0, 2, 300)
+
+    folds = train.FoldCache(X, y, n_splits=3)
+    X_train, y_train, X_valid, _ = folds.matrices(0, scaled=True)
+
+    assert folds.matrices(0, scaled=True)[0] is X_train
+    np.testing.assert_allclose(X_train.mean(axis=0), 0, atol=1e-12)
+    assert len(X_train) + len(X_valid) == len(X)
+
+    # Budgets are row-prefix views of the cached matrix
+    assert np.shares_memory(X_train[:100], X_train)
+
+
+def test_training_writes_versioned_artifacts_and_promotes(tmp_path):
+    dataset = make_dataset(tmp_path / "model_ready.csv")
+    model_dir = tmp_path / "models"
+
+    # Global stats are versioned with the model and frozen into the bundle
+    model_dir.mkdir()
+    shutil.copy("models/global_stats.json", model_dir)
+
+    version_dir = train.train(
+        str(tmp_path / "model_ready.csv"),
+        families=["logistic_regression"],
+        model_dir=str(model_dir),
+        version="v1",
+    )
+
+    assert sorted(os.listdir(version_dir)) == sorted([
+        "final_churn_model.pkl", "scaler.pkl", "feature_columns.pkl",
+        "global_stats.json", train.REPORT_FILE,
+    ])
+
+    with open(os.path.join(version_dir, train.REPORT_FILE)) as f:
+        report = json.load(f)
+
+    rounds = report["search"]["families"]["logistic_regression"]["rounds"]
+    assert [r["candidates"] for r in rounds] == [10, 4]
+    assert rounds[-1]["rows"] > rounds[0]["rows"]
+    assert report["best"]["test"]["roc_auc"] > 0.7
+    assert {"load_s", "fold_cache_s", "refit_s", "total_s"} <= set(report["timings"])
+    assert len(report["evaluations"]) == 14
+
+    # Forked workers evaluate the same candidates to the same scores
+    parallel_dir = train.train(
+        str(tmp_path / "model_ready.csv"),
+        families=["logistic_regression"],
+        workers=2,
+        model_dir=str(model_dir),
+        version="v2",
+    )
+    with open(os.path.join(parallel_dir, train.REPORT_FILE)) as f:
+        parallel = json.load(f)
+
+    assert parallel["best"] == report["best"]
+
+    train.promote(version_dir, str(model_dir))
+
+    registry = ModelRegistry(str(model_dir))
+    coef, _ = registry.fused()
+
+    assert registry.has_fresh_bundle()
+    assert registry.bundle()["metrics"] == report["best"]["test"]
+    assert registry.feature_columns == list(dataset.columns[1:])
+    assert len(coef) == dataset.shape[1] - 1
+
+
+def test_promote_searches_only_servable_families():
+    assert train.promotable_families() == train.SERVABLE_FAMILIES
+    assert train.promotable_families(["logistic_regression"]) == ["logistic_regression"]
+
+    # Rejected up front instead of after the whole search
+    with pytest.raises(ValueError, match="random_forest"):
+        train.promotable_families(["logistic_regression", "random_forest"])